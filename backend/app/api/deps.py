@@ -1,22 +1,82 @@
-from fastapi import Header, HTTPException, status, Depends
-from app.db import repo
+from functools import lru_cache
+from fastapi import Header, HTTPException, Request, Response, status, Depends
+from app.api import formats
+from app.core import tracing
+from app.db import repo, versions
+from app.services.model import model_tag
 
 
 def require_session(x_session_id: str | None = Header(default=None, alias="X-Session-Id")):
+    with tracing.span("auth"):
+        return _validate_session(x_session_id)
+
+
+def _validate_session(x_session_id: str | None):
     if not x_session_id:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing session")
+    # checked against MySQL on every request: logout, expiry and deactivation
+    # take effect at once on every worker
     s = repo.get_session(x_session_id)
-    if not s:
+    if not s or not s.get("is_active", 1):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid session")
     repo.touch_session(x_session_id)
     return s  # contains role, user_id, email
 
 
+@lru_cache(maxsize=None)
 def require_role(*roles: str):
+    # one callable per role set, so FastAPI resolves it once per request
+    # even when an ETag dependency and the endpoint both depend on it
     def _inner(session=Depends(require_session)):
         if session["role"] not in roles:
             raise HTTPException(status_code=403, detail="Forbidden")
         return session
     return _inner
+
+
+def _conditional(request: Request, response: Response, tag: str):
+    # each Accept-negotiated representation gets its own tag; weak, so a 304
+    # carries the same validator as a gzip/brotli-compressed 200
+    tag = "W/" + tag[:-1] + formats.VARIANTS[formats.negotiate(request)] + '"'
+    request.state.etag = tag
+    if versions.matches(request.headers.get("if-none-match"), tag):
+        # headers set by earlier dependencies describe the cached body too
+        headers = {k: v for k, v in response.headers.items() if k != "content-length"}
+        raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers={**headers, "ETag": tag})
+    response.headers["ETag"] = tag
+    return tag
+
+
+@lru_cache(maxsize=None)
+def data_etag(*roles: str):
+    """ETag from the global data version, after the role check; 304 before the endpoint runs"""
+    def _etag(request: Request, response: Response, session=Depends(require_role(*roles))):
+        return _conditional(request, response, versions.etag())
+    return _etag
+
+
+@lru_cache(maxsize=None)
+def patient_etag(*roles: str):
+    """data_etag() for resources of one patient, from that patient's data version"""
+    def _etag(patient_id: int, request: Request, response: Response,
+              session=Depends(require_role(*roles))):
+        return _conditional(request, response, versions.etag(patient_id))
+    return _etag
+
+
+@lru_cache(maxsize=None)
+def prediction_etag(*roles: str):
+    """patient_etag() that also changes when the risk model or its report is replaced"""
+    def _etag(patient_id: int, request: Request, response: Response,
+              session=Depends(require_role(*roles))):
+        tag = versions.etag(patient_id)
+        return _conditional(request, response, f'{tag[:-1]}-{model_tag()}"')
+    return _etag
+
+
+def drop_etag(response: Response):
+    """For handlers that report errors in a 200 body: keep clients from revalidating them"""
+    if "etag" in response.headers:
+        del response.headers["etag"]
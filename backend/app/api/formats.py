@@ -0,0 +1,223 @@
+"""
+Accept-negotiated response encodings for large row sets.
+
+JSON rows stay the default. Clients can instead ask for column arrays as
+JSON, MessagePack or an Arrow IPC stream, which drop the repeated keys and
+(for the binary formats) the number formatting. MessagePack and Arrow need
+the optional `msgpack` / `pyarrow` packages; datetimes become epoch
+milliseconds in the JSON and MessagePack column modes.
+
+All JSON goes through dumps(), which uses orjson when it is installed: rows
+straight from the cursor are encoded in one pass, without FastAPI's
+jsonable_encoder copying them first.
+"""
+
+import csv
+from datetime import date, datetime, timezone
+from decimal import Decimal
+import io
+import json
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import JSONResponse
+from app.core import tracing
+
+try:
+    import orjson
+except ImportError:  # optional, stdlib json fallback
+    orjson = None
+
+JSON = "application/json"
+COLUMNS_JSON = "application/vnd.aegiscare.columns+json"
+MSGPACK = "application/msgpack"
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+COLUMNAR = (COLUMNS_JSON, MSGPACK, ARROW_STREAM)
+# media type -> ETag suffix, so each representation revalidates separately
+VARIANTS = {JSON: "", COLUMNS_JSON: "-cols", MSGPACK: "-msgpack", ARROW_STREAM: "-arrow"}
+# bulk export formats -> media type
+EXPORTS = {"csv": "text/csv", "ndjson": "application/x-ndjson",
+           "parquet": "application/vnd.apache.parquet"}
+_ALIASES = {"application/x-msgpack": MSGPACK, "application/vnd.msgpack": MSGPACK}
+
+
+def _accepted(accept: str):
+    """(media type, q) pairs from an Accept header, best first"""
+    out = []
+    for i, part in enumerate((accept or "").split(",")):
+        media, *params = [p.strip() for p in part.split(";")]
+        if not media:
+            continue
+        q = 1.0
+        for p in params:
+            if p.startswith("q="):
+                try:
+                    q = float(p[2:])
+                except ValueError:
+                    q = 0.0
+        out.append((-q, i, _ALIASES.get(media.lower(), media.lower())))
+    return [(media, -q) for q, _, media in sorted(out)]
+
+
+def negotiate(request: Request, offered=COLUMNAR) -> str:
+    """The columnar media type the client prefers over JSON, else JSON"""
+    for media, q in _accepted(request.headers.get("accept")):
+        if q <= 0:
+            continue
+        if media in offered:
+            return media
+        if media in (JSON, "*/*", "application/*"):
+            return JSON
+    return JSON
+
+
+def _plain(value):
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp() * 1000)
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+def dumps(obj) -> bytes:
+    """JSON bytes; datetimes as ISO 8601 and Decimals as floats, like jsonable_encoder"""
+    with tracing.span("serialize"):
+        if orjson is not None:
+            return orjson.dumps(obj, default=_default)
+        return json.dumps(obj, default=_default, separators=(",", ":")).encode()
+
+
+class TracedJSONResponse(JSONResponse):
+    """FastAPI's default response, with rendering timed as the serialize phase"""
+
+    def render(self, content) -> bytes:
+        with tracing.span("serialize"):
+            return super().render(content)
+
+
+def to_columns(rows, columns) -> dict:
+    """Row dicts to {column: [values]}"""
+    return {c: [r.get(c) for r in rows] for c in columns}
+
+
+def encode_columns(data: dict, media_type: str, meta: dict = None) -> bytes:
+    """Serialize {column: [values]} (plus scalar metadata) as `media_type`"""
+    if media_type == ARROW_STREAM:
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise HTTPException(406, "Arrow output needs pyarrow (pip install pyarrow)")
+        table = pa.table({c: pa.array([_plain(v) if isinstance(v, Decimal) else v for v in values])
+                          for c, values in data.items()})
+        if meta:
+            table = table.replace_schema_metadata(
+                {k: json.dumps(v, default=str) for k, v in meta.items()})
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+    body = dict(meta or {})
+    body["columns"] = {c: [_plain(v) for v in values] for c, values in data.items()}
+    if media_type == MSGPACK:
+        try:
+            import msgpack
+        except ImportError:
+            raise HTTPException(406, "MessagePack output needs msgpack (pip install msgpack)")
+        return msgpack.packb(body, default=str)
+    return dumps(body)
+
+
+def encoded_response(request: Request, content: bytes, media_type: str = JSON) -> Response:
+    """Pre-encoded body carrying the ETag the conditional-GET dependency chose"""
+    headers = {"Vary": "Accept"}
+    tag = getattr(request.state, "etag", None)
+    if tag:
+        headers["ETag"] = tag
+    return Response(content=content, media_type=media_type, headers=headers)
+
+
+def columnar_response(request: Request, media_type: str, data: dict, meta: dict = None) -> Response:
+    """Encoded column response"""
+    return encoded_response(request, encode_columns(data, media_type, meta), media_type)
+
+
+def json_response(request: Request, obj) -> Response:
+    """`obj` (e.g. a cursor row) encoded with dumps()"""
+    return encoded_response(request, dumps(obj))
+
+
+def rows_response(request: Request, key: str, rows: list, columns, meta: dict = None) -> Response:
+    """Cursor rows as {key: rows, **meta}, or as columns when Accept asks for them"""
+    media_type = negotiate(request)
+    if media_type != JSON:
+        return columnar_response(request, media_type, to_columns(rows, columns), meta)
+    return json_response(request, {key: rows, **(meta or {})})
+
+
+def _csv_chunks(batches, columns):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow([name for name, _ in columns])
+    for rows in batches:
+        writer.writerows([[r.get(name) for name, _ in columns] for r in rows])
+        yield buf.getvalue().encode()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode()
+
+
+def _ndjson_chunks(batches):
+    for rows in batches:
+        yield b"".join(dumps(r) + b"\n" for r in rows)
+
+
+def _parquet_chunks(batches, columns, pa, pq):
+    types = {"int": pa.int64(), "float": pa.float64(), "str": pa.string(),
+             "datetime": pa.timestamp("ms")}
+    schema = pa.schema([(name, types[kind]) for name, kind in columns])
+    sink = io.BytesIO()
+    with pq.ParquetWriter(sink, schema) as writer:
+        # one row group per batch, handed on as soon as it is written
+        for rows in batches:
+            data = {}
+            for name, kind in columns:
+                values = [r.get(name) for r in rows]
+                if kind == "float":
+                    values = [None if v is None else float(v) for v in values]
+                data[name] = values
+            writer.write_table(pa.table(data, schema=schema))
+            yield sink.getvalue()
+            sink.seek(0)
+            sink.truncate()
+    yield sink.getvalue()
+
+
+def export_stream(batches, fmt: str, columns):
+    """
+    Byte chunks of `fmt` for an iterable of row batches. `columns` are
+    (name, kind) pairs, kind one of int/float/str/datetime (Parquet types).
+    Parquet needs the optional `pyarrow` package (406 when missing).
+    """
+    if fmt == "csv":
+        return _csv_chunks(batches, columns)
+    if fmt == "ndjson":
+        return _ndjson_chunks(batches)
+    if fmt == "parquet":
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise HTTPException(406, "Parquet export needs pyarrow (pip install pyarrow)")
+        return _parquet_chunks(batches, columns, pa, pq)
+    raise ValueError(f"Unknown export format '{fmt}', expected one of {', '.join(EXPORTS)}")
@@ -0,0 +1,64 @@
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from app.api.deps import data_etag, require_role
+from app.services import population, risk
+from app.services import vitals as vitals_service
+
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+
+@router.get("/risk-stratification", dependencies=[Depends(data_etag("doctor", "assistant"))])
+def risk_stratification(
+    level: Optional[str] = Query(None, pattern="^(High|Medium|Low)$"),
+    min_score: int = Query(0, ge=0),
+    types: Optional[str] = Query(None, description="Comma-separated obs_types to score"),
+    sex: Optional[str] = Query(None, pattern="^[MFO]$"),
+    min_age: Optional[int] = Query(None, ge=0),
+    max_age: Optional[int] = Query(None, ge=0),
+    days: Optional[int] = Query(None, ge=1, description="Only observations from the last N days"),
+    window: int = Query(risk.EWS_WINDOW, ge=1, le=500,
+                        description="Latest values per vital used for the trend mean"),
+    limit: int = Query(50, ge=1, le=1000),
+    session=Depends(require_role("doctor", "assistant"))
+):
+    """Early-warning scores for the whole population, top patients first"""
+    try:
+        return risk.stratify(vitals_service.parse_types(types), level, min_score, sex,
+                             min_age, max_age, days, window, limit)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Failed to compute risk stratification: {str(e)}")
+
+
+@router.get("/population", dependencies=[Depends(data_etag("doctor", "assistant"))])
+def population_overview(
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    types: Optional[str] = Query(None, description="Comma-separated obs_types"),
+    session=Depends(require_role("doctor", "assistant"))
+):
+    """Population counts and averages, with per obs_type averages from the daily rollup"""
+    try:
+        start, end = vitals_service.window(start, end)
+        return population.get_overview(start, end, vitals_service.parse_types(types))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Failed to compute population overview: {str(e)}")
+
+
+@router.get("/population/breakdown", dependencies=[Depends(data_etag("doctor", "assistant"))])
+def population_breakdown(
+    by: str = Query("age_group", description=f"One of: {', '.join(population.BREAKDOWNS)}"),
+    session=Depends(require_role("doctor", "assistant"))
+):
+    """Patient counts and average vitals per age group, condition, chest pain type or sex"""
+    try:
+        return population.get_breakdown(by)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Failed to compute population breakdown: {str(e)}")
@@ -1,12 +1,26 @@
-from fastapi import APIRouter, Depends, Query
-from app.api.deps import require_role
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, Query, Response
+from app.api.deps import data_etag, drop_etag, require_role
 from app.db import repo
+from app.services import rollups
+from app.services.events import broker
+from app.services import vitals as vitals_service
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
 
 
-@router.get("/stats")
-def stats(session=Depends(require_role("doctor", "assistant"))):
+def event_mark(response: Response):
+    """
+    X-Event-Id: the last delta published before this request read the data,
+    so live clients skip deltas the body already includes. Runs before the
+    ETag check, so 304s carry it too.
+    """
+    response.headers["X-Event-Id"] = str(broker.last_id)
+
+
+@router.get("/stats", dependencies=[Depends(event_mark), Depends(data_etag("doctor", "assistant"))])
+def stats(response: Response, session=Depends(require_role("doctor", "assistant"))):
     """Get comprehensive dashboard statistics for heart disease dataset"""
     try:
         stats_data = repo.get_dashboard_stats()
@@ -22,6 +36,7 @@ def stats(session=Depends(require_role("doctor", "assistant"))):
             "healthy_count": stats_data.get("healthy_count", 0)
         }
     except Exception as e:
+        drop_etag(response)
         return {
             "total_patients": 0,
             "total_observations": 0,
@@ -36,8 +51,9 @@ def stats(session=Depends(require_role("doctor", "assistant"))):
         }
 
 
-@router.get("/patients")
+@router.get("/patients", dependencies=[Depends(data_etag("doctor", "assistant"))])
 def list_patients(
+    response: Response,
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
     session=Depends(require_role("doctor", "assistant"))
@@ -52,11 +68,13 @@ def list_patients(
             "offset": offset
         }
     except Exception as e:
+        drop_etag(response)
         return {"patients": [], "total": 0, "error": str(e)}
 
 
-@router.get("/vitals-summary")
-def vitals_summary(session=Depends(require_role("doctor", "assistant"))):
+@router.get("/vitals-summary",
+            dependencies=[Depends(event_mark), Depends(data_etag("doctor", "assistant"))])
+def vitals_summary(response: Response, session=Depends(require_role("doctor", "assistant"))):
     """Get summary of heart disease vital signs across all patients"""
     try:
         # Get vitals summary from database
@@ -101,11 +119,35 @@ def vitals_summary(session=Depends(require_role("doctor", "assistant"))):
         }
 
     except Exception as e:
+        drop_etag(response)
         return {"error": str(e)}
 
 
-@router.get("/recent-activity")
-def recent_activity(session=Depends(require_role("doctor", "assistant"))):
+@router.get("/vitals-trend", dependencies=[Depends(data_etag("doctor", "assistant"))])
+def vitals_trend(
+    response: Response,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    types: Optional[str] = Query(None, description="Comma-separated obs_types"),
+    points: int = Query(200, ge=3, le=10000, description="Target buckets per series"),
+    series: bool = Query(False, description="Return column arrays per obs_type"),
+    session=Depends(require_role("doctor", "assistant"))
+):
+    """Get population vitals over time, from the rollup tables when buckets allow"""
+    try:
+        start, end = vitals_service.window(start, end)
+        types = vitals_service.parse_types(types)
+        trend = rollups.get_population_trend(start, end, types, points)
+        if series:
+            trend.update(vitals_service.pivot_series(trend.pop("vitals")))
+        return {"types": types, **trend}
+    except Exception as e:
+        drop_etag(response)
+        return {"vitals": [], "total_observations": 0, "error": str(e)}
+
+
+@router.get("/recent-activity", dependencies=[Depends(data_etag("doctor", "assistant"))])
+def recent_activity(response: Response, session=Depends(require_role("doctor", "assistant"))):
     """Get recent patient activity for dashboard"""
     try:
         # Get recent patients with heart disease status
@@ -116,4 +158,5 @@ def recent_activity(session=Depends(require_role("doctor", "assistant"))):
             "last_updated": recent_patients[0]["created_at"] if recent_patients else None
         }
     except Exception as e:
+        drop_etag(response)
         return {"recent_patients": [], "error": str(e)}
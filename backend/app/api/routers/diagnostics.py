@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Depends
+from app.api.deps import require_role
+from app.core import tracing
+from app.db import connection, profiling, statements
+
+router = APIRouter(prefix="/diagnostics", tags=["diagnostics"])
+
+
+@router.get("/statements")
+def statement_stats(session=Depends(require_role("doctor", "assistant"))):
+    """Per-statement call counts and cumulative time since startup"""
+    return {"prepared_statements": statements.ENABLED, **connection.pool_stats(),
+            "statements": statements.stats()}
+
+
+@router.get("/slow-queries")
+def slow_queries(session=Depends(require_role("doctor", "assistant"))):
+    """Recent queries over SLOW_QUERY_MS with their EXPLAIN plans"""
+    return {"threshold_ms": profiling.SLOW_QUERY_MS, "queries": profiling.slow_queries()}
+
+
+@router.get("/routes")
+def route_latency(session=Depends(require_role("doctor", "assistant"))):
+    """Per-route p50/p95/p99 and mean time per phase (auth, db, model, serialize, other)"""
+    export = tracing.exporter()
+    return {"window": tracing.ROUTE_WINDOW, "sample_rate": tracing.TRACE_SAMPLE_RATE,
+            "export": export.stats if export else None, "routes": tracing.route_stats()}
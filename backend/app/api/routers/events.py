@@ -0,0 +1,19 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, Header
+from fastapi.responses import StreamingResponse
+from app.api.deps import require_role
+from app.services.events import broker
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+
+@router.get("/dashboard")
+def dashboard_events(
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+    session=Depends(require_role("doctor", "assistant"))
+):
+    """Server-Sent Events stream of dashboard stat deltas"""
+    last = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+    return StreamingResponse(
+        broker.stream(last), media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
@@ -0,0 +1,99 @@
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from app.api import formats
+from app.api.deps import require_role
+from app.db import repo
+from app.services import vitals as vitals_service
+
+router = APIRouter(prefix="/exports", tags=["exports"])
+
+BATCH_SIZE = 5000
+FORMAT_PATTERN = "^(csv|ndjson|parquet)$"
+# (column, kind) in export order; kinds give the Parquet schema
+PATIENT_EXPORT_COLUMNS = (
+    ("id", "int"), ("uid", "str"), ("name", "str"), ("age", "int"), ("sex", "str"),
+    ("phone", "str"), ("created_at", "datetime"), ("condition", "str"),
+    ("chest_pain_type", "int"), ("resting_bp", "int"), ("cholesterol", "int"),
+    ("fasting_bs", "int"), ("resting_ecg", "int"), ("max_heart_rate", "int"),
+    ("exercise_angina", "int"), ("st_depression", "float"), ("st_slope", "int"),
+    ("num_vessels", "int"), ("thalassemia", "int"), ("target", "int"),
+)
+OBSERVATION_EXPORT_COLUMNS = (
+    ("patient_id", "int"), ("uid", "str"), ("obs_type", "str"), ("value_num", "float"),
+    ("value_text", "str"), ("unit", "str"), ("observed_at", "datetime"),
+)
+
+
+def _closing(stream, chunks):
+    # runs on exhaustion, or when the response drops the iterator on disconnect
+    with stream:
+        yield from chunks
+
+
+def _stream(stream, fmt: str, columns, name: str) -> StreamingResponse:
+    """Response over an open RowStream; the stream is closed if encoding cannot start"""
+    try:
+        chunks = formats.export_stream(stream, fmt, columns)
+    except Exception:
+        stream.close()
+        raise
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return StreamingResponse(
+        _closing(stream, chunks), media_type=formats.EXPORTS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}_{stamp}.{fmt}"'})
+
+
+def _patient_ids(value: Optional[str]):
+    if not value:
+        return None
+    try:
+        return [int(v) for v in value.split(",") if v.strip()]
+    except ValueError:
+        raise ValueError("patients must be comma-separated patient ids")
+
+
+@router.get("/patients")
+def export_patients(
+    format: str = Query("csv", pattern=FORMAT_PATTERN),
+    sex: Optional[str] = Query(None, pattern="^[MFO]$"),
+    min_age: Optional[int] = Query(None, ge=0),
+    max_age: Optional[int] = Query(None, ge=0),
+    target: Optional[int] = Query(None, ge=0, le=1, description="Heart disease status"),
+    session=Depends(require_role("doctor", "assistant"))
+):
+    """Stream every matching patient with their vitals summary as CSV, NDJSON or Parquet"""
+    try:
+        stream = repo.stream_patients_export(sex, min_age, max_age, target, BATCH_SIZE)
+        return _stream(stream, format, PATIENT_EXPORT_COLUMNS, "patients")
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Failed to export patients: {str(e)}")
+
+
+@router.get("/observations")
+def export_observations(
+    format: str = Query("csv", pattern=FORMAT_PATTERN),
+    patients: Optional[str] = Query(None, description="Comma-separated patient ids"),
+    types: Optional[str] = Query(None, description="Comma-separated obs_types"),
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    session=Depends(require_role("doctor", "assistant"))
+):
+    """Stream matching observations as CSV, NDJSON or Parquet"""
+    try:
+        stream = repo.stream_observations_export(
+            _patient_ids(patients), vitals_service.parse_types(types), start, end, BATCH_SIZE)
+        return _stream(stream, format, OBSERVATION_EXPORT_COLUMNS, "observations")
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Failed to export observations: {str(e)}")
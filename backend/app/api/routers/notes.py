@@ -0,0 +1,79 @@
+from datetime import datetime
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel
+from app.api.deps import data_etag, require_role
+from app.services import notes as notes_service
+from ml import nlp
+
+router = APIRouter(prefix="/notes", tags=["notes"])
+
+MAX_NOTES_PER_REQUEST = 1000
+
+
+class NoteIn(BaseModel):
+    patient_id: int
+    text: str
+    noted_at: Optional[datetime] = None
+
+
+class NotesIn(BaseModel):
+    notes: List[NoteIn]
+
+
+class SummarizeIn(BaseModel):
+    notes: Optional[List[str]] = None
+    patient_id: Optional[int] = None
+
+
+@router.post("/")
+def add_notes(body: NotesIn, session=Depends(require_role("doctor", "assistant"))):
+    """Bulk-ingest clinical notes; NLP findings are computed and stored with each note"""
+    if len(body.notes) > MAX_NOTES_PER_REQUEST:
+        raise HTTPException(
+            413, f"At most {MAX_NOTES_PER_REQUEST} notes per request")
+    try:
+        results = notes_service.add_notes(
+            ((n.patient_id, n.text, n.noted_at) for n in body.notes),
+            author_user_id=session["user_id"])
+        return {"inserted": len(results), "notes": results}
+    except Exception as e:
+        raise HTTPException(400, f"Notes ingest failed: {e}")
+
+
+@router.get("/search", dependencies=[Depends(data_etag("doctor", "assistant"))])
+def search(
+    q: str = Query(..., min_length=2, description="Full-text query"),
+    patient_id: int = Query(None),
+    limit: int = Query(50, ge=1, le=500),
+    session=Depends(require_role("doctor", "assistant"))
+):
+    """Full-text search across clinical notes"""
+    try:
+        results = notes_service.search_notes(q, patient_id, limit)
+        return {"query": q, "notes": results, "total": len(results)}
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Failed to search notes: {str(e)}")
+
+
+@router.post("/summarize")
+def summarize(body: SummarizeIn, session=Depends(require_role("doctor", "assistant"))):
+    """
+    Summarize clinical notes: either the texts in the body, or a patient's
+    stored notes (using their precomputed findings)
+    """
+    if body.notes is None:
+        if body.patient_id is None:
+            raise HTTPException(400, "Provide notes or patient_id")
+        return notes_service.get_patient_notes(body.patient_id)
+
+    if len(body.notes) > MAX_NOTES_PER_REQUEST:
+        raise HTTPException(
+            413, f"At most {MAX_NOTES_PER_REQUEST} notes per request")
+    results = nlp.summarize_many(body.notes)
+    return {
+        "notes": results,
+        "total_notes": len(results),
+        **nlp.combine_results(results)
+    }
@@ -0,0 +1,79 @@
+import asyncio
+import json
+from datetime import datetime
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
+from app.api.deps import require_role
+from app.services import stream
+from app.services.vitals import naive_utc
+
+router = APIRouter(prefix="/observations", tags=["observations"])
+
+MAX_ROWS_PER_REQUEST = 5000
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+
+class ObservationIn(BaseModel):
+    patient_id: int
+    # lengths of the patient_observations columns: a row that does not fit
+    # would fail the whole micro-batch it is committed with
+    obs_type: str = Field(..., min_length=1, max_length=64)
+    value: Optional[float] = None
+    value_text: Optional[str] = Field(None, max_length=255)
+    unit: str = Field("", max_length=32)
+    # defaults to the time the server receives it
+    observed_at: Optional[datetime] = None
+
+
+_observations = TypeAdapter(List[ObservationIn])
+
+
+def _parse(body: bytes, content_type: str):
+    """Batched JSON ({"observations": [...]} or a bare list) or NDJSON"""
+    if content_type.split(";")[0].strip() in NDJSON_TYPES:
+        items = [json.loads(line) for line in body.splitlines() if line.strip()]
+    else:
+        payload = json.loads(body)
+        items = payload["observations"] if isinstance(payload, dict) else payload
+    return _observations.validate_python(items)
+
+
+@router.post("/stream", status_code=202)
+async def stream_observations(
+    request: Request,
+    wait: bool = Query(False, description="Respond after the batch is committed"),
+    session=Depends(require_role("doctor", "assistant"))
+):
+    """Queue timestamped observations for group commit"""
+    try:
+        observations = _parse(await request.body(), request.headers.get("content-type", ""))
+    except (ValueError, KeyError, TypeError, ValidationError) as e:
+        raise HTTPException(422, f"Invalid observations: {e}")
+    if len(observations) > MAX_ROWS_PER_REQUEST:
+        raise HTTPException(413, f"At most {MAX_ROWS_PER_REQUEST} observations per request")
+    if not observations:
+        return {"accepted": 0}
+
+    now = datetime.utcnow().replace(microsecond=0)
+    rows = [(o.patient_id, o.obs_type.upper(), o.value, o.value_text, o.unit,
+             naive_utc(o.observed_at) or now, None) for o in observations]
+    try:
+        fut = stream.batcher.submit(rows)
+    except stream.Backpressure as e:
+        raise HTTPException(503, f"Ingest queue full ({e}), retry shortly",
+                            headers={"Retry-After": "1"})
+    if not wait:
+        return {"accepted": len(rows), "pending_batches": stream.batcher.pending()}
+    try:
+        result = await asyncio.wrap_future(fut)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Failed to store observations: {str(e)}")
+    return {"accepted": len(rows), **result}
+
+
+@router.get("/stream/stats")
+def stream_stats(session=Depends(require_role("doctor", "assistant"))):
+    """Writer counters and current queue depth"""
+    return {**stream.batcher.stats, "pending_batches": stream.batcher.pending()}
@@ -1,12 +1,35 @@
-from fastapi import APIRouter, Depends, Query, HTTPException
-from app.api.deps import require_role
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, Query, HTTPException, Request, Response
+from pydantic import BaseModel
+from app.api import formats
+from app.api.deps import data_etag, patient_etag, prediction_etag, require_role
 from app.db import repo
+from app.services import notes as notes_service
+from app.services import vitals as vitals_service
+from app.services.model import get_model_meta, score_patient
 
 router = APIRouter(prefix="/patients", tags=["patients"])
 
+MAX_POINTS = 10000
+ARROW_STREAM = formats.ARROW_STREAM
+# columns of the list/search responses, in order (aliased in queries._PATIENT_ROW)
+PATIENT_COLUMNS = (
+    "id", "uid", "name", "age", "sex", "phone", "created_at", "condition",
+    "chest_pain_type", "resting_bp", "cholesterol", "fasting_bs", "resting_ecg",
+    "max_heart_rate", "exercise_angina", "st_depression", "st_slope", "num_vessels",
+    "thalassemia", "target",
+)
 
-@router.get("/")
+
+class PatientNoteIn(BaseModel):
+    text: str
+    noted_at: Optional[datetime] = None
+
+
+@router.get("/", dependencies=[Depends(data_etag("doctor", "assistant"))])
 def list_patients(
+    request: Request,
     # Increased limit to handle more patients
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
@@ -16,139 +39,65 @@ def list_patients(
     """Get comprehensive list of patients with heart disease vitals summary"""
     try:
         if search:
-            patients = repo.search_patients(search)
+            patients = repo.search_patients(search, limit, offset)
+            total_count = repo.count_search_patients(search)
         else:
             patients = repo.list_patients(limit, offset)
+            total_count = repo.get_total_patients_count()
 
-        # Format patient data for frontend
-        formatted_patients = []
-        for patient in patients:
-            formatted_patient = {
-                "id": patient["id"],
-                "uid": patient["patient_uid"],
-                "name": patient["patient_name"],
-                "age": patient["age"],
-                "sex": patient["sex"],
-                "phone": patient.get("phone"),
-                "created_at": patient.get("created_at"),
-                "condition": patient.get("condition", "Unknown"),
-                # Heart disease vitals summary
-                "chest_pain_type": patient.get("chest_pain_type"),
-                "resting_bp": patient.get("resting_bp"),
-                "cholesterol": patient.get("cholesterol"),
-                "fasting_bs": patient.get("fasting_bs"),
-                "resting_ecg": patient.get("resting_ecg"),
-                "max_heart_rate": patient.get("max_heart_rate"),
-                "exercise_angina": patient.get("exercise_angina"),
-                "st_depression": patient.get("st_depression"),
-                "st_slope": patient.get("st_slope"),
-                "num_vessels": patient.get("num_vessels"),
-                "thalassemia": patient.get("thalassemia"),
-                "target": patient.get("target")
-            }
-            formatted_patients.append(formatted_patient)
-
-        # Get total count for pagination
-        total_count = repo.get_total_patients_count()
-
-        return {
-            "patients": formatted_patients,
+        page = {
             "total": total_count,
             "limit": limit,
             "offset": offset,
             "total_pages": (total_count + limit - 1) // limit
         }
+        return formats.rows_response(request, "patients", patients, PATIENT_COLUMNS, page)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Failed to fetch patients: {str(e)}")
 
 
-@router.get("/search")
+@router.get("/search", dependencies=[Depends(data_etag("doctor", "assistant"))])
 def search_patients(
+    request: Request,
     q: str = Query(..., description="Search query for patient name or ID"),
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
     session=Depends(require_role("doctor", "assistant"))
 ):
     """Search patients by name or ID"""
     try:
-        patients = repo.search_patients(q)
-
-        # Format patient data for frontend
-        formatted_patients = []
-        for patient in patients:
-            formatted_patient = {
-                "id": patient["id"],
-                "uid": patient["patient_uid"],
-                "name": patient["patient_name"],
-                "age": patient["age"],
-                "sex": patient["sex"],
-                "phone": patient.get("phone"),
-                "created_at": patient.get("created_at"),
-                # Heart disease vitals summary
-                "chest_pain_type": patient.get("chest_pain_type"),
-                "resting_bp": patient.get("resting_bp"),
-                "cholesterol": patient.get("cholesterol"),
-                "fasting_bs": patient.get("fasting_bs"),
-                "resting_ecg": patient.get("resting_ecg"),
-                "max_heart_rate": patient.get("max_heart_rate"),
-                "exercise_angina": patient.get("exercise_angina"),
-                "st_depression": patient.get("st_depression"),
-                "st_slope": patient.get("st_slope"),
-                "num_vessels": patient.get("num_vessels"),
-                "thalassemia": patient.get("thalassemia"),
-                "target": patient.get("target")
-            }
-            formatted_patients.append(formatted_patient)
-
-        return {
-            "patients": formatted_patients,
-            "total": len(formatted_patients),
+        patients = repo.search_patients(q, limit, offset)
+        page = {
+            "total": repo.count_search_patients(q),
+            "limit": limit,
+            "offset": offset,
             "query": q
         }
+        return formats.rows_response(request, "patients", patients, PATIENT_COLUMNS, page)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Failed to search patients: {str(e)}")
 
 
-@router.get("/{patient_id}")
+@router.get("/{patient_id}", dependencies=[Depends(patient_etag("doctor", "assistant"))])
 def get_patient(
+    request: Request,
     patient_id: int,
     session=Depends(require_role("doctor", "assistant"))
 ):
     """Get detailed patient information"""
     try:
-        # Get patient from list_patients with limit 1
-        patients = repo.list_patients(1, 0)
-        patient = None
-        for p in patients:
-            if p["id"] == patient_id:
-                patient = p
-                break
+        patient = repo.get_patient_by_id(patient_id)
 
         if not patient:
             raise HTTPException(status_code=404, detail="Patient not found")
 
-        return {
-            "id": patient["id"],
-            "uid": patient["patient_uid"],
-            "name": patient["patient_name"],
-            "age": patient["age"],
-            "sex": patient["sex"],
-            "phone": patient.get("phone"),
-            "created_at": patient.get("created_at"),
-            # Heart disease vitals summary
-            "chest_pain_type": patient.get("chest_pain_type"),
-            "resting_bp": patient.get("resting_bp"),
-            "cholesterol": patient.get("cholesterol"),
-            "fasting_bs": patient.get("fasting_bs"),
-            "resting_ecg": patient.get("resting_ecg"),
-            "max_heart_rate": patient.get("max_heart_rate"),
-            "exercise_angina": patient.get("exercise_angina"),
-            "st_depression": patient.get("st_depression"),
-            "st_slope": patient.get("st_slope"),
-            "num_vessels": patient.get("num_vessels"),
-            "thalassemia": patient.get("thalassemia"),
-            "target": patient.get("target")
-        }
+        return formats.json_response(request, patient)
     except HTTPException:
         raise
     except Exception as e:
@@ -156,45 +105,133 @@ def get_patient(
             status_code=500, detail=f"Failed to fetch patient: {str(e)}")
 
 
-@router.get("/{patient_id}/vitals")
+@router.get("/{patient_id}/vitals", dependencies=[Depends(patient_etag("doctor", "assistant"))])
 def get_patient_vitals(
+    request: Request,
     patient_id: int,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    types: Optional[str] = Query(None, description="Comma-separated obs_types"),
+    points: Optional[int] = Query(None, ge=3, le=MAX_POINTS,
+                                  description="Target points per series"),
+    method: str = Query("bucket", description="bucket or lttb"),
     session=Depends(require_role("doctor", "assistant"))
 ):
-    """Get patient vitals over time"""
+    """Get patient vitals over time, optionally windowed and downsampled"""
     try:
-        vitals = repo.get_patient_vitals(patient_id)
-        return {
-            "patient_id": patient_id,
-            "vitals": vitals,
-            "total_observations": len(vitals)
-        }
+        result = vitals_service.get_vitals(
+            patient_id, start, end, vitals_service.parse_types(types), points, method)
+        media_type = formats.negotiate(request)
+        if media_type != formats.JSON:
+            rows = result.pop("vitals")
+            return formats.columnar_response(
+                request, media_type, formats.to_columns(rows, rows[0] if rows else ()), result)
+        return result
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(400, str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Failed to fetch patient vitals: {str(e)}")
 
 
-@router.get("/{patient_id}/vitals/{vital_type}")
+@router.get("/{patient_id}/vitals/series",
+            dependencies=[Depends(patient_etag("doctor", "assistant"))])
+def get_patient_vitals_series(
+    request: Request,
+    patient_id: int,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    types: Optional[str] = Query(None, description="Comma-separated obs_types"),
+    points: Optional[int] = Query(None, ge=3, le=MAX_POINTS),
+    method: str = Query("bucket", description="bucket or lttb"),
+    format: str = Query("json", pattern="^(json|arrow)$",
+                        description="json or arrow (Arrow IPC stream)"),
+    session=Depends(require_role("doctor", "assistant"))
+):
+    """Get patient vitals as column arrays per obs_type on a shared time axis"""
+    try:
+        result = vitals_service.get_vitals_series(
+            patient_id, start, end, vitals_service.parse_types(types), points, method)
+        media_type = ARROW_STREAM if format == "arrow" else formats.negotiate(request)
+        if media_type == ARROW_STREAM:
+            return Response(content=vitals_service.series_to_arrow(result), media_type=ARROW_STREAM,
+                            headers={"Vary": "Accept", "ETag": request.state.etag})
+        if media_type != formats.JSON:
+            columns = {"timestamp": result.pop("timestamps"), **result.pop("series")}
+            return formats.columnar_response(request, media_type, columns, result)
+        return result
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Failed to fetch patient vitals: {str(e)}")
+
+
+@router.get("/{patient_id}/vitals/{vital_type}",
+            dependencies=[Depends(patient_etag("doctor", "assistant"))])
 def get_vital_by_type(
     patient_id: int,
     vital_type: str,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    points: Optional[int] = Query(None, ge=3, le=MAX_POINTS),
+    method: str = Query("bucket"),
     session=Depends(require_role("doctor", "assistant"))
 ):
     """Get specific vital sign over time for a patient"""
     try:
-        vitals = repo.get_vitals_by_type(patient_id, vital_type)
-        return {
-            "patient_id": patient_id,
-            "vital_type": vital_type,
-            "vitals": vitals,
-            "total_observations": len(vitals)
-        }
+        result = vitals_service.get_vitals(
+            patient_id, start, end, [vital_type.upper()], points, method)
+        result["vital_type"] = vital_type
+        return result
+    except ValueError as e:
+        raise HTTPException(400, str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Failed to fetch vital data: {str(e)}")
 
 
-@router.get("/{patient_id}/predictions")
+@router.get("/{patient_id}/notes", dependencies=[Depends(patient_etag("doctor", "assistant"))])
+def get_patient_notes(
+    patient_id: int,
+    limit: int = Query(100, ge=1, le=1000),
+    session=Depends(require_role("doctor", "assistant"))
+):
+    """Get a patient's clinical notes with stored NLP findings and a combined summary"""
+    try:
+        return notes_service.get_patient_notes(patient_id, limit)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Failed to fetch patient notes: {str(e)}")
+
+
+@router.post("/{patient_id}/notes")
+def add_patient_note(
+    patient_id: int,
+    body: PatientNoteIn,
+    session=Depends(require_role("doctor", "assistant"))
+):
+    """Add a clinical note for a patient"""
+    if not body.text.strip():
+        raise HTTPException(400, "Note text is required")
+    if not repo.get_patient_by_id(patient_id):
+        raise HTTPException(status_code=404, detail="Patient not found")
+    try:
+        results = notes_service.add_notes(
+            [(patient_id, body.text.strip(), body.noted_at)],
+            author_user_id=session["user_id"])
+        return {"patient_id": patient_id, **results[0]}
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Failed to add note: {str(e)}")
+
+
+@router.get("/{patient_id}/predictions",
+            dependencies=[Depends(prediction_etag("doctor", "assistant"))])
 def get_patient_predictions(
     patient_id: int,
     session=Depends(require_role("doctor", "assistant"))
@@ -206,16 +243,16 @@ def get_patient_predictions(
         if not patient:
             raise HTTPException(status_code=404, detail="Patient not found")
 
-        # Get vitals data for predictions
-        vitals = repo.get_patient_vitals(patient_id)
-
-        # Calculate ML predictions based on patient data and vitals
-        predictions = calculate_ml_predictions(patient, vitals)
+        # The risk model only needs the vitals summary joined into `patient`,
+        # so the full observation history is not fetched here
+        predictions = calculate_ml_predictions(patient)
 
+        model_meta = get_model_meta()
         return {
             "patient_id": patient_id,
             "predictions": predictions,
-            "model_version": "1.0",
+            "model_version": model_meta["version"],
+            "model_meta": model_meta,
             "prediction_timestamp": "2024-01-01T00:00:00Z"
         }
     except HTTPException:
@@ -225,11 +262,27 @@ def get_patient_predictions(
             status_code=500, detail=f"Failed to generate predictions: {str(e)}")
 
 
-def calculate_ml_predictions(patient, vitals):
+def calculate_ml_predictions(patient, vitals=None):
     """Calculate ML predictions based on patient data and vitals"""
     try:
-        # This is a placeholder for the actual ML model integration
-        # In production, this would call your trained ML model
+        # Compiled risk model (python -m ml.train); rule-based fallback below.
+        # The model's `target` outcome is heart disease present; the response
+        # keeps `target` as a positive (low-risk) outcome and reports the
+        # disease prediction as heart_disease / heart_disease_risk.
+        proba = score_patient(patient)
+        if proba is not None:
+            heart_disease = 1 if proba["target"] >= 0.5 else 0
+            return {
+                "target": 1 - heart_disease,
+                "heart_disease": heart_disease,
+                "readmiss": 1 if proba["readmission"] >= 0.5 else 0,
+                "complication": 1 if proba["complication"] >= 0.5 else 0,
+                "mortalit": 1 if proba["mortality"] >= 0.5 else 0,
+                "heart_disease_risk": proba["target"],
+                "readmission_risk": proba["readmission"],
+                "complication_risk": proba["complication"],
+                "mortality_risk": proba["mortality"]
+            }
 
         # Calculate risk scores based on available data
         risk_factors = 0
@@ -267,6 +320,7 @@ def calculate_ml_predictions(patient, vitals):
 
         return {
             "target": target,
+            "heart_disease": 1 - target,
             "readmiss": readmiss,
             "complication": complication,
             "mortalit": mortalit,
@@ -276,9 +330,10 @@ def calculate_ml_predictions(patient, vitals):
         }
 
     except Exception as e:
-        # Return default predictions if calculation fails
+        # Return default (low-risk) predictions if calculation fails
         return {
-            "target": 0,
+            "target": 1,
+            "heart_disease": 0,
             "readmiss": 0,
             "complication": 0,
             "mortalit": 0,
@@ -1,6 +1,7 @@
 import random
 from backend.api.routers.uploads import PatientInput, PredictionResponse, Explanation
 from ml import nlp
+from app.services.model import get_model_meta
 
 
 def predict(data: PatientInput) -> PredictionResponse:
@@ -17,8 +18,7 @@ def predict(data: PatientInput) -> PredictionResponse:
         label=label,
         explanations=explanations,
         recommendations=recos,
-        model_meta={"version": "v0.1",
-                    "auroc": "0.80", "trained": "2025-08-28"}
+        model_meta=get_model_meta()
     )
 
 
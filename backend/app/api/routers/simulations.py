@@ -0,0 +1,55 @@
+from typing import Dict, List, Optional
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel, Field
+from app.api.deps import require_role
+from app.services import simulation
+
+router = APIRouter(prefix="/simulations", tags=["simulations"])
+
+MAX_SCENARIOS = 100
+MAX_PATIENT_ROWS = 1000
+# patients x magnitudes per request: the (k, n, outcomes) results are held in memory
+MAX_SIMULATED_ROWS = 1_000_000
+
+
+class SimulationIn(BaseModel):
+    intervention: str
+    magnitudes: List[float] = Field(..., min_length=1)
+    # fixed interventions applied under every magnitude, e.g. {"statin": 40}
+    base: Dict[str, float] = {}
+    # omit for the whole cohort (up to cohort_limit patients)
+    patient_ids: Optional[List[int]] = None
+    cohort_limit: int = Field(10000, ge=1, le=100000)
+    include_patients: bool = False
+
+
+@router.get("/interventions")
+def interventions(session=Depends(require_role("doctor"))):
+    """List available interventions and the features they shift"""
+    return {"interventions": simulation.list_interventions()}
+
+
+@router.post("/")
+def run(body: SimulationIn, session=Depends(require_role("doctor"))):
+    """Predicted risk for a patient or cohort under each intervention magnitude"""
+    if len(body.magnitudes) > MAX_SCENARIOS:
+        raise HTTPException(400, f"At most {MAX_SCENARIOS} magnitudes per sweep")
+    cohort = len(body.patient_ids) if body.patient_ids else body.cohort_limit
+    if cohort * len(body.magnitudes) > MAX_SIMULATED_ROWS:
+        raise HTTPException(
+            400, f"At most {MAX_SIMULATED_ROWS:,} patient x magnitude rows per sweep; "
+                 "lower cohort_limit or the number of magnitudes")
+    if body.include_patients and (not body.patient_ids or len(body.patient_ids) > MAX_PATIENT_ROWS):
+        raise HTTPException(
+            400, f"include_patients needs patient_ids (at most {MAX_PATIENT_ROWS})")
+    try:
+        return simulation.run_simulation(
+            body.intervention, body.magnitudes, body.base, body.patient_ids,
+            body.cohort_limit, body.include_patients)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    except LookupError as e:
+        raise HTTPException(404, str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Simulation failed: {str(e)}")
@@ -0,0 +1,135 @@
+"""
+gzip / brotli response compression chosen from Accept-Encoding.
+
+Brotli is used when the client accepts it and the optional `brotli` package
+is installed, gzip otherwise. Streaming bodies are compressed chunk by chunk
+with a flush after each, so NDJSON/CSV exports still arrive incrementally.
+Server-sent events, Parquet (already compressed), already-encoded bodies,
+partial content and small bodies pass through untouched. Compressed
+responses turn a strong ETag weak, since the bytes differ from the identity
+representation.
+"""
+
+import zlib
+import anyio
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+MINIMUM_SIZE = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+# compress bodies at least this big off the event loop
+THREAD_MINIMUM_SIZE = 128 * 1024
+EXCLUDED_TYPES = ("text/event-stream", "application/vnd.apache.parquet")
+
+
+def choose_encoding(accept_encoding: str) -> str:
+    """'br', 'gzip' or None from an Accept-Encoding header (honours q=0)"""
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        name, *params = [p.strip() for p in part.split(";")]
+        q = 1.0
+        for p in params:
+            if p.startswith("q="):
+                try:
+                    q = float(p[2:])
+                except ValueError:
+                    q = 0.0
+        if name:
+            accepted[name.lower()] = q
+    wildcard = accepted.get("*", 0.0)
+    if brotli is not None and accepted.get("br", wildcard) > 0:
+        return "br"
+    if accepted.get("gzip", wildcard) > 0:
+        return "gzip"
+    return None
+
+
+class _Compressor:
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._c = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._c = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        if self.encoding == "br":
+            out = self._c.process(data)
+            return out + (self._c.finish() if final else self._c.flush())
+        out = self._c.compress(data)
+        return out + self._c.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = MINIMUM_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        compressor = None
+        passthrough = False
+
+        async def compress(body: bytes, final: bool) -> bytes:
+            if len(body) >= THREAD_MINIMUM_SIZE:
+                return await anyio.to_thread.run_sync(compressor.compress, body, final)
+            return compressor.compress(body, final)
+
+        async def send_compressed(message):
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                media = headers.get("content-type", "").partition(";")[0].strip().lower()
+                passthrough = ("content-encoding" in headers or message["status"] in (204, 206, 304)
+                               or media in EXCLUDED_TYPES)
+                if passthrough:
+                    await send(message)
+                else:
+                    start = message
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+            if start is not None:
+                # first body chunk decides whether compressing is worth it
+                headers = MutableHeaders(raw=start["headers"])
+                headers.add_vary_header("Accept-Encoding")
+                if not more and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                compressor = _Compressor(encoding)
+                headers["Content-Encoding"] = encoding
+                if "content-length" in headers:
+                    del headers["content-length"]
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/"):
+                    headers["ETag"] = "W/" + etag
+                body = await compress(body, not more)
+                if not more:
+                    headers["Content-Length"] = str(len(body))
+                await send(start)
+                start = None
+                await send({"type": "http.response.body", "body": body, "more_body": more})
+                return
+            await send({"type": "http.response.body", "body": await compress(body, not more),
+                        "more_body": more})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,13 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Repository root (backend/app/core/config.py -> ../../..)
+ROOT_DIR = os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+# Trained model bundle and evaluation report (written by ml/train.py, ml/evaluate.py)
+MODEL_DIR = os.getenv("AEGIS_MODEL_DIR", os.path.join(ROOT_DIR, "models"))
+EVAL_REPORT_PATH = os.path.join(MODEL_DIR, "eval_report.json")
+COMPILED_MODEL_PATH = os.path.join(MODEL_DIR, "risk_model.npz")
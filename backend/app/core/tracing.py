@@ -0,0 +1,319 @@
+"""
+Request tracing: nested spans per request, per-route latency percentiles and
+OTLP export.
+
+TracingMiddleware opens a root span for every HTTP request. Code on the
+request path opens children with `with span(...)`: auth (require_session),
+`db <query>` (every fetch/exec helper, and opening a stream_all() cursor),
+`model <call>` (risk scoring, simulation) and `serialize` (JSON rendering). The current span is kept in
+a contextvar, so spans nest correctly across the threadpool that runs sync
+endpoints and dependencies. Outside a request span() is a no-op.
+
+For each route template the last ROUTE_WINDOW durations are kept for
+p50/p95/p99, together with the time spent in each phase. A phase is the
+first word of a direct child span's name; whatever is left over counts as
+"other" (framework, validation, handler code).
+
+Finished traces are exported as OTLP/JSON (ExportTraceServiceRequest) by a
+background thread. They are appended one request batch per line to
+TRACE_EXPORT_FILE (the OpenTelemetry collector's file exporter format) and/or
+POSTed to an OTLP/HTTP endpoint such as http://localhost:4318/v1/traces.
+Export is off unless one of the two is set; TRACE_SAMPLE_RATE picks the
+share of requests exported.
+"""
+
+import contextvars
+import json
+import os
+import queue
+import random
+import threading
+import time
+import urllib.request
+from collections import deque
+from contextlib import contextmanager
+import numpy as np
+from app.core import metrics
+
+TRACE_EXPORT_FILE = os.getenv("TRACE_EXPORT_FILE")
+TRACE_OTLP_ENDPOINT = os.getenv("TRACE_OTLP_ENDPOINT")
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+SERVICE_NAME = "aegiscare-api"
+ROUTE_WINDOW = 2048
+EXPORT_QUEUE_SIZE = 10000
+EXPORT_BATCH = 256
+EXPORT_INTERVAL = 2.0
+
+# OTLP SpanKind
+KIND_INTERNAL, KIND_SERVER, KIND_CLIENT = 1, 2, 3
+
+REQUEST_SECONDS = metrics.Histogram(
+    "aegiscare_http_request_seconds", "Request latency by route template",
+    ("method", "route", "status"))
+
+_current = contextvars.ContextVar("aegiscare_span", default=None)
+
+
+class Trace:
+    __slots__ = ("trace_id", "spans", "sampled")
+
+    def __init__(self, sampled: bool):
+        self.trace_id = os.urandom(16).hex()
+        self.spans = []
+        self.sampled = sampled
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "kind", "attributes",
+                 "start", "end", "error")
+
+    def __init__(self, trace: Trace, name: str, kind: int = KIND_INTERNAL,
+                 parent_id: str = None, attributes: dict = None):
+        self.trace, self.name, self.kind = trace, name, kind
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.attributes = attributes or {}
+        self.start = time.time_ns()
+        self.end = None
+        self.error = None
+
+    @property
+    def seconds(self) -> float:
+        return ((self.end or time.time_ns()) - self.start) / 1e9
+
+
+@contextmanager
+def span(name: str, kind: int = KIND_INTERNAL, **attributes):
+    """Child of the current span for the duration of the block (None outside a request)"""
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+    s = Span(parent.trace, name, kind, parent.span_id, attributes)
+    token = _current.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.error = repr(e)[:200]
+        raise
+    finally:
+        s.end = time.time_ns()
+        _current.reset(token)
+        parent.trace.spans.append(s)
+
+
+def phases(root: Span) -> dict:
+    """Seconds per phase (first word of each direct child span's name) and for the rest"""
+    out = {}
+    for s in root.trace.spans:
+        if s.parent_id == root.span_id:
+            phase = s.name.split(" ", 1)[0]
+            out[phase] = out.get(phase, 0.0) + s.seconds
+    out["other"] = max(0.0, root.seconds - sum(out.values()))
+    return out
+
+# PER-ROUTE LATENCY
+
+
+_routes_lock = threading.Lock()
+_routes = {}  # (method, route) -> {"durations": deque, "count", "phases": {phase: seconds}}
+
+
+def observe_request(method: str, route: str, status: int, seconds: float, phase_seconds: dict):
+    REQUEST_SECONDS.observe(seconds, method=method, route=route, status=str(status))
+    with _routes_lock:
+        stats = _routes.get((method, route))
+        if stats is None:
+            stats = _routes[(method, route)] = {
+                "durations": deque(maxlen=ROUTE_WINDOW), "count": 0, "phases": {}}
+        stats["durations"].append(seconds)
+        stats["count"] += 1
+        for phase, s in phase_seconds.items():
+            stats["phases"][phase] = stats["phases"].get(phase, 0.0) + s
+
+
+def route_stats() -> list:
+    """Per-route p50/p95/p99 over the recent window and mean ms per phase, slowest p95 first"""
+    with _routes_lock:
+        items = [(key, list(s["durations"]), s["count"], dict(s["phases"]))
+                 for key, s in _routes.items()]
+    out = []
+    for (method, route), durations, count, phase_totals in items:
+        p50, p95, p99 = np.percentile(np.array(durations) * 1000, (50, 95, 99))
+        out.append({"method": method, "route": route, "count": count, "window": len(durations),
+                    "p50_ms": round(float(p50), 2), "p95_ms": round(float(p95), 2),
+                    "p99_ms": round(float(p99), 2),
+                    "phases_mean_ms": {p: round(s * 1000 / count, 3)
+                                       for p, s in sorted(phase_totals.items())}})
+    return sorted(out, key=lambda r: r["p95_ms"], reverse=True)
+
+
+def reset_routes():
+    with _routes_lock:
+        _routes.clear()
+
+
+@metrics.collector
+def _quantile_lines():
+    samples = []
+    for r in route_stats():
+        for q in ("50", "95", "99"):
+            samples.append(({"method": r["method"], "route": r["route"], "quantile": f"0.{q}"},
+                            r[f"p{q}_ms"] / 1000))
+    return metrics.family_lines("aegiscare_http_request_latency_quantile_seconds",
+                                f"Request latency quantiles over the last {ROUTE_WINDOW} requests",
+                                "gauge", samples)
+
+# OTLP EXPORT
+
+
+def _attribute(key: str, value) -> dict:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def _otlp_span(s: Span) -> dict:
+    out = {"traceId": s.trace.trace_id, "spanId": s.span_id, "name": s.name, "kind": s.kind,
+           "startTimeUnixNano": str(s.start), "endTimeUnixNano": str(s.end or s.start),
+           "attributes": [_attribute(k, v) for k, v in s.attributes.items()],
+           "status": {"code": 2, "message": s.error} if s.error else {}}
+    if s.parent_id:
+        out["parentSpanId"] = s.parent_id
+    return out
+
+
+def to_otlp(traces) -> dict:
+    """ExportTraceServiceRequest (OTLP/JSON) for finished traces"""
+    return {"resourceSpans": [{
+        "resource": {"attributes": [_attribute("service.name", SERVICE_NAME)]},
+        "scopeSpans": [{"scope": {"name": "app.core.tracing"},
+                        "spans": [_otlp_span(s) for t in traces for s in t.spans]}],
+    }]}
+
+
+class Exporter:
+    """Background batching of finished traces to an OTLP/JSON file and/or OTLP/HTTP endpoint"""
+
+    def __init__(self, path: str = None, endpoint: str = None):
+        self.path, self.endpoint = path, endpoint
+        self.stats = {"exported_traces": 0, "dropped_traces": 0, "failed_batches": 0}
+        self._queue = queue.Queue(maxsize=EXPORT_QUEUE_SIZE)
+        self._thread = threading.Thread(target=self._run, name="trace-export", daemon=True)
+        self._thread.start()
+
+    def submit(self, trace: Trace):
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self.stats["dropped_traces"] += 1
+
+    def _write(self, traces):
+        body = json.dumps(to_otlp(traces), separators=(",", ":"))
+        try:
+            if self.path:
+                with open(self.path, "a") as f:
+                    f.write(body + "\n")
+            if self.endpoint:
+                req = urllib.request.Request(self.endpoint, data=body.encode(), method="POST",
+                                             headers={"Content-Type": "application/json"})
+                urllib.request.urlopen(req, timeout=5).close()
+            self.stats["exported_traces"] += len(traces)
+        except Exception as e:
+            self.stats["failed_batches"] += 1
+            print(f"⚠️  Trace export failed: {e}")
+
+    def _run(self):
+        while True:
+            try:
+                batch = [self._queue.get(timeout=EXPORT_INTERVAL)]
+            except queue.Empty:
+                continue
+            while len(batch) < EXPORT_BATCH:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            traces = [t for t in batch if t is not None]
+            if traces:
+                self._write(traces)
+            for _ in batch:
+                self._queue.task_done()
+            if len(traces) < len(batch):
+                return  # close()
+
+    def flush(self, timeout: float = 5.0):
+        """Wait until everything submitted so far is written"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+
+_exporter = None
+_exporter_lock = threading.Lock()
+
+
+def exporter():
+    """The process exporter, started on first use; None when export is not configured"""
+    global _exporter
+    if _exporter is None and (TRACE_EXPORT_FILE or TRACE_OTLP_ENDPOINT):
+        with _exporter_lock:
+            if _exporter is None:
+                _exporter = Exporter(TRACE_EXPORT_FILE, TRACE_OTLP_ENDPOINT)
+    return _exporter
+
+
+def shutdown():
+    global _exporter
+    if _exporter is not None:
+        _exporter.close()
+        _exporter = None
+
+# MIDDLEWARE
+
+
+class TracingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        export = exporter()
+        trace = Trace(sampled=export is not None and random.random() < TRACE_SAMPLE_RATE)
+        method = scope["method"]
+        root = Span(trace, f"{method} {scope['path']}", KIND_SERVER,
+                    attributes={"http.method": method, "http.target": scope["path"]})
+        token = _current.set(root)
+        status = 500
+
+        async def send_traced(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_traced)
+        except BaseException as e:
+            root.error = repr(e)[:200]
+            raise
+        finally:
+            root.end = time.time_ns()
+            _current.reset(token)
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            root.name = f"{method} {route}"
+            root.attributes.update({"http.route": route, "http.status_code": status})
+            trace.spans.append(root)
+            observe_request(method, route, status, root.seconds, phases(root))
+            if trace.sampled:
+                export.submit(trace)
@@ -1,6 +1,13 @@
+import contextvars
 import os
+import queue
+import threading
+import time
+from contextlib import contextmanager, nullcontext
 import pymysql
 from dotenv import load_dotenv
+from app.core import metrics, tracing
+from . import profiling, statements
 
 # Load environment variables from .env file
 load_dotenv()
@@ -14,47 +21,160 @@ MYSQL_USER = os.getenv("MYSQL_USER", "root")
 MYSQL_PASSWORD = os.getenv("MYSQL_PASSWORD", "Dhruv.1603")
 
 
-def get_conn():
-    """Get database connection with proper error handling"""
-    try:
-        # First try to connect without specifying database to check if MySQL is running
-        conn = pymysql.connect(
-            host=MYSQL_HOST,
-            port=MYSQL_PORT,
-            user=MYSQL_USER,
-            password=MYSQL_PASSWORD,
-            charset="utf8mb4",
-            autocommit=False,
-            cursorclass=pymysql.cursors.DictCursor
-        )
-
-        # Check if database exists, if not create it
-        with conn.cursor() as cur:
-            cur.execute(f"CREATE DATABASE IF NOT EXISTS `{MYSQL_DB}`")
-            conn.commit()
+# errors caused by the rows a statement writes (too long, out of range, bad
+# key), as opposed to the connection or the server
+DATA_ERRORS = (pymysql.err.DataError, pymysql.err.IntegrityError)
+
+# idle connections kept for reuse by fetch_*/exec_* (more are opened under load)
+POOL_SIZE = int(os.getenv("MYSQL_POOL_SIZE", "8"))
+# ping a pooled connection before reuse if it sat idle longer than this
+POOL_PING_SECONDS = 30
+
+_db_lock = threading.Lock()
+_db_ready = False
+_pool = queue.LifoQueue(maxsize=POOL_SIZE)
+# connection of the transaction() block the current thread/task is in
+_tx = contextvars.ContextVar("aegiscare_tx", default=None)
+
+
+def _connect(database=MYSQL_DB, **options):
+    return pymysql.connect(
+        host=MYSQL_HOST,
+        port=MYSQL_PORT,
+        user=MYSQL_USER,
+        password=MYSQL_PASSWORD,
+        database=database,
+        charset="utf8mb4",
+        cursorclass=pymysql.cursors.DictCursor,
+        **options
+    )
 
-        # Close the connection without database
-        conn.close()
 
-        # Now connect to the specific database
-        conn = pymysql.connect(
-            host=MYSQL_HOST,
-            port=MYSQL_PORT,
-            user=MYSQL_USER,
-            password=MYSQL_PASSWORD,
-            database=MYSQL_DB,
-            charset="utf8mb4",
-            autocommit=False,
-            cursorclass=pymysql.cursors.DictCursor
-        )
+def _ensure_database():
+    """CREATE DATABASE IF NOT EXISTS, once per process"""
+    global _db_ready
+    with _db_lock:
+        if _db_ready:
+            return
+        # Connect without specifying database to check if MySQL is running
+        conn = _connect(database=None, autocommit=False)
+        try:
+            with conn.cursor() as cur:
+                cur.execute(f"CREATE DATABASE IF NOT EXISTS `{MYSQL_DB}`")
+            conn.commit()
+        finally:
+            conn.close()
+        _db_ready = True
 
-        return conn
+
+def get_conn():
+    """Get a dedicated database connection (caller closes it)"""
+    try:
+        _ensure_database()
+        return _connect(autocommit=False)
 
     except pymysql.Error as e:
         print(f"Database connection error: {e}")
         raise Exception(f"Failed to connect to database: {e}")
 
 
+def _checkout():
+    try:
+        conn = _pool.get_nowait()
+    except queue.Empty:
+        conn = None
+    if conn is not None and time.monotonic() - conn.last_used > POOL_PING_SECONDS:
+        try:
+            conn.ping(reconnect=False)
+        except pymysql.Error:
+            conn._force_close()
+            conn = None
+    if conn is None:
+        try:
+            _ensure_database()
+            # autocommit: reads never hold a snapshot open between uses
+            conn = _connect(autocommit=True)
+        except pymysql.Error as e:
+            print(f"Database connection error: {e}")
+            raise Exception(f"Failed to connect to database: {e}")
+    return conn
+
+
+def _checkin(conn, broken: bool):
+    if not broken:
+        conn.last_used = time.monotonic()
+        try:
+            _pool.put_nowait(conn)
+            return
+        except queue.Full:
+            pass
+    try:
+        conn.close()
+    except Exception:
+        conn._force_close()
+
+
+@contextmanager
+def pooled():
+    """A pooled autocommit connection, returned to the pool afterwards"""
+    conn = _checkout()
+    broken = False
+    try:
+        yield conn
+    except pymysql.err.InterfaceError:
+        broken = True
+        raise
+    except pymysql.err.OperationalError as e:
+        # 2xxx are client/connection errors: don't reuse the socket
+        broken = bool(e.args) and isinstance(e.args[0], int) and e.args[0] >= 2000
+        raise
+    finally:
+        _checkin(conn, broken)
+
+
+@contextmanager
+def transaction():
+    """fetch_*/exec_* calls in the block share one pooled connection and commit together"""
+    if _tx.get() is not None:
+        yield  # nested: part of the outer transaction
+        return
+    with pooled() as conn:
+        conn.begin()
+        token = _tx.set(conn)
+        try:
+            yield
+            conn.commit()
+        except BaseException:
+            try:
+                conn.rollback()
+            except pymysql.Error:
+                pass  # the connection is gone; pooled() discards it
+            raise
+        finally:
+            _tx.reset(token)
+
+
+def pool_stats() -> dict:
+    return {"pool_size": POOL_SIZE, "idle_connections": _pool.qsize()}
+
+
+@metrics.collector
+def _pool_metrics():
+    return metrics.family_lines("aegiscare_db_pool_idle_connections",
+                                "Idle connections in the query pool", "gauge",
+                                [({}, _pool.qsize())])
+
+
+def close_pool():
+    """Close idle pooled connections (e.g. on shutdown)"""
+    while True:
+        try:
+            conn = _pool.get_nowait()
+        except queue.Empty:
+            return
+        _checkin(conn, broken=True)
+
+
 def init_database():
     """Initialize database tables"""
     try:
@@ -78,42 +198,184 @@ def init_database():
         raise
 
 
-def exec_one(sql, params=None):
-    conn = get_conn()
+def _explain(sql, params):
+    with pooled() as conn, conn.cursor() as cur:
+        cur.execute("EXPLAIN " + sql, params or ())
+        return cur.fetchall()
+
+
+@contextmanager
+def _profiled(name: str, op: str, sql, params):
+    """pooled() cursor with checkout time, latency, rows and errors recorded"""
+    t0 = time.perf_counter()
+    probe = profiling.Probe()
     try:
-        with conn.cursor() as cur:
-            cur.execute(sql, params or ())
-            conn.commit()
-            return cur.lastrowid
-    finally:
-        conn.close()
+        tx = _tx.get()
+        with tracing.span(f"db {name}", tracing.KIND_CLIENT, **{"db.system": "mysql", "db.operation": op}), \
+                (nullcontext(tx) if tx is not None else pooled()) as conn:
+            t1 = time.perf_counter()
+            profiling.ACQUIRE_SECONDS.observe(t1 - t0)
+            with conn.cursor() as cur:
+                yield cur, probe
+            elapsed = time.perf_counter() - t1
+    except Exception:
+        profiling.QUERY_ERRORS.inc(query=name, op=op)
+        raise
+    profiling.record(name, op, sql, params, elapsed, probe.rows,
+                     _explain if op != "exec_many" else None)
+
+
+def exec_one(sql, params=None, touch=None):
+    """Run one statement; `touch` is a versions.touch() bump committed with it"""
+    with (transaction() if touch else nullcontext()), \
+            _profiled(profiling.caller(), "exec_one", sql, params) as (cur, probe):
+        statements.execute(cur, sql, params)
+        probe.rows = cur.rowcount
+        row_id = cur.lastrowid
+        if touch:
+            cur.execute(*touch)
+        return row_id
 
 
 def fetch_one(sql, params=None):
-    conn = get_conn()
-    try:
-        with conn.cursor() as cur:
-            cur.execute(sql, params or ())
-            return cur.fetchone()
-    finally:
-        conn.close()
+    with _profiled(profiling.caller(), "fetch_one", sql, params) as (cur, probe):
+        statements.execute(cur, sql, params)
+        row = cur.fetchone()
+        probe.rows = int(row is not None)
+        return row
 
 
 def fetch_all(sql, params=None):
-    conn = get_conn()
-    try:
-        with conn.cursor() as cur:
-            cur.execute(sql, params or ())
-            return cur.fetchall()
-    finally:
-        conn.close()
+    with _profiled(profiling.caller(), "fetch_all", sql, params) as (cur, probe):
+        statements.execute(cur, sql, params)
+        rows = cur.fetchall()
+        probe.rows = len(rows)
+        return rows
 
 
-def exec_many(sql, rows):
-    conn = get_conn()
-    try:
-        with conn.cursor() as cur:
-            cur.executemany(sql, rows)
-        conn.commit()
-    finally:
-        conn.close()
+# how long MySQL waits on a slow reader of an unbuffered result (default 60s)
+STREAM_NET_WRITE_TIMEOUT = 600
+
+
+class RowStream:
+    """
+    Rows of one query read through an unbuffered server-side cursor, in
+    batches, on a connection of its own. The query runs when the stream is
+    created, so SQL errors surface to the caller rather than mid-iteration.
+    Iterating yields lists of up to batch_size rows; the connection is
+    closed once the result is exhausted, on close(), or on leaving a `with`
+    block. Closing early drops the connection instead of reading the rest
+    of the result off the wire.
+    Opening the stream is a `db <name>` span; the query is profiled like
+    fetch_all() once the stream ends, with the time spent executing and
+    fetching (not the time the consumer held the rows) and the rows read.
+    """
+
+    def __init__(self, sql, params=None, batch_size: int = 1000, dicts: bool = True,
+                 name: str = "stream"):
+        self.batch_size = batch_size
+        self._sql, self._params, self._name = sql, params, name
+        self._rows, self._seconds = 0, 0.0
+        self._conn = None
+        t0 = time.perf_counter()
+        try:
+            with tracing.span(f"db {name}", tracing.KIND_CLIENT,
+                              **{"db.system": "mysql", "db.operation": "stream"}):
+                self._conn = get_conn()
+                t1 = time.perf_counter()
+                profiling.ACQUIRE_SECONDS.observe(t1 - t0)
+                try:
+                    self._cur = self._conn.cursor(
+                        pymysql.cursors.SSDictCursor if dicts else pymysql.cursors.SSCursor)
+                    self._cur.execute(f"SET SESSION net_write_timeout = {STREAM_NET_WRITE_TIMEOUT}")
+                    self._cur.execute(sql, params or ())
+                except Exception:
+                    conn, self._conn = self._conn, None
+                    conn.close()
+                    raise
+                self._seconds = time.perf_counter() - t1
+        except Exception:
+            profiling.QUERY_ERRORS.inc(query=name, op="stream")
+            raise
+
+    def __iter__(self):
+        try:
+            while self._conn is not None:
+                t0 = time.perf_counter()
+                try:
+                    rows = self._cur.fetchmany(self.batch_size)
+                except Exception:
+                    profiling.QUERY_ERRORS.inc(query=self._name, op="stream")
+                    raise
+                self._seconds += time.perf_counter() - t0
+                if not rows:
+                    self._finish()
+                    break
+                self._rows += len(rows)
+                yield rows
+        finally:
+            self.close()
+
+    def rows(self):
+        """One row at a time"""
+        for batch in self:
+            yield from batch
+
+    def columns(self) -> list:
+        """Every remaining row as one list per column (tuple rows: dicts=False)"""
+        out = None
+        for batch in self:
+            if out is None:
+                out = [[] for _ in batch[0]]
+            for col, values in zip(out, zip(*batch)):
+                col.extend(values)
+        return out or [[] for _ in self._cur.description or ()]
+
+    def _record(self):
+        profiling.record(self._name, "stream", self._sql, self._params, self._seconds,
+                         self._rows, _explain)
+
+    def _finish(self):
+        # fully read: the cursor can be closed without draining
+        conn, self._conn = self._conn, None
+        try:
+            self._cur.close()
+        finally:
+            conn.close()
+            self._record()
+
+    def close(self):
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        try:
+            # an unbuffered cursor would read the remaining rows on close()
+            conn.close()
+        except Exception:
+            conn._force_close()
+        self._record()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __del__(self):
+        self.close()
+
+
+def stream_all(sql, params=None, batch_size: int = 1000, dicts: bool = True) -> RowStream:
+    """Large result sets without buffering: see RowStream"""
+    return RowStream(sql, params, batch_size, dicts, profiling.caller())
+
+
+def exec_many(sql, rows, touch=None):
+    """executemany in one transaction (or the enclosing one), with an optional versions bump"""
+    with transaction(), _profiled(profiling.caller(), "exec_many", sql, None) as (cur, probe):
+        t0 = time.perf_counter()
+        cur.executemany(sql, rows)
+        probe.rows = cur.rowcount
+        statements.record(sql, time.perf_counter() - t0)
+        if touch:
+            cur.execute(*touch)
@@ -0,0 +1,164 @@
+"""
+Monthly range partitions for patient_observations.
+
+Partitions are named pYYYYMM and hold observed_at < the first day of the
+following month. Rolling splits p_future (the MAXVALUE catch-all) so new
+months exist before any row lands in them, and retention drops whole
+partitions instead of deleting rows.
+
+migrate_to_partitioned() moves a table created before partitioning over:
+it builds the partitioned table from schema.sql under another name, copies
+the rows across in id ranges and swaps the two with one RENAME TABLE.
+"""
+
+import os
+from datetime import date
+from .connection import fetch_all, fetch_one, exec_one
+from . import queries as Q
+from . import versions
+
+# MySQL TO_DAYS('0001-01-01') = 366, Python date(1, 1, 1).toordinal() = 1
+TO_DAYS_OFFSET = 365
+DEFAULT_MONTHS_AHEAD = 3
+OBS_TABLE = "patient_observations"
+MIGRATION_TABLE = "patient_observations_partitioned"
+UNPARTITIONED_TABLE = "patient_observations_unpartitioned"
+COPY_BATCH_ROWS = 50000
+SCHEMA_PATH = os.path.join(os.path.dirname(__file__), "schema.sql")
+
+
+def add_months(d: date, months: int) -> date:
+    """First day of the month `months` after d's month"""
+    m = d.year * 12 + d.month - 1 + months
+    return date(m // 12, m % 12 + 1, 1)
+
+
+def partition_name(month_start: date) -> str:
+    return f"p{month_start:%Y%m}"
+
+
+def bound_to_date(bound):
+    """information_schema PARTITION_DESCRIPTION (TO_DAYS value) to a date, None for MAXVALUE"""
+    if bound is None or str(bound).upper() == "MAXVALUE":
+        return None
+    return date.fromordinal(int(bound) - TO_DAYS_OFFSET)
+
+
+def plan_roll(partitions, today: date, months_ahead: int = DEFAULT_MONTHS_AHEAD) -> list:
+    """
+    (name, upper bound) for the monthly partitions to add so every month up to
+    `months_ahead` after today's has its own partition.
+    `partitions` are rows from SQL_LIST_OBS_PARTITIONS.
+    """
+    bounds = [bound_to_date(p["bound"]) for p in partitions]
+    last = max((b for b in bounds if b), default=None)
+    target = add_months(today, months_ahead + 1)
+    start = last or add_months(today, 0)
+    plan = []
+    while start < target:
+        end = add_months(start, 1)
+        plan.append((partition_name(start), end))
+        start = end
+    return plan
+
+
+def plan_retention(partitions, today: date, retain_months: int) -> list:
+    """Names of partitions whose rows are all older than `retain_months` full months"""
+    cutoff = add_months(today, -retain_months)
+    expired = []
+    for p in partitions:
+        bound = bound_to_date(p["bound"])
+        if bound is not None and bound <= cutoff:
+            expired.append(p["name"])
+    return expired
+
+
+def list_partitions(table: str = OBS_TABLE):
+    """Partition name, TO_DAYS bound and estimated rows, oldest first"""
+    return fetch_all(Q.SQL_LIST_OBS_PARTITIONS, (table,))
+
+
+def roll_partitions(months_ahead: int = DEFAULT_MONTHS_AHEAD, today: date = None,
+                    table: str = OBS_TABLE) -> list:
+    """Create monthly partitions up to `months_ahead` months out; returns names added"""
+    partitions = list_partitions(table)
+    if not partitions:
+        raise RuntimeError(f"{table} is not partitioned")
+    plan = plan_roll(partitions, today or date.today(), months_ahead)
+    if plan:
+        parts = ",\n".join(f"PARTITION {name} VALUES LESS THAN (TO_DAYS('{end:%Y-%m-%d}'))"
+                           for name, end in plan)
+        exec_one(Q.SQL_SPLIT_OBS_FUTURE.format(table=table, parts=parts))
+    return [name for name, _ in plan]
+
+
+def drop_expired(retain_months: int, today: date = None) -> list:
+    """Drop partitions older than `retain_months`; returns names dropped"""
+    names = plan_retention(list_partitions(), today or date.today(), retain_months)
+    if names:
+        exec_one(Q.SQL_DROP_OBS_PARTITIONS.format(names=", ".join(names)))
+        versions.bump()
+    return names
+
+
+def observations_ddl(table: str, schema_path: str = SCHEMA_PATH) -> str:
+    """schema.sql's CREATE TABLE for patient_observations, creating `table` instead"""
+    with open(schema_path) as f:
+        schema = f.read()
+    head = f"CREATE TABLE IF NOT EXISTS {OBS_TABLE} ("
+    for statement in schema.split(";"):
+        statement = statement.strip()
+        if head in statement:
+            return statement[statement.index(head):].replace(OBS_TABLE, table, 1)
+    raise RuntimeError(f"No {OBS_TABLE} table in {schema_path}")
+
+
+def copy_ranges(first_id: int, last_id: int, batch_rows: int = COPY_BATCH_ROWS) -> list:
+    """[lo, hi) id ranges covering first_id..last_id, batch_rows ids each"""
+    if first_id is None:
+        return []
+    return [(lo, min(lo + batch_rows, last_id + 1)) for lo in range(first_id, last_id + 1, batch_rows)]
+
+
+def _exists(sql, params) -> bool:
+    return fetch_one(sql, params)["n"] > 0
+
+
+def migrate_to_partitioned(months_ahead: int = DEFAULT_MONTHS_AHEAD, batch_rows: int = COPY_BATCH_ROWS,
+                           drop_old: bool = False, today: date = None, echo=print) -> dict:
+    """
+    Move patient_observations to the partitioned layout of schema.sql.
+    Run it with the API and uploads stopped: rows written during the copy are
+    not carried over. An already partitioned table only gets the indexes it
+    is missing. The old table is kept as UNPARTITIONED_TABLE unless drop_old.
+    """
+    if list_partitions():
+        added = []
+        if not _exists(Q.SQL_INDEX_EXISTS, (OBS_TABLE, "idx_obs_type_time")):
+            exec_one(Q.SQL_ADD_OBS_TYPE_TIME_INDEX)
+            added.append("idx_obs_type_time")
+        return {"migrated": False, "rows": 0, "indexes_added": added}
+    if _exists(Q.SQL_TABLE_EXISTS, (UNPARTITIONED_TABLE,)):
+        raise RuntimeError(f"{UNPARTITIONED_TABLE} already exists; drop or rename it first")
+
+    # a copy left by an interrupted run is rebuilt from scratch
+    exec_one(Q.SQL_DROP_TABLE.format(table=MIGRATION_TABLE))
+    exec_one(observations_ddl(MIGRATION_TABLE))
+    # months exist before the copy, so rows land in their own partitions
+    roll_partitions(months_ahead, today, table=MIGRATION_TABLE)
+
+    bounds = fetch_one(Q.SQL_OBS_ID_RANGE)
+    for lo, hi in copy_ranges(bounds["first_id"], bounds["last_id"], batch_rows):
+        exec_one(Q.SQL_COPY_OBS_BATCH.format(table=MIGRATION_TABLE), (lo, hi))
+        echo(f"📦 Copied observations up to id {hi - 1:,} of {bounds['last_id']:,}")
+    copied = fetch_one(Q.SQL_COUNT_ROWS.format(table=MIGRATION_TABLE))["n"]
+    expected = fetch_one(Q.SQL_COUNT_ROWS.format(table=OBS_TABLE))["n"]
+    if copied != expected:
+        raise RuntimeError(f"Copied {copied} of {expected} observations (were rows written during "
+                           f"the copy?); {OBS_TABLE} is unchanged")
+
+    exec_one(Q.SQL_SWAP_OBS_TABLES.format(old=UNPARTITIONED_TABLE, table=MIGRATION_TABLE))
+    if drop_old:
+        exec_one(Q.SQL_DROP_TABLE.format(table=UNPARTITIONED_TABLE))
+    versions.bump()
+    return {"migrated": True, "rows": copied, "indexes_added": ["idx_obs_type_time"]}
@@ -0,0 +1,89 @@
+"""
+Query profiling for the connection helpers (fetch_one/fetch_all/exec_one/
+exec_many, and stream_all once its stream ends).
+
+Each query is named after the function that issued it (e.g.
+`repo.get_dashboard_stats`), and its latency, row count and pool checkout
+time go into Prometheus histograms. Failures are counted too, including the
+ones dashboard handlers turn into {"error": ...} bodies. Queries slower than
+SLOW_QUERY_MS are printed and kept in a short in-memory log with their
+EXPLAIN plan. The plan is captured at most once per EXPLAIN_INTERVAL per query
+name, so a slow hot path cannot double its own load.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from app.core import metrics
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "250"))
+EXPLAIN_INTERVAL = 60
+SLOW_LOG_SIZE = 100
+_EXPLAINABLE = ("SELECT", "WITH", "UPDATE", "DELETE", "INSERT", "REPLACE")
+
+QUERY_SECONDS = metrics.Histogram(
+    "aegiscare_db_query_seconds", "Query latency by issuing function", ("query", "op"))
+QUERY_ROWS = metrics.Histogram(
+    "aegiscare_db_query_rows", "Rows returned or affected per query", ("query",),
+    buckets=(0, 1, 10, 100, 1000, 10000, 100000, 1000000))
+QUERY_ERRORS = metrics.Counter(
+    "aegiscare_db_query_errors_total", "Queries that raised", ("query", "op"))
+ACQUIRE_SECONDS = metrics.Histogram(
+    "aegiscare_db_connection_acquire_seconds", "Time to get a pooled connection",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0))
+SLOW_QUERIES = metrics.Counter(
+    "aegiscare_db_slow_queries_total", "Queries slower than SLOW_QUERY_MS", ("query",))
+
+_lock = threading.Lock()
+_slow_log = deque(maxlen=SLOW_LOG_SIZE)
+_explained_at = {}  # query name -> monotonic time of its last EXPLAIN
+
+
+class Probe:
+    """Filled in by the query helper while its connection is held"""
+    rows = 0
+
+
+def caller(depth: int = 2) -> str:
+    """`module.function` of the code that called the connection helper"""
+    frame = sys._getframe(depth)
+    module = frame.f_globals.get("__name__", "")
+    return f"{module.rsplit('.', 1)[-1]}.{frame.f_code.co_name}"
+
+
+def record(name: str, op: str, sql: str, params, seconds: float, rows: int, explain=None):
+    """Account one finished query; `explain(sql, params)` -> plan rows, for slow ones"""
+    QUERY_SECONDS.observe(seconds, query=name, op=op)
+    QUERY_ROWS.observe(rows, query=name)
+    ms = seconds * 1000
+    if ms < SLOW_QUERY_MS:
+        return
+    SLOW_QUERIES.inc(query=name)
+    plan = None
+    now = time.monotonic()
+    with _lock:
+        due = now - _explained_at.get(name, -EXPLAIN_INTERVAL) >= EXPLAIN_INTERVAL
+        if due:
+            _explained_at[name] = now
+    text = " ".join(sql.split())
+    if due and explain is not None and text.upper().startswith(_EXPLAINABLE):
+        try:
+            plan = explain(sql, params)
+        except Exception as e:
+            plan = [{"error": str(e)}]
+    entry = {"at": datetime.utcnow().isoformat(timespec="seconds") + "Z", "query": name,
+             "op": op, "ms": round(ms, 1), "rows": rows, "sql": text[:2000],
+             "params": len(params or ()), "explain": plan}
+    with _lock:
+        _slow_log.append(entry)
+    print(f"🐢 Slow query {name} ({op}) {ms:.0f} ms, {rows} rows"
+          + (f"; plan: {plan}" if plan else ""))
+
+
+def slow_queries() -> list:
+    """Recent slow queries, newest first (parameters are counted, never logged)"""
+    with _lock:
+        return list(reversed(_slow_log))
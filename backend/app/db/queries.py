@@ -14,7 +14,7 @@ SQL_GET_SESSION = """
 SELECT s.session_id, s.user_id, s.expires_at, u.email, u.full_name, u.role, u.is_active
 FROM sessions s
 JOIN users u ON u.id = s.user_id
-WHERE s.session_id = %s
+WHERE s.session_id = %s AND s.expires_at > UTC_TIMESTAMP()
 """
 SQL_TOUCH_SESSION = "UPDATE sessions SET last_seen_at=NOW() WHERE session_id=%s"
 SQL_DELETE_SESSION = "DELETE FROM sessions WHERE session_id=%s"
@@ -44,19 +44,69 @@ INSERT INTO patient_observations (patient_id, obs_type, value_num, value_text, u
 VALUES (%s, %s, %s, %s, %s, %s, %s)
 """
 
+# OBSERVATION PARTITIONS - monthly pYYYYMM partitions, p_history and p_future
+SQL_LIST_OBS_PARTITIONS = """
+SELECT PARTITION_NAME AS name, PARTITION_DESCRIPTION AS bound, TABLE_ROWS AS est_rows
+FROM information_schema.PARTITIONS
+WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+  AND PARTITION_NAME IS NOT NULL
+ORDER BY PARTITION_ORDINAL_POSITION
+"""
+# {parts} is a comma-separated list of "PARTITION pYYYYMM VALUES LESS THAN (TO_DAYS('...'))"
+SQL_SPLIT_OBS_FUTURE = """
+ALTER TABLE {table} REORGANIZE PARTITION p_future INTO (
+{parts},
+PARTITION p_future VALUES LESS THAN MAXVALUE)
+"""
+SQL_DROP_OBS_PARTITIONS = "ALTER TABLE patient_observations DROP PARTITION {names}"
+
+# OBSERVATIONS MIGRATION - copy an unpartitioned table into the partitioned layout
+SQL_TABLE_EXISTS = """
+SELECT COUNT(*) AS n FROM information_schema.TABLES
+WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+"""
+SQL_INDEX_EXISTS = """
+SELECT COUNT(*) AS n FROM information_schema.STATISTICS
+WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s
+"""
+SQL_OBS_ID_RANGE = "SELECT MIN(id) AS first_id, MAX(id) AS last_id FROM patient_observations"
+SQL_COPY_OBS_BATCH = """
+INSERT INTO {table} (id, patient_id, obs_type, value_num, value_text, unit, observed_at, source_upload_id)
+SELECT id, patient_id, obs_type, value_num, value_text, unit, observed_at, source_upload_id
+FROM patient_observations
+WHERE id >= %s AND id < %s
+"""
+SQL_DROP_TABLE = "DROP TABLE IF EXISTS {table}"
+SQL_COUNT_ROWS = "SELECT COUNT(*) AS n FROM {table}"
+SQL_SWAP_OBS_TABLES = "RENAME TABLE patient_observations TO {old}, {table} TO patient_observations"
+SQL_ADD_OBS_TYPE_TIME_INDEX = "ALTER TABLE patient_observations ADD INDEX idx_obs_type_time (obs_type, observed_at)"
+
 # HEART DISEASE VITAL SIGNS SUMMARY
 SQL_INSERT_VITALS_SUMMARY = """
 INSERT INTO patient_vitals_summary 
 (patient_id, chest_pain_type, resting_bp, cholesterol, fasting_bs, resting_ecg, 
-max_heart_rate, exercise_angina, st_depression, st_slope, num_vessels, thalassemia, target, last_updated)
-VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW())
+max_heart_rate, exercise_angina, st_depression, st_slope, num_vessels, thalassemia, target,
+chest_pain_type_at, resting_bp_at, cholesterol_at, fasting_bs_at, resting_ecg_at,
+max_heart_rate_at, exercise_angina_at, st_depression_at, st_slope_at, num_vessels_at,
+thalassemia_at, target_at, last_updated)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
+        UTC_TIMESTAMP(), UTC_TIMESTAMP(), UTC_TIMESTAMP(), UTC_TIMESTAMP(), UTC_TIMESTAMP(),
+        UTC_TIMESTAMP(), UTC_TIMESTAMP(), UTC_TIMESTAMP(), UTC_TIMESTAMP(), UTC_TIMESTAMP(),
+        UTC_TIMESTAMP(), UTC_TIMESTAMP(), NOW())
 ON DUPLICATE KEY UPDATE
 chest_pain_type=VALUES(chest_pain_type), resting_bp=VALUES(resting_bp), 
 cholesterol=VALUES(cholesterol), fasting_bs=VALUES(fasting_bs), 
 resting_ecg=VALUES(resting_ecg), max_heart_rate=VALUES(max_heart_rate),
 exercise_angina=VALUES(exercise_angina), st_depression=VALUES(st_depression), 
 st_slope=VALUES(st_slope), num_vessels=VALUES(num_vessels),
-thalassemia=VALUES(thalassemia), target=VALUES(target), last_updated=NOW()
+thalassemia=VALUES(thalassemia), target=VALUES(target),
+chest_pain_type_at=VALUES(chest_pain_type_at), resting_bp_at=VALUES(resting_bp_at),
+cholesterol_at=VALUES(cholesterol_at), fasting_bs_at=VALUES(fasting_bs_at),
+resting_ecg_at=VALUES(resting_ecg_at), max_heart_rate_at=VALUES(max_heart_rate_at),
+exercise_angina_at=VALUES(exercise_angina_at), st_depression_at=VALUES(st_depression_at),
+st_slope_at=VALUES(st_slope_at), num_vessels_at=VALUES(num_vessels_at),
+thalassemia_at=VALUES(thalassemia_at), target_at=VALUES(target_at),
+last_updated=NOW()
 """
 
 # PATIENT OUTCOMES AND RISK ASSESSMENT
@@ -97,13 +147,19 @@ SELECT
 """
 
 # PATIENT LISTING - Comprehensive patient data with heart disease vitals
-SQL_LIST_PATIENTS = """
-SELECT p.id, p.patient_uid, p.patient_name, p.age, p.sex, p.phone, p.created_at,
+# Patient rows keyed exactly as the API returns them, so routers serialize
+# the cursor's dicts as-is instead of copying them into response dicts
+_PATIENT_ROW = """
+SELECT p.id, p.patient_uid AS uid, p.patient_name AS name, p.age, p.sex, p.phone,
+       p.created_at, 'Unknown' AS `condition`,
        pvs.chest_pain_type, pvs.resting_bp, pvs.cholesterol, pvs.fasting_bs,
        pvs.resting_ecg, pvs.max_heart_rate, pvs.exercise_angina, pvs.st_depression,
        pvs.st_slope, pvs.num_vessels, pvs.thalassemia, pvs.target
 FROM patients p
 LEFT JOIN patient_vitals_summary pvs ON p.id = pvs.patient_id
+"""
+
+SQL_LIST_PATIENTS = _PATIENT_ROW + """
 ORDER BY p.id DESC LIMIT %s OFFSET %s
 """
 
@@ -123,16 +179,168 @@ WHERE patient_id = %s AND obs_type = %s
 ORDER BY observed_at DESC
 """
 
+# PATIENT VITALS IN A TIME WINDOW - {types} is "" or " AND obs_type IN (%s, ...)"
+SQL_GET_PATIENT_VITALS_RANGE = """
+SELECT obs_type, value_num, value_text, unit, observed_at
+FROM patient_observations
+WHERE patient_id = %s AND observed_at >= %s AND observed_at < %s{types}
+ORDER BY observed_at DESC
+"""
+
+SQL_GET_PATIENT_VITALS_SPAN = """
+SELECT MIN(observed_at) AS first_at, MAX(observed_at) AS last_at, COUNT(*) AS n
+FROM patient_observations
+WHERE patient_id = %s AND observed_at >= %s AND observed_at < %s{types}
+"""
+
+# Fixed-width time buckets per obs_type, bucket = whole bucket_seconds since the window start
+SQL_GET_PATIENT_VITALS_BUCKETS = """
+SELECT obs_type, bucket, AVG(value_num) AS value_num, MIN(value_num) AS value_min,
+       MAX(value_num) AS value_max, COUNT(*) AS n
+FROM (
+    SELECT obs_type, value_num,
+           FLOOR(TIMESTAMPDIFF(SECOND, %s, observed_at) / %s) AS bucket
+    FROM patient_observations
+    WHERE patient_id = %s AND observed_at >= %s AND observed_at < %s
+      AND value_num IS NOT NULL{types}
+) b
+GROUP BY obs_type, bucket
+ORDER BY obs_type, bucket
+"""
+
+# STREAMED OBSERVATIONS - partial summary update, NULL keeps the stored value
+# Each column has its own <col>_at: a reading older than the stored one leaves
+# that column as it is. <col>_at is assigned after <col>, since MySQL applies
+# the assignments in order and <col> must be compared with the old time.
+SQL_MERGE_VITALS_SUMMARY = """
+INSERT INTO patient_vitals_summary
+(patient_id, chest_pain_type, resting_bp, cholesterol, fasting_bs, resting_ecg,
+max_heart_rate, exercise_angina, st_depression, st_slope, num_vessels, thalassemia, target,
+chest_pain_type_at, resting_bp_at, cholesterol_at, fasting_bs_at, resting_ecg_at,
+max_heart_rate_at, exercise_angina_at, st_depression_at, st_slope_at, num_vessels_at,
+thalassemia_at, target_at, last_updated)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
+        %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW())
+ON DUPLICATE KEY UPDATE
+chest_pain_type=IF(chest_pain_type_at IS NULL OR VALUES(chest_pain_type_at) >= chest_pain_type_at, COALESCE(VALUES(chest_pain_type), chest_pain_type), chest_pain_type),
+chest_pain_type_at=IF(chest_pain_type_at IS NULL OR VALUES(chest_pain_type_at) >= chest_pain_type_at, COALESCE(VALUES(chest_pain_type_at), chest_pain_type_at), chest_pain_type_at),
+resting_bp=IF(resting_bp_at IS NULL OR VALUES(resting_bp_at) >= resting_bp_at, COALESCE(VALUES(resting_bp), resting_bp), resting_bp),
+resting_bp_at=IF(resting_bp_at IS NULL OR VALUES(resting_bp_at) >= resting_bp_at, COALESCE(VALUES(resting_bp_at), resting_bp_at), resting_bp_at),
+cholesterol=IF(cholesterol_at IS NULL OR VALUES(cholesterol_at) >= cholesterol_at, COALESCE(VALUES(cholesterol), cholesterol), cholesterol),
+cholesterol_at=IF(cholesterol_at IS NULL OR VALUES(cholesterol_at) >= cholesterol_at, COALESCE(VALUES(cholesterol_at), cholesterol_at), cholesterol_at),
+fasting_bs=IF(fasting_bs_at IS NULL OR VALUES(fasting_bs_at) >= fasting_bs_at, COALESCE(VALUES(fasting_bs), fasting_bs), fasting_bs),
+fasting_bs_at=IF(fasting_bs_at IS NULL OR VALUES(fasting_bs_at) >= fasting_bs_at, COALESCE(VALUES(fasting_bs_at), fasting_bs_at), fasting_bs_at),
+resting_ecg=IF(resting_ecg_at IS NULL OR VALUES(resting_ecg_at) >= resting_ecg_at, COALESCE(VALUES(resting_ecg), resting_ecg), resting_ecg),
+resting_ecg_at=IF(resting_ecg_at IS NULL OR VALUES(resting_ecg_at) >= resting_ecg_at, COALESCE(VALUES(resting_ecg_at), resting_ecg_at), resting_ecg_at),
+max_heart_rate=IF(max_heart_rate_at IS NULL OR VALUES(max_heart_rate_at) >= max_heart_rate_at, COALESCE(VALUES(max_heart_rate), max_heart_rate), max_heart_rate),
+max_heart_rate_at=IF(max_heart_rate_at IS NULL OR VALUES(max_heart_rate_at) >= max_heart_rate_at, COALESCE(VALUES(max_heart_rate_at), max_heart_rate_at), max_heart_rate_at),
+exercise_angina=IF(exercise_angina_at IS NULL OR VALUES(exercise_angina_at) >= exercise_angina_at, COALESCE(VALUES(exercise_angina), exercise_angina), exercise_angina),
+exercise_angina_at=IF(exercise_angina_at IS NULL OR VALUES(exercise_angina_at) >= exercise_angina_at, COALESCE(VALUES(exercise_angina_at), exercise_angina_at), exercise_angina_at),
+st_depression=IF(st_depression_at IS NULL OR VALUES(st_depression_at) >= st_depression_at, COALESCE(VALUES(st_depression), st_depression), st_depression),
+st_depression_at=IF(st_depression_at IS NULL OR VALUES(st_depression_at) >= st_depression_at, COALESCE(VALUES(st_depression_at), st_depression_at), st_depression_at),
+st_slope=IF(st_slope_at IS NULL OR VALUES(st_slope_at) >= st_slope_at, COALESCE(VALUES(st_slope), st_slope), st_slope),
+st_slope_at=IF(st_slope_at IS NULL OR VALUES(st_slope_at) >= st_slope_at, COALESCE(VALUES(st_slope_at), st_slope_at), st_slope_at),
+num_vessels=IF(num_vessels_at IS NULL OR VALUES(num_vessels_at) >= num_vessels_at, COALESCE(VALUES(num_vessels), num_vessels), num_vessels),
+num_vessels_at=IF(num_vessels_at IS NULL OR VALUES(num_vessels_at) >= num_vessels_at, COALESCE(VALUES(num_vessels_at), num_vessels_at), num_vessels_at),
+thalassemia=IF(thalassemia_at IS NULL OR VALUES(thalassemia_at) >= thalassemia_at, COALESCE(VALUES(thalassemia), thalassemia), thalassemia),
+thalassemia_at=IF(thalassemia_at IS NULL OR VALUES(thalassemia_at) >= thalassemia_at, COALESCE(VALUES(thalassemia_at), thalassemia_at), thalassemia_at),
+target=IF(target_at IS NULL OR VALUES(target_at) >= target_at, COALESCE(VALUES(target), target), target),
+target_at=IF(target_at IS NULL OR VALUES(target_at) >= target_at, COALESCE(VALUES(target_at), target_at), target_at),
+last_updated=NOW()
+"""
+# {ids} is expanded to one %s placeholder per patient id
+SQL_GET_VITALS_SUMMARIES = """
+SELECT patient_id, resting_bp, cholesterol, max_heart_rate, target,
+       resting_bp_at, cholesterol_at, max_heart_rate_at, target_at
+FROM patient_vitals_summary
+WHERE patient_id IN ({ids})
+"""
+SQL_GET_EXISTING_PATIENT_IDS = "SELECT id FROM patients WHERE id IN ({ids})"
+
+# VITALS ROLLUPS - incremental upserts, one row per bucket
+_ROLLUP_MERGE = """
+ON DUPLICATE KEY UPDATE n = n + VALUES(n), sum_value = sum_value + VALUES(sum_value),
+min_value = LEAST(min_value, VALUES(min_value)), max_value = GREATEST(max_value, VALUES(max_value))
+"""
+SQL_UPSERT_ROLLUP_HOURLY = """
+INSERT INTO obs_rollup_hourly (obs_type, bucket_start, n, sum_value, min_value, max_value)
+VALUES (%s, %s, %s, %s, %s, %s)""" + _ROLLUP_MERGE
+SQL_UPSERT_ROLLUP_DAILY = """
+INSERT INTO obs_rollup_daily (obs_type, day, n, sum_value, min_value, max_value)
+VALUES (%s, %s, %s, %s, %s, %s)""" + _ROLLUP_MERGE
+SQL_UPSERT_PATIENT_DAILY = """
+INSERT INTO patient_obs_daily (patient_id, obs_type, day, n, sum_value, min_value, max_value)
+VALUES (%s, %s, %s, %s, %s, %s, %s)""" + _ROLLUP_MERGE
+
+# Full rebuild from raw observations (after imports that bypassed ingest)
+SQL_REBUILD_ROLLUPS = [
+    "DELETE FROM obs_rollup_hourly",
+    "DELETE FROM obs_rollup_daily",
+    "DELETE FROM patient_obs_daily",
+    """
+    INSERT INTO obs_rollup_hourly (obs_type, bucket_start, n, sum_value, min_value, max_value)
+    SELECT obs_type, DATE(observed_at) + INTERVAL HOUR(observed_at) HOUR AS bucket_start,
+           COUNT(*), SUM(value_num), MIN(value_num), MAX(value_num)
+    FROM patient_observations WHERE value_num IS NOT NULL
+    GROUP BY obs_type, bucket_start
+    """,
+    """
+    INSERT INTO obs_rollup_daily (obs_type, day, n, sum_value, min_value, max_value)
+    SELECT obs_type, DATE(bucket_start) AS day, SUM(n), SUM(sum_value), MIN(min_value), MAX(max_value)
+    FROM obs_rollup_hourly GROUP BY obs_type, day
+    """,
+    """
+    INSERT INTO patient_obs_daily (patient_id, obs_type, day, n, sum_value, min_value, max_value)
+    SELECT patient_id, obs_type, DATE(observed_at) AS day,
+           COUNT(*), SUM(value_num), MIN(value_num), MAX(value_num)
+    FROM patient_observations WHERE value_num IS NOT NULL
+    GROUP BY patient_id, obs_type, day
+    """,
+]
+
+# Trend buckets from a rollup table. {table}/{col} name the rollup and its
+# time column, {patient} is "" or " AND patient_id = %s", {types} is "" or
+# " AND obs_type IN (...)". Params: window start, bucket seconds, window start,
+# window end, [patient_id,] types...
+SQL_GET_ROLLUP_BUCKETS = """
+SELECT obs_type, FLOOR(TIMESTAMPDIFF(SECOND, %s, {col}) / %s) AS bucket,
+       SUM(sum_value) / SUM(n) AS value_num, MIN(min_value) AS value_min,
+       MAX(max_value) AS value_max, SUM(n) AS n
+FROM {table}
+WHERE {col} >= %s AND {col} < %s{patient}{types}
+GROUP BY obs_type, bucket
+ORDER BY obs_type, bucket
+"""
+
+# Raw fallback for population trends finer than the hourly rollup
+SQL_GET_POPULATION_VITALS_BUCKETS = """
+SELECT obs_type, bucket, AVG(value_num) AS value_num, MIN(value_num) AS value_min,
+       MAX(value_num) AS value_max, COUNT(*) AS n
+FROM (
+    SELECT obs_type, value_num,
+           FLOOR(TIMESTAMPDIFF(SECOND, %s, observed_at) / %s) AS bucket
+    FROM patient_observations
+    WHERE observed_at >= %s AND observed_at < %s
+      AND value_num IS NOT NULL{types}
+) b
+GROUP BY obs_type, bucket
+ORDER BY obs_type, bucket
+"""
+
+SQL_GET_ROLLUP_SPAN = """
+SELECT MIN(bucket_start) AS first_at, MAX(bucket_start) AS last_at, SUM(n) AS n
+FROM obs_rollup_hourly
+WHERE bucket_start >= %s AND bucket_start < %s{types}
+"""
+
 # PATIENT SEARCH
-SQL_SEARCH_PATIENTS = """
-SELECT p.id, p.patient_uid, p.patient_name, p.age, p.sex, p.phone, p.created_at,
-       pvs.chest_pain_type, pvs.resting_bp, pvs.cholesterol, pvs.fasting_bs,
-       pvs.resting_ecg, pvs.max_heart_rate, pvs.exercise_angina, pvs.st_depression,
-       pvs.st_slope, pvs.num_vessels, pvs.thalassemia, pvs.target
-FROM patients p
-LEFT JOIN patient_vitals_summary pvs ON p.id = pvs.patient_id
+SQL_SEARCH_PATIENTS = _PATIENT_ROW + """
+WHERE p.patient_name LIKE %s OR p.patient_uid LIKE %s
+ORDER BY p.id DESC LIMIT %s OFFSET %s
+"""
+SQL_COUNT_SEARCH_PATIENTS = """
+SELECT COUNT(*) as count FROM patients p
 WHERE p.patient_name LIKE %s OR p.patient_uid LIKE %s
-ORDER BY p.id DESC
 """
 
 # VITALS SUMMARY FOR DASHBOARD
@@ -161,12 +369,160 @@ LIMIT 10
 """
 
 # PATIENT BY ID FOR ML PREDICTIONS
-SQL_GET_PATIENT_BY_ID = """
-SELECT p.id, p.patient_uid, p.patient_name, p.age, p.sex, p.phone, p.created_at,
+SQL_GET_PATIENT_BY_ID = _PATIENT_ROW + """
+WHERE p.id = %s
+"""
+
+# CLINICAL NOTES
+SQL_INSERT_NOTE = """
+INSERT INTO patient_notes (patient_id, author_user_id, note_text, summary, findings, keywords, noted_at)
+VALUES (%s, %s, %s, %s, %s, %s, %s)
+"""
+SQL_GET_PATIENT_NOTES = """
+SELECT id, patient_id, note_text, summary, findings, keywords, noted_at, author_user_id
+FROM patient_notes
+WHERE patient_id = %s
+ORDER BY noted_at DESC
+LIMIT %s
+"""
+SQL_SEARCH_NOTES = """
+SELECT n.id, n.patient_id, p.patient_uid, p.patient_name, n.note_text, n.summary,
+       n.findings, n.noted_at,
+       MATCH(n.note_text) AGAINST (%s IN NATURAL LANGUAGE MODE) AS relevance
+FROM patient_notes n
+JOIN patients p ON p.id = n.patient_id
+WHERE MATCH(n.note_text) AGAINST (%s IN NATURAL LANGUAGE MODE)
+ORDER BY relevance DESC
+LIMIT %s
+"""
+SQL_SEARCH_PATIENT_NOTES = """
+SELECT n.id, n.patient_id, p.patient_uid, p.patient_name, n.note_text, n.summary,
+       n.findings, n.noted_at,
+       MATCH(n.note_text) AGAINST (%s IN NATURAL LANGUAGE MODE) AS relevance
+FROM patient_notes n
+JOIN patients p ON p.id = n.patient_id
+WHERE n.patient_id = %s AND MATCH(n.note_text) AGAINST (%s IN NATURAL LANGUAGE MODE)
+ORDER BY relevance DESC
+LIMIT %s
+"""
+
+# WHAT-IF SIMULATION - model features for a cohort
+SQL_GET_COHORT_FEATURES = """
+SELECT p.id, p.age, p.sex,
        pvs.chest_pain_type, pvs.resting_bp, pvs.cholesterol, pvs.fasting_bs,
        pvs.resting_ecg, pvs.max_heart_rate, pvs.exercise_angina, pvs.st_depression,
-       pvs.st_slope, pvs.num_vessels, pvs.thalassemia, pvs.target
+       pvs.st_slope
+FROM patients p
+JOIN patient_vitals_summary pvs ON p.id = pvs.patient_id
+ORDER BY p.id
+LIMIT %s
+"""
+# {ids} is expanded to one %s placeholder per patient id
+SQL_GET_COHORT_FEATURES_BY_IDS = """
+SELECT p.id, p.age, p.sex,
+       pvs.chest_pain_type, pvs.resting_bp, pvs.cholesterol, pvs.fasting_bs,
+       pvs.resting_ecg, pvs.max_heart_rate, pvs.exercise_angina, pvs.st_depression,
+       pvs.st_slope
+FROM patients p
+JOIN patient_vitals_summary pvs ON p.id = pvs.patient_id
+WHERE p.id IN ({ids})
+ORDER BY p.id
+"""
+
+# RISK STRATIFICATION - each patient's latest observations per scored obs_type
+# {types} is expanded to one %s placeholder per obs_type, {filters} to optional
+# AND conditions on o.observed_at and patient demographics
+SQL_GET_RECENT_OBSERVATIONS = """
+SELECT patient_id, obs_type, value_num, rn FROM (
+    SELECT o.patient_id, o.obs_type, o.value_num,
+           ROW_NUMBER() OVER (PARTITION BY o.patient_id, o.obs_type
+                              ORDER BY o.observed_at DESC, o.id DESC) AS rn
+    FROM patient_observations o
+    JOIN patients p ON p.id = o.patient_id
+    WHERE o.obs_type IN ({types}) AND o.value_num IS NOT NULL{filters}
+) recent
+WHERE rn <= %s
+"""
+# {ids} is expanded to one %s placeholder per patient id
+SQL_GET_PATIENTS_BRIEF = """
+SELECT id, patient_uid, patient_name, age, sex FROM patients WHERE id IN ({ids})
+"""
+
+# POPULATION ANALYTICS - patient counts and summary-vital averages
+_POPULATION_AVERAGES = """
+       AVG(p.age) AS avg_age,
+       AVG(pvs.resting_bp) AS avg_resting_bp,
+       AVG(pvs.cholesterol) AS avg_cholesterol,
+       AVG(pvs.max_heart_rate) AS avg_max_heart_rate,
+       AVG(pvs.st_depression) AS avg_st_depression,
+       AVG(pvs.target) AS heart_disease_rate
 FROM patients p
 LEFT JOIN patient_vitals_summary pvs ON p.id = pvs.patient_id
-WHERE p.id = %s
 """
+SQL_GET_POPULATION_OVERVIEW = """
+SELECT COUNT(*) AS patients,
+       SUM(p.sex = 'M') AS male_patients,
+       SUM(p.sex = 'F') AS female_patients,""" + _POPULATION_AVERAGES
+# {group} and {order} come from POPULATION_GROUPS
+SQL_GET_POPULATION_BREAKDOWN = """
+SELECT {group} AS grp, COUNT(*) AS patients,""" + _POPULATION_AVERAGES + """
+GROUP BY grp
+ORDER BY {order}
+"""
+# breakdown name -> (group expression, order expression)
+POPULATION_GROUPS = {
+    "age_group": ("""CASE WHEN p.age >= 65 THEN '65+' WHEN p.age >= 45 THEN '45-64'
+                          WHEN p.age >= 18 THEN '18-44' ELSE '<18' END""", "MIN(p.age)"),
+    "condition": ("""CASE pvs.target WHEN 1 THEN 'Heart Disease' WHEN 0 THEN 'No Heart Disease'
+                          ELSE 'Unknown' END""", "grp"),
+    "chest_pain": ("""CASE pvs.chest_pain_type WHEN 0 THEN 'Typical Angina'
+                          WHEN 1 THEN 'Atypical Angina' WHEN 2 THEN 'Non-anginal Pain'
+                          WHEN 3 THEN 'Asymptomatic' ELSE 'Unknown' END""", "MIN(pvs.chest_pain_type)"),
+    "sex": ("p.sex", "grp"),
+}
+# per obs_type totals over every observation, from the daily rollup
+SQL_GET_POPULATION_OBS_AVERAGES = """
+SELECT obs_type, SUM(n) AS n, SUM(sum_value) / SUM(n) AS avg_value,
+       MIN(min_value) AS min_value, MAX(max_value) AS max_value
+FROM obs_rollup_daily
+WHERE day >= %s AND day < %s{types}
+GROUP BY obs_type
+ORDER BY obs_type
+"""
+
+# EXPORTS - read through a server-side cursor; {filters} are " AND ..." clauses
+SQL_EXPORT_PATIENTS = _PATIENT_ROW + """
+WHERE 1 = 1{filters}
+ORDER BY p.id
+"""
+# no ORDER BY: rows stream in partition / primary key order without a filesort
+SQL_EXPORT_OBSERVATIONS = """
+SELECT o.patient_id, p.patient_uid AS uid, o.obs_type, o.value_num, o.value_text, o.unit,
+       o.observed_at
+FROM patient_observations o
+JOIN patients p ON p.id = o.patient_id
+WHERE 1 = 1{filters}
+"""
+
+# DATA VERSIONS (app/db/versions.py)
+SQL_TOUCH_DATA_VERSIONS = """
+INSERT INTO data_versions (scope, version) VALUES {values}
+ON DUPLICATE KEY UPDATE version = version + 1
+"""
+SQL_GET_DATA_VERSIONS = "SELECT scope, version FROM data_versions WHERE scope IN (%s, %s, %s)"
+
+# HOT STATEMENTS - prepared once per pooled connection (app/db/statements.py);
+# names become the server-side statement names and the stats labels
+PREPARED = {
+    "get_session": SQL_GET_SESSION,
+    "touch_session": SQL_TOUCH_SESSION,
+    "get_patient_by_id": SQL_GET_PATIENT_BY_ID,
+    "list_patients": SQL_LIST_PATIENTS,
+    "count_patients": SQL_COUNT_PATIENTS,
+    "search_patients": SQL_SEARCH_PATIENTS,
+    "count_search_patients": SQL_COUNT_SEARCH_PATIENTS,
+    "patient_vitals_range": SQL_GET_PATIENT_VITALS_RANGE.format(types=""),
+    "patient_vitals_span": SQL_GET_PATIENT_VITALS_SPAN.format(types=""),
+    "patient_notes": SQL_GET_PATIENT_NOTES,
+    "data_versions": SQL_GET_DATA_VERSIONS,
+}
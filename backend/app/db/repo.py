@@ -1,7 +1,8 @@
 import uuid
 from datetime import datetime, timedelta
-from .connection import fetch_one, fetch_all, exec_one, exec_many
+from .connection import fetch_one, fetch_all, exec_one, exec_many, stream_all, transaction
 from . import queries as Q
+from . import versions
 from app.core.security import hash_password, verify_password
 
 # USERS
@@ -54,7 +55,8 @@ def start_upload(user_id: int, filename: str) -> int:
 
 
 def complete_upload(upload_id: int, rows_parsed: int, rows_loaded: int):
-    exec_one(Q.SQL_COMPLETE_UPLOAD, (rows_parsed, rows_loaded, upload_id))
+    exec_one(Q.SQL_COMPLETE_UPLOAD, (rows_parsed, rows_loaded, upload_id),
+             touch=versions.touch())
 
 
 def fail_upload(upload_id: int, error_msg: str):
@@ -67,15 +69,42 @@ def get_patient_id_by_uid(uid: str):
 
 
 def insert_patient(uid, patient_name, phone, age, sex):
-    return exec_one(Q.SQL_INSERT_PATIENT, (uid, patient_name, phone, age, sex))
+    # a new id has no cached tag of its own; list pages change with the global version
+    return exec_one(Q.SQL_INSERT_PATIENT, (uid, patient_name, phone, age, sex),
+                    touch=versions.touch([]))
 
 
 def update_patient(patient_id, patient_name, phone, age, sex):
-    exec_one(Q.SQL_UPDATE_PATIENT, (patient_name, phone, age, sex, patient_id))
+    exec_one(Q.SQL_UPDATE_PATIENT, (patient_name, phone, age, sex, patient_id),
+             touch=versions.touch([patient_id]))
 
 
 def insert_observations(rows):
-    exec_many(Q.SQL_INSERT_OBSERVATION, rows)
+    exec_many(Q.SQL_INSERT_OBSERVATION, rows, touch=versions.touch({r[0] for r in rows}))
+
+
+def merge_vitals_summaries(rows):
+    """
+    Upsert (patient_id, 12 summary columns, their 12 observed_at) rows; None,
+    or a time older than the stored one, leaves a column unchanged
+    """
+    exec_many(Q.SQL_MERGE_VITALS_SUMMARY, rows, touch=versions.touch({r[0] for r in rows}))
+
+
+def get_vitals_summaries(patient_ids):
+    """{patient_id: summary row} for the dashboard-relevant summary columns"""
+    if not patient_ids:
+        return {}
+    sql = Q.SQL_GET_VITALS_SUMMARIES.format(ids=", ".join(["%s"] * len(patient_ids)))
+    return {r["patient_id"]: r for r in fetch_all(sql, tuple(patient_ids))}
+
+
+def existing_patient_ids(patient_ids):
+    """The subset of patient_ids that exist"""
+    if not patient_ids:
+        return set()
+    sql = Q.SQL_GET_EXISTING_PATIENT_IDS.format(ids=", ".join(["%s"] * len(patient_ids)))
+    return {r["id"] for r in fetch_all(sql, tuple(patient_ids))}
 
 
 def insert_vitals_summary(patient_id, chest_pain_type, resting_bp, cholesterol, fasting_bs,
@@ -83,13 +112,14 @@ def insert_vitals_summary(patient_id, chest_pain_type, resting_bp, cholesterol,
                           st_slope, num_vessels, thalassemia, target):
     exec_one(Q.SQL_INSERT_VITALS_SUMMARY, (patient_id, chest_pain_type, resting_bp,
              cholesterol, fasting_bs, resting_ecg, max_heart_rate, exercise_angina, st_depression,
-             st_slope, num_vessels, thalassemia, target))
+             st_slope, num_vessels, thalassemia, target), touch=versions.touch([patient_id]))
 
 
 def insert_patient_outcomes(patient_id, readmission, complication, mortality,
                             readmission_risk, complication_risk, mortality_risk):
     exec_one(Q.SQL_INSERT_PATIENT_OUTCOMES, (patient_id, readmission, complication, mortality,
-             readmission_risk, complication_risk, mortality_risk))
+             readmission_risk, complication_risk, mortality_risk),
+             touch=versions.touch([patient_id]))
 
 # DASHBOARD - Comprehensive statistics
 
@@ -129,10 +159,17 @@ def list_patients(limit: int = 100, offset: int = 0):
     return fetch_all(Q.SQL_LIST_PATIENTS, (limit, offset))
 
 
-def search_patients(query: str):
-    """Search patients by name or ID"""
+def search_patients(query: str, limit: int = 100, offset: int = 0):
+    """Search patients by name or ID, one page at a time"""
     search_term = f"%{query}%"
-    return fetch_all(Q.SQL_SEARCH_PATIENTS, (search_term, search_term))
+    return fetch_all(Q.SQL_SEARCH_PATIENTS, (search_term, search_term, limit, offset))
+
+
+def count_search_patients(query: str):
+    """Number of patients search_patients() can page through"""
+    search_term = f"%{query}%"
+    result = fetch_one(Q.SQL_COUNT_SEARCH_PATIENTS, (search_term, search_term))
+    return result["count"] if result else 0
 
 
 def get_patient_vitals(patient_id: int):
@@ -145,6 +182,40 @@ def get_vitals_by_type(patient_id: int, obs_type: str):
     return fetch_all(Q.SQL_GET_VITALS_BY_TYPE, (patient_id, obs_type))
 
 
+def _types_filter(types):
+    if not types:
+        return "", ()
+    return " AND obs_type IN ({})".format(", ".join(["%s"] * len(types))), tuple(types)
+
+
+def get_patient_vitals_range(patient_id: int, start, end, types=None):
+    """Observations in [start, end), newest first, optionally for some obs_types"""
+    clause, args = _types_filter(types)
+    return fetch_all(Q.SQL_GET_PATIENT_VITALS_RANGE.format(types=clause),
+                     (patient_id, start, end) + args)
+
+
+def stream_patient_vitals_range(patient_id: int, start, end, types=None, batch_size: int = 5000):
+    """get_patient_vitals_range() as a RowStream, for full histories that are reduced as read"""
+    clause, args = _types_filter(types)
+    return stream_all(Q.SQL_GET_PATIENT_VITALS_RANGE.format(types=clause),
+                      (patient_id, start, end) + args, batch_size)
+
+
+def get_patient_vitals_span(patient_id: int, start, end, types=None):
+    """First/last timestamp and row count of a patient's observations in [start, end)"""
+    clause, args = _types_filter(types)
+    return fetch_one(Q.SQL_GET_PATIENT_VITALS_SPAN.format(types=clause),
+                     (patient_id, start, end) + args)
+
+
+def get_patient_vitals_buckets(patient_id: int, start, end, bucket_seconds: int, types=None):
+    """Per obs_type min/max/avg/count in fixed buckets counted from `start`"""
+    clause, args = _types_filter(types)
+    return fetch_all(Q.SQL_GET_PATIENT_VITALS_BUCKETS.format(types=clause),
+                     (start, bucket_seconds, patient_id, start, end) + args)
+
+
 def get_total_patients_count():
     """Get total count of patients for pagination"""
     result = fetch_one(Q.SQL_COUNT_PATIENTS)
@@ -154,3 +225,167 @@ def get_total_patients_count():
 def get_patient_by_id(patient_id: int):
     """Get patient by ID for ML predictions"""
     return fetch_one(Q.SQL_GET_PATIENT_BY_ID, (patient_id,))
+
+# CLINICAL NOTES
+
+
+def insert_notes(rows):
+    """rows: (patient_id, author_user_id, note_text, summary, findings_json, keywords_json, noted_at)"""
+    exec_many(Q.SQL_INSERT_NOTE, rows, touch=versions.touch({r[0] for r in rows}))
+
+
+def get_patient_notes(patient_id: int, limit: int = 100):
+    """Notes with their precomputed NLP findings, newest first"""
+    return fetch_all(Q.SQL_GET_PATIENT_NOTES, (patient_id, limit))
+
+
+def search_notes(query: str, patient_id: int = None, limit: int = 50):
+    """Full-text search over note text, optionally within one patient"""
+    if patient_id is None:
+        return fetch_all(Q.SQL_SEARCH_NOTES, (query, query, limit))
+    return fetch_all(Q.SQL_SEARCH_PATIENT_NOTES, (query, patient_id, query, limit))
+
+# WHAT-IF SIMULATION
+
+
+def get_cohort_features(patient_ids=None, limit: int = 10000):
+    """Model feature rows for the given patients, or the first `limit` patients"""
+    if not patient_ids:
+        return fetch_all(Q.SQL_GET_COHORT_FEATURES, (limit,))
+    sql = Q.SQL_GET_COHORT_FEATURES_BY_IDS.format(
+        ids=", ".join(["%s"] * len(patient_ids)))
+    return fetch_all(sql, tuple(patient_ids))
+
+# VITALS ROLLUPS
+
+# rollup name -> (table, time column)
+ROLLUP_TABLES = {
+    "hourly": ("obs_rollup_hourly", "bucket_start"),
+    "daily": ("obs_rollup_daily", "day"),
+    "patient_daily": ("patient_obs_daily", "day"),
+}
+
+
+def upsert_rollups(hourly, daily, patient_daily):
+    """Merge pre-aggregated (key..., n, sum, min, max) rows into the rollup tables"""
+    with transaction():
+        if hourly:
+            exec_many(Q.SQL_UPSERT_ROLLUP_HOURLY, hourly)
+        if daily:
+            exec_many(Q.SQL_UPSERT_ROLLUP_DAILY, daily)
+        if patient_daily:
+            exec_many(Q.SQL_UPSERT_PATIENT_DAILY, patient_daily)
+        versions.bump({r[0] for r in patient_daily})
+
+
+def rebuild_rollups():
+    """Recompute every rollup table from patient_observations"""
+    # one transaction: readers never see the tables empty
+    with transaction():
+        for sql in Q.SQL_REBUILD_ROLLUPS:
+            exec_one(sql)
+        versions.bump()
+
+
+def get_rollup_span(start, end, types=None):
+    """First/last hour and observation count covered by the hourly rollup"""
+    clause, args = _types_filter(types)
+    return fetch_one(Q.SQL_GET_ROLLUP_SPAN.format(types=clause), (start, end) + args)
+
+
+def get_rollup_buckets(rollup: str, start, end, bucket_seconds: int, types=None, patient_id=None):
+    """Per obs_type min/max/avg/count in buckets of whole rollup rows counted from `start`"""
+    table, col = ROLLUP_TABLES[rollup]
+    clause, args = _types_filter(types)
+    patient, pargs = ("", ()) if patient_id is None else (" AND patient_id = %s", (patient_id,))
+    sql = Q.SQL_GET_ROLLUP_BUCKETS.format(table=table, col=col, patient=patient, types=clause)
+    return fetch_all(sql, (start, bucket_seconds, start, end) + pargs + args)
+
+
+def get_population_vitals_buckets(start, end, bucket_seconds: int, types=None):
+    """get_patient_vitals_buckets() over every patient, from raw observations"""
+    clause, args = _types_filter(types)
+    return fetch_all(Q.SQL_GET_POPULATION_VITALS_BUCKETS.format(types=clause),
+                     (start, bucket_seconds, start, end) + args)
+
+# RISK STRATIFICATION
+
+
+def get_recent_observations(types, window: int, since=None, sex=None, min_age=None, max_age=None):
+    """[patient_ids, obs_types, values, ranks] columns of each patient's latest `window` values per type"""
+    filters, args = "", []
+    for clause, value in ((" AND o.observed_at >= %s", since), (" AND p.sex = %s", sex),
+                          (" AND p.age >= %s", min_age), (" AND p.age <= %s", max_age)):
+        if value is not None:
+            filters += clause
+            args.append(value)
+    sql = Q.SQL_GET_RECENT_OBSERVATIONS.format(
+        types=", ".join(["%s"] * len(types)), filters=filters)
+    # population-wide: read as tuples off an unbuffered cursor straight into columns
+    with stream_all(sql, tuple(types) + tuple(args) + (window,), dicts=False) as stream:
+        return stream.columns()
+
+
+def get_patients_brief(patient_ids):
+    """{patient_id: id, uid, name, age, sex row}"""
+    if not patient_ids:
+        return {}
+    sql = Q.SQL_GET_PATIENTS_BRIEF.format(ids=", ".join(["%s"] * len(patient_ids)))
+    return {r["id"]: r for r in fetch_all(sql, tuple(patient_ids))}
+
+# POPULATION ANALYTICS
+
+
+def get_population_overview():
+    """Patient counts with average age and summary vitals"""
+    return fetch_one(Q.SQL_GET_POPULATION_OVERVIEW)
+
+
+def get_population_breakdown(by: str):
+    """get_population_overview() averages per group of Q.POPULATION_GROUPS[by]"""
+    group, order = Q.POPULATION_GROUPS[by]
+    return fetch_all(Q.SQL_GET_POPULATION_BREAKDOWN.format(group=group, order=order))
+
+
+def get_population_obs_averages(start, end, types=None):
+    """Per obs_type count/avg/min/max over days in [start, end) from the daily rollup"""
+    clause, args = _types_filter(types)
+    return fetch_all(Q.SQL_GET_POPULATION_OBS_AVERAGES.format(types=clause),
+                     (start, end) + args)
+
+# EXPORTS
+
+
+def _in_filter(column: str, values):
+    if not values:
+        return "", ()
+    return " AND {} IN ({})".format(column, ", ".join(["%s"] * len(values))), tuple(values)
+
+
+def _export_filters(pairs):
+    """(" AND ..." clauses, args) for the (clause, value) pairs whose value is set"""
+    filters, args = "", []
+    for clause, value in pairs:
+        if value is not None:
+            filters += clause
+            args.append(value)
+    return filters, tuple(args)
+
+
+def stream_patients_export(sex=None, min_age=None, max_age=None, target=None,
+                           batch_size: int = 1000):
+    """RowStream of API-shaped patient rows, oldest first"""
+    filters, args = _export_filters(((" AND p.sex = %s", sex), (" AND p.age >= %s", min_age),
+                                     (" AND p.age <= %s", max_age), (" AND pvs.target = %s", target)))
+    return stream_all(Q.SQL_EXPORT_PATIENTS.format(filters=filters), args, batch_size)
+
+
+def stream_observations_export(patient_ids=None, types=None, start=None, end=None,
+                               batch_size: int = 1000):
+    """RowStream of observation rows in [start, end)"""
+    ids, id_args = _in_filter("o.patient_id", patient_ids)
+    kinds, type_args = _in_filter("o.obs_type", types)
+    filters, args = _export_filters(((" AND o.observed_at >= %s", start),
+                                     (" AND o.observed_at < %s", end)))
+    return stream_all(Q.SQL_EXPORT_OBSERVATIONS.format(filters=ids + kinds + filters),
+                      id_args + type_args + args, batch_size)
@@ -46,8 +46,17 @@ CREATE TABLE IF NOT EXISTS patients (
   INDEX idx_patients_sex (sex)
 ) ENGINE=InnoDB;
 
+-- Range-partitioned by observed_at month (p_future catches anything past the
+-- last rolled month). manage_db.py partitions adds months ahead and drops
+-- expired ones. MySQL does not allow foreign keys on partitioned tables and
+-- every unique key must contain observed_at, so rows are clustered on
+-- (patient_id, obs_type, observed_at, id) - the key every read path uses.
+-- idx_obs_type_time serves cross-patient scans by type and time window.
+-- Without foreign keys nothing removes a patient's observations when the
+-- patient row is deleted: delete them explicitly, or they stay as orphans.
+-- migrate_observations.py moves tables created before partitioning over.
 CREATE TABLE IF NOT EXISTS patient_observations (
-  id               BIGINT PRIMARY KEY AUTO_INCREMENT,
+  id               BIGINT NOT NULL AUTO_INCREMENT,
   patient_id       BIGINT NOT NULL,
   obs_type         VARCHAR(64) NOT NULL,
   value_num        DOUBLE NULL,
@@ -55,11 +64,46 @@ CREATE TABLE IF NOT EXISTS patient_observations (
   unit             VARCHAR(32) NULL,
   observed_at      DATETIME NOT NULL,
   source_upload_id BIGINT NULL,
-  FOREIGN KEY (patient_id) REFERENCES patients(id) ON DELETE CASCADE,
-  FOREIGN KEY (source_upload_id) REFERENCES csv_uploads(id) ON DELETE SET NULL,
-  INDEX idx_patient_obs (patient_id, obs_type, observed_at),
-  INDEX idx_obs_type (obs_type),
-  INDEX idx_observed_at (observed_at)
+  PRIMARY KEY (patient_id, obs_type, observed_at, id),
+  KEY idx_obs_id (id),
+  KEY idx_obs_type_time (obs_type, observed_at)
+) ENGINE=InnoDB
+PARTITION BY RANGE (TO_DAYS(observed_at)) (
+  PARTITION p_history VALUES LESS THAN (TO_DAYS('2026-01-01')),
+  PARTITION p_future VALUES LESS THAN MAXVALUE
+);
+
+-- VITALS ROLLUPS - count/sum/min/max of numeric observations, updated
+-- incrementally by ingest (app/services/rollups.py). avg = sum_value / n.
+CREATE TABLE IF NOT EXISTS obs_rollup_hourly (
+  obs_type     VARCHAR(64) NOT NULL,
+  bucket_start DATETIME NOT NULL,
+  n            BIGINT NOT NULL,
+  sum_value    DOUBLE NOT NULL,
+  min_value    DOUBLE NOT NULL,
+  max_value    DOUBLE NOT NULL,
+  PRIMARY KEY (obs_type, bucket_start)
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS obs_rollup_daily (
+  obs_type     VARCHAR(64) NOT NULL,
+  day          DATE NOT NULL,
+  n            BIGINT NOT NULL,
+  sum_value    DOUBLE NOT NULL,
+  min_value    DOUBLE NOT NULL,
+  max_value    DOUBLE NOT NULL,
+  PRIMARY KEY (obs_type, day)
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS patient_obs_daily (
+  patient_id   BIGINT NOT NULL,
+  obs_type     VARCHAR(64) NOT NULL,
+  day          DATE NOT NULL,
+  n            BIGINT NOT NULL,
+  sum_value    DOUBLE NOT NULL,
+  min_value    DOUBLE NOT NULL,
+  max_value    DOUBLE NOT NULL,
+  PRIMARY KEY (patient_id, obs_type, day)
 ) ENGINE=InnoDB;
 
 -- HEART DISEASE VITAL SIGNS SUMMARY TABLE (for quick dashboard access)
@@ -78,6 +122,18 @@ CREATE TABLE IF NOT EXISTS patient_vitals_summary (
   num_vessels           INT NULL,                    -- Number of major vessels colored by fluoroscopy
   thalassemia           INT NULL,                    -- Thalassemia (0-3)
   target                INT NULL,                    -- Heart disease (1=yes, 0=no)
+  chest_pain_type_at    DATETIME NULL,               -- Observation time (UTC) of each column value:
+  resting_bp_at         DATETIME NULL,               -- streamed readings older than the stored one
+  cholesterol_at        DATETIME NULL,               -- leave that column as it is
+  fasting_bs_at         DATETIME NULL,
+  resting_ecg_at        DATETIME NULL,
+  max_heart_rate_at     DATETIME NULL,
+  exercise_angina_at    DATETIME NULL,
+  st_depression_at      DATETIME NULL,
+  st_slope_at           DATETIME NULL,
+  num_vessels_at        DATETIME NULL,
+  thalassemia_at        DATETIME NULL,
+  target_at             DATETIME NULL,
   last_updated          DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
   FOREIGN KEY (patient_id) REFERENCES patients(id) ON DELETE CASCADE,
   UNIQUE KEY unique_patient (patient_id),
@@ -107,4 +163,28 @@ CREATE TABLE IF NOT EXISTS patient_outcomes (
   INDEX idx_outcomes_readmission_risk (readmission_risk),
   INDEX idx_outcomes_complication_risk (complication_risk),
   INDEX idx_outcomes_mortality_risk (mortality_risk)
-) ENGINE=InnoDB;
\ No newline at end of file
+) ENGINE=InnoDB;
+-- CLINICAL NOTES (NLP findings are computed once at write time)
+CREATE TABLE IF NOT EXISTS patient_notes (
+  id                    BIGINT PRIMARY KEY AUTO_INCREMENT,
+  patient_id            BIGINT NOT NULL,
+  author_user_id        BIGINT NULL,
+  note_text             TEXT NOT NULL,
+  summary               VARCHAR(1024) NULL,          -- ml.nlp summary line
+  findings              JSON NULL,                   -- ["Hypertension noted", ...]
+  keywords              JSON NULL,                   -- {"bp": 2, ...}
+  noted_at              DATETIME NOT NULL,
+  created_at            DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  FOREIGN KEY (patient_id) REFERENCES patients(id) ON DELETE CASCADE,
+  FOREIGN KEY (author_user_id) REFERENCES users(id) ON DELETE SET NULL,
+  INDEX idx_notes_patient (patient_id, noted_at),
+  FULLTEXT INDEX ftx_notes_text (note_text)
+) ENGINE=InnoDB;
+
+-- DATA VERSIONS for ETags, shared by every API worker (app/db/versions.py)
+CREATE TABLE IF NOT EXISTS data_versions (
+  scope                 VARCHAR(16) PRIMARY KEY,     -- epoch | all | patients | b<bucket>
+  version               BIGINT NOT NULL DEFAULT 0
+) ENGINE=InnoDB;
+
+INSERT IGNORE INTO data_versions (scope, version) VALUES ('epoch', FLOOR(RAND() * 1000000000000));
@@ -0,0 +1,126 @@
+"""
+Server-side prepared statements for the hot queries, plus per-statement stats.
+
+pymysql only speaks the text protocol, so statements in Q.PREPARED are
+prepared with SQL `PREPARE ... FROM` the first time a pooled connection runs
+them, and afterwards sent as `SET @p0 = ..., ...` then `EXECUTE ... USING
+@p0, ...`, so MySQL parses and plans them once per connection. That is two
+round trips for statements with parameters: connections never enable
+multi-statements, so a mistake in string-built SQL cannot stack queries.
+Anything else, or any statement MySQL cannot prepare (ER_UNSUPPORTED_PS),
+runs as plain text.
+
+Every statement run through execute() is counted: calls, how many of them
+used a prepared handle, and cumulative wall time.
+"""
+
+import os
+import threading
+import time
+import pymysql
+from pymysql.constants import ER
+from app.core import metrics
+from . import queries as Q
+
+ENABLED = os.getenv("MYSQL_PREPARED_STATEMENTS", "1") == "1"
+PARAM_VAR = "@aegis_p{}"
+
+# SQL text -> statement name
+_names = {" ".join(sql.split()): name for name, sql in Q.PREPARED.items()}
+_refused = set()  # names MySQL cannot prepare (ER_UNSUPPORTED_PS)
+
+_stats_lock = threading.Lock()
+_stats = {}  # label -> [calls, prepared calls, seconds]
+
+
+def label(sql: str) -> str:
+    """Statement name for prepared statements, else the start of the normalized SQL"""
+    text = " ".join(sql.split())
+    return _names.get(text) or text[:80]
+
+
+def _record(name: str, prepared: bool, seconds: float):
+    with _stats_lock:
+        s = _stats.setdefault(name, [0, 0, 0.0])
+        s[0] += 1
+        s[1] += prepared
+        s[2] += seconds
+
+
+def _prepare(cur, conn, name: str, sql: str) -> bool:
+    """PREPARE `name` on this connection once; False to run it as text this time"""
+    prepared = getattr(conn, "prepared", None)
+    if prepared is None:
+        prepared = conn.prepared = set()
+    if name in prepared:
+        return True
+    try:
+        cur.execute(f"PREPARE aegis_{name} FROM %s", (sql.replace("%s", "?"),))
+    except pymysql.MySQLError as e:
+        code = e.args[0] if e.args and isinstance(e.args[0], int) else None
+        if code is None or code >= 2000:
+            raise  # client/connection errors, not a refusal
+        if code == ER.UNSUPPORTED_PS:
+            print(f"⚠️  Not preparing {name}: {e}")
+            _refused.add(name)
+        # anything else (lock waits, deadlocks, ...) may pass: try again next time
+        return False
+    prepared.add(name)
+    return True
+
+
+def execute(cur, sql: str, params=None):
+    """cur.execute(sql, params), through this connection's prepared handle when there is one"""
+    params = tuple(params or ())
+    text = " ".join(sql.split())
+    name = _names.get(text) if ENABLED else None
+    t0 = time.perf_counter()
+    if name and name not in _refused and _prepare(cur, cur.connection, name, text):
+        if params:
+            names = ", ".join(PARAM_VAR.format(i) for i in range(len(params)))
+            sets = ", ".join(f"{PARAM_VAR.format(i)} = %s" for i in range(len(params)))
+            cur.execute(f"SET {sets}", params)
+            cur.execute(f"EXECUTE aegis_{name} USING {names}")
+        else:
+            cur.execute(f"EXECUTE aegis_{name}")
+        _record(name, True, time.perf_counter() - t0)
+        return
+    cur.execute(sql, params)
+    _record(name or text[:80], False, time.perf_counter() - t0)
+
+
+def record(sql: str, seconds: float):
+    """Count a statement that did not go through execute() (e.g. executemany)"""
+    _record(label(sql), False, seconds)
+
+
+def stats() -> list:
+    """Per-statement calls, prepared calls and cumulative/average ms, busiest first"""
+    with _stats_lock:
+        items = [(name, list(s)) for name, s in _stats.items()]
+    return sorted(({"statement": name, "calls": calls, "prepared_calls": prepared,
+                    "total_ms": round(seconds * 1000, 3),
+                    "avg_ms": round(seconds * 1000 / calls, 3)}
+                   for name, (calls, prepared, seconds) in items),
+                  key=lambda s: s["total_ms"], reverse=True)
+
+
+def reset():
+    with _stats_lock:
+        _stats.clear()
+
+
+@metrics.collector
+def _metric_lines():
+    rows = stats()
+    calls = []
+    for s in rows:
+        calls.append(({"statement": s["statement"], "prepared": "true"}, s["prepared_calls"]))
+        calls.append(({"statement": s["statement"], "prepared": "false"},
+                      s["calls"] - s["prepared_calls"]))
+    return (metrics.family_lines("aegiscare_db_statement_calls_total",
+                                 "Statement executions by prepared handle use", "counter", calls)
+            + metrics.family_lines("aegiscare_db_statement_seconds_total",
+                                   "Cumulative statement time", "counter",
+                                   [({"statement": s["statement"]}, s["total_ms"] / 1000)
+                                    for s in rows]))
@@ -0,0 +1,63 @@
+"""
+Shared data versions for conditional GETs.
+
+Versions live in the data_versions table, so every API worker and the
+manage_db.py CLI see the same ones. Repository writes bump them in the same
+transaction as the data (exec_one/exec_many `touch=touch(...)`), so a tag
+can never move ahead of what a reader sees. Scopes:
+- `all`: every write, for global read endpoints
+- `patients`: writes that may have touched any patient
+- `b<n>`: one of PATIENT_BUCKETS hashed patient slots, so a write only
+  invalidates the patients that share its slot and the table stays small
+The `epoch` row is random per database, so tags from a database that was
+dropped and recreated never match.
+"""
+
+from . import queries as Q
+from .connection import exec_one, fetch_all
+
+PATIENT_BUCKETS = 4096
+
+
+def _bucket(patient_id) -> str:
+    return f"b{int(patient_id) % PATIENT_BUCKETS}"
+
+
+def touch(patient_ids=None) -> tuple:
+    """(sql, params) bumping the versions a write changes; patient_ids=None means every patient"""
+    scopes = {"all", "patients"} if patient_ids is None else {"all"} | {_bucket(p) for p in patient_ids}
+    # one lock order for every writer, so concurrent bumps cannot deadlock
+    scopes = sorted(scopes)
+    return (Q.SQL_TOUCH_DATA_VERSIONS.format(values=", ".join(["(%s, 1)"] * len(scopes))),
+            tuple(scopes))
+
+
+def bump(patient_ids=None):
+    """Bump versions on their own, after writes that cannot share a transaction (DDL)"""
+    exec_one(*touch(patient_ids))
+
+
+def read(first: str, second: str) -> dict:
+    """{scope: version} for the epoch and two scopes (missing scopes are 0)"""
+    rows = fetch_all(Q.SQL_GET_DATA_VERSIONS, ("epoch", first, second))
+    return {r["scope"]: r["version"] for r in rows}
+
+
+def etag(patient_id: int = None) -> str:
+    """Strong ETag for the current data: global, or for one patient's resources"""
+    if patient_id is None:
+        v = read("all", "all")
+        return f'"{v.get("epoch", 0):x}-{v.get("all", 0)}"'
+    bucket = _bucket(patient_id)
+    v = read("patients", bucket)
+    return f'"{v.get("epoch", 0):x}-p{patient_id}-{v.get("patients", 0)}.{v.get(bucket, 0)}"'
+
+
+def matches(if_none_match: str, tag: str) -> bool:
+    """RFC 9110 If-None-Match: '*' or any listed tag (weak comparison)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    bare = tag.removeprefix("W/")
+    return any(t.strip().removeprefix("W/") == bare for t in if_none_match.split(","))
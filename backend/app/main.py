@@ -1,8 +1,19 @@
 from fastapi import FastAPI
-from app.api.routers import auth, uploads, dashboard, patients
-from app.db.connection import init_database
+from fastapi.responses import Response
+from app.api.routers import auth, uploads, dashboard, patients, notes, simulations, observations, events, analytics, exports, diagnostics
+from app.api.formats import TracedJSONResponse
+from app.core import metrics, tracing
+from app.core.compression import CompressionMiddleware
+from app.core.tracing import TracingMiddleware
+from app.db.connection import close_pool, init_database
+from app.db.partitions import roll_partitions
+from app.services.stream import batcher
 
-app = FastAPI(title="AegisCare API")
+app = FastAPI(title="AegisCare API", default_response_class=TracedJSONResponse)
+# gzip/brotli for large JSON and columnar bodies
+app.add_middleware(CompressionMiddleware)
+# outermost, so request latency includes compression
+app.add_middleware(TracingMiddleware)
 
 
 @app.on_event("startup")
@@ -14,8 +25,38 @@ async def startup_event():
     except Exception as e:
         print(f"❌ Failed to initialize database: {e}")
         # Don't crash the app, just log the error
+        return
+    try:
+        # keep monthly observation partitions ahead of ingest
+        added = roll_partitions()
+        if added:
+            print(f"📅 Added observation partitions: {', '.join(added)}")
+    except Exception as e:
+        print(f"⚠️  Could not roll observation partitions: {e}")
+
+
+@app.on_event("shutdown")
+def shutdown_event():
+    """Commit streamed observations still in the queue and flush exported traces"""
+    batcher.close()
+    close_pool()
+    tracing.shutdown()
+
 
 app.include_router(auth.router)
 app.include_router(uploads.router)
 app.include_router(dashboard.router)
 app.include_router(patients.router)
+app.include_router(notes.router)
+app.include_router(simulations.router)
+app.include_router(observations.router)
+app.include_router(events.router)
+app.include_router(analytics.router)
+app.include_router(exports.router)
+app.include_router(diagnostics.router)
+
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Prometheus text exposition of query, pool and statement metrics"""
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
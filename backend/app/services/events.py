@@ -0,0 +1,171 @@
+"""
+In-process publish/subscribe for dashboard deltas, served as Server-Sent Events.
+
+Writers (CSV ingest, the streamed-observation writer thread) publish small
+count deltas shaped like the /dashboard/stats and /dashboard/vitals-summary
+responses. Each SSE client gets a bounded queue; a client that falls behind
+gets a single "resync" event instead of an unbounded backlog.
+
+The broker and its event ids live in one API process. With several uvicorn
+workers, a dashboard only hears about writes handled by the worker serving
+its stream, and X-Event-Id marks from other workers do not line up with its
+ids. Run one worker for live dashboards, or poll the ETag-revalidated
+endpoints instead.
+"""
+
+import asyncio
+import json
+import math
+import threading
+from collections import deque
+
+HISTORY_SIZE = 256
+QUEUE_SIZE = 100
+HEARTBEAT_SECONDS = 15.0
+
+# /dashboard/vitals-summary group -> (summary column, [(label, exclusive upper bound)])
+# matching the thresholds of SQL_GET_VITALS_SUMMARY on the INT columns
+SUMMARY_RANGES = {
+    "blood_pressure_ranges": ("resting_bp", [("normal", 120), ("elevated", 130), ("high", None)]),
+    "heart_rate_ranges": ("max_heart_rate", [("low", 60), ("normal", 101), ("high", None)]),
+    "cholesterol_ranges": ("cholesterol", [("normal", 200), ("borderline", 240), ("high", None)]),
+}
+
+
+def summary_buckets(row) -> dict:
+    """(group, label) counts one vitals summary row contributes, as in SQL_GET_VITALS_SUMMARY"""
+    out = {}
+    if not row:
+        return out
+    for group, (col, ranges) in SUMMARY_RANGES.items():
+        value = row.get(col)
+        if value is None:
+            continue
+        # the columns are INT, MySQL rounds half away from zero on write
+        value = math.floor(float(value) + 0.5)
+        for label, upper in ranges:
+            if upper is None or value < upper:
+                out[(group, label)] = 1
+                break
+    target = row.get("target")
+    if target in (0, 1):
+        out[("heart_disease_status", "heart_disease" if target == 1 else "healthy")] = 1
+    return out
+
+
+def summary_delta(old_rows: dict, new_rows: dict) -> dict:
+    """
+    Change in dashboard counts when patients' summaries go from old_rows to
+    new_rows ({patient_id: summary dict}, missing = no summary). Returns
+    {"stats": {...}, "vitals_summary": {group: {label: n}}} with zeros dropped.
+    """
+    counts = {}
+    for pid in set(old_rows) | set(new_rows):
+        for key, n in summary_buckets(new_rows.get(pid)).items():
+            counts[key] = counts.get(key, 0) + n
+        for key, n in summary_buckets(old_rows.get(pid)).items():
+            counts[key] = counts.get(key, 0) - n
+    vitals, stats = {}, {}
+    for (group, label), n in counts.items():
+        if n:
+            vitals.setdefault(group, {})[label] = n
+    status = vitals.get("heart_disease_status", {})
+    if status.get("heart_disease"):
+        stats["heart_disease_count"] = status["heart_disease"]
+    if status.get("healthy"):
+        stats["healthy_count"] = status["healthy"]
+    bp = sum(vitals.get("blood_pressure_ranges", {}).values())
+    if bp:
+        vitals["total_patients"] = bp
+    return {"stats": stats, "vitals_summary": vitals}
+
+
+def format_sse(event_id: int, event: str, data: dict) -> str:
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+class EventBroker:
+    """Fan-out of published events to asyncio subscriber queues, safe to publish from any thread"""
+
+    def __init__(self, history: int = HISTORY_SIZE, queue_size: int = QUEUE_SIZE):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._history = deque(maxlen=history)
+        self._queue_size = queue_size
+        self.last_id = 0
+
+    def publish(self, event: str, data: dict):
+        with self._lock:
+            self.last_id += 1
+            item = (self.last_id, event, data)
+            self._history.append(item)
+            subscribers = list(self._subscribers)
+        for loop, q in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._offer, q, item)
+            except RuntimeError:
+                # subscriber's event loop already closed
+                with self._lock:
+                    self._subscribers.discard((loop, q))
+
+    def _offer(self, q: asyncio.Queue, item):
+        if q.full():
+            # too far behind for deltas to be useful: drop them and ask for a re-fetch
+            while not q.empty():
+                q.get_nowait()
+            item = (item[0], "resync", {"reason": "client too slow"})
+        q.put_nowait(item)
+
+    def since(self, last_id: int):
+        """Buffered events after last_id, or None if some were evicted (or ids restarted)"""
+        with self._lock:
+            if last_id > self.last_id:
+                # ids from before this process started
+                return None
+            if last_id == self.last_id:
+                return []
+            if not self._history or self._history[0][0] > last_id + 1:
+                return None
+            return [item for item in self._history if item[0] > last_id]
+
+    async def stream(self, last_id: int = None):
+        """SSE text chunks: replay after last_id, then live events and heartbeats"""
+        q = asyncio.Queue(maxsize=self._queue_size)
+        sub = (asyncio.get_running_loop(), q)
+        with self._lock:
+            self._subscribers.add(sub)
+            current = self.last_id
+        try:
+            yield "retry: 3000\n\n"
+            if last_id is not None:
+                missed = self.since(last_id)
+                if missed is None:
+                    yield format_sse(current, "resync", {"reason": "history expired"})
+                else:
+                    for item in missed:
+                        if item[0] <= current:
+                            yield format_sse(*item)
+            else:
+                yield format_sse(current, "hello", {"last_id": current})
+            while True:
+                try:
+                    item = await asyncio.wait_for(q.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                if item[0] > current:
+                    yield format_sse(*item)
+        finally:
+            with self._lock:
+                self._subscribers.discard(sub)
+
+
+broker = EventBroker()
+
+
+def publish_delta(source: str, stats: dict = None, vitals_summary: dict = None, **extra):
+    """Publish a dashboard "delta" event"""
+    data = {"source": source, "stats": {k: v for k, v in (stats or {}).items() if v},
+            "vitals_summary": vitals_summary or {}}
+    data.update(extra)
+    broker.publish("delta", data)
@@ -2,6 +2,9 @@ import csv
 import io
 from datetime import datetime
 from app.db import repo
+from app.services import events
+from app.services.notes import add_notes
+from app.services.rollups import update_rollups
 
 
 def ingest_csv(user_id: int, filename: str, file_bytes: bytes):
@@ -21,6 +24,10 @@ def ingest_csv(user_id: int, filename: str, file_bytes: bytes):
         obs_rows = []
         # Store vitals summaries for dashboard performance
         vitals_summaries = {}
+        # Optional free-text clinical notes column
+        note_rows = []
+        # patient_id -> (age, sex) for patients created by this upload, for dashboard deltas
+        new_patients = {}
 
         for row in reader:
             rows_parsed += 1
@@ -51,6 +58,7 @@ def ingest_csv(user_id: int, filename: str, file_bytes: bytes):
             if not pid:
                 pid = repo.insert_patient(
                     patient_id, patient_name, phone, age, sex)
+                new_patients[pid] = (age, sex)
             else:
                 # Update existing patient with new information
                 repo.update_patient(pid, patient_name, phone, age, sex)
@@ -94,12 +102,9 @@ def ingest_csv(user_id: int, filename: str, file_bytes: bytes):
                 val = row.get(csv_key)
                 if val not in (None, "", "NaN", "nan", "-1"):
                     try:
-                        # Handle special cases
-                        if csv_key == "Fasting Blood Sugar":
-                            # Convert to binary (1 if > 120, 0 otherwise)
-                            num_val = 1 if float(val) > 120 else 0
-                        else:
-                            num_val = float(val)
+                        # Fasting Blood Sugar is already the 0/1 "> 120 mg/dl"
+                        # flag the model is trained on, so it is stored as-is
+                        num_val = float(val)
 
                         # Store observation
                         obs_rows.append(
@@ -138,11 +143,20 @@ def ingest_csv(user_id: int, filename: str, file_bytes: bytes):
 
             # Store vitals summary for this patient
             vitals_summaries[pid] = patient_vitals
+
+            note_text = (row.get("clinical_notes") or row.get("notes") or "").strip()
+            if note_text:
+                note_rows.append((pid, note_text, now))
             rows_loaded += 1
 
         # Insert all observations
         if obs_rows:
             repo.insert_observations(obs_rows)
+            update_rollups(obs_rows)
+
+        # Previous summaries of re-uploaded patients, to publish exact deltas
+        old_summaries = repo.get_vitals_summaries(
+            [pid for pid in vitals_summaries if pid not in new_patients])
 
         # Insert vitals summaries for dashboard performance
         for pid, vitals in vitals_summaries.items():
@@ -162,13 +176,34 @@ def ingest_csv(user_id: int, filename: str, file_bytes: bytes):
                 vitals['target']
             )
 
+        # Notes are analyzed by ml.nlp once, at write time
+        if note_rows:
+            add_notes(note_rows, author_user_id=user_id)
+
         repo.complete_upload(upload_id, rows_parsed, rows_loaded)
 
+        delta = events.summary_delta(old_summaries, vitals_summaries)
+        events.publish_delta(
+            "upload",
+            {
+                "total_patients": len(new_patients),
+                "total_observations": len(obs_rows),
+                "total_uploads": 1,
+                "male_patients": sum(1 for _, sex in new_patients.values() if sex == "M"),
+                "female_patients": sum(1 for _, sex in new_patients.values() if sex == "F"),
+                **delta["stats"],
+            },
+            delta["vitals_summary"],
+            new_patients_age_sum=sum(age for age, _ in new_patients.values()),
+            upload_id=upload_id,
+        )
+
         return {
             "upload_id": upload_id,
             "rows_parsed": rows_parsed,
             "rows_loaded": rows_loaded,
-            "patients_processed": len(vitals_summaries)
+            "patients_processed": len(vitals_summaries),
+            "notes_loaded": len(note_rows)
         }
 
     except Exception as e:
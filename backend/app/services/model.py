@@ -0,0 +1,79 @@
+import json
+import os
+from app.core import tracing
+from app.core.config import COMPILED_MODEL_PATH, EVAL_REPORT_PATH
+from ml.compiled import load_compiled
+
+# Returned when ml/evaluate.py has not been run yet
+DEFAULT_META = {"version": "untrained", "trained": None,
+                "auroc": None, "evaluated": None}
+
+_report_cache = {"mtime": None, "meta": DEFAULT_META}
+_model_cache = {"mtime": None, "model": None}
+
+
+def _summarize_report(report: dict) -> dict:
+    """Keep the fields the API needs; drop calibration bins and latency detail"""
+    return {
+        "version": report.get("version"),
+        "trained": report.get("trained"),
+        "evaluated": report.get("evaluated"),
+        "holdout_rows": report.get("holdout_rows"),
+        "auroc": report.get("auroc"),
+        "metrics": {
+            outcome: {
+                "auroc": m.get("auroc"),
+                "brier": m.get("brier"),
+                "ece": m.get("calibration", {}).get("ece"),
+                "f1": m.get("f1"),
+            }
+            for outcome, m in report.get("metrics", {}).items()
+        },
+        "latency_p50_ms": report.get("latency", {}).get("single_row", {}).get("p50_ms"),
+    }
+
+
+def get_model_meta(path: str = EVAL_REPORT_PATH) -> dict:
+    """Model metadata from the latest evaluation report, reloaded when the file changes"""
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return DEFAULT_META
+    if mtime != _report_cache["mtime"]:
+        with open(path, "r") as f:
+            _report_cache["meta"] = _summarize_report(json.load(f))
+        _report_cache["mtime"] = mtime
+    return _report_cache["meta"]
+
+
+def get_risk_model(path: str = COMPILED_MODEL_PATH):
+    """Compiled NumPy risk model (ml/compiled.py), or None if it has not been exported"""
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    if mtime != _model_cache["mtime"]:
+        _model_cache["model"] = load_compiled(path)
+        _model_cache["mtime"] = mtime
+    return _model_cache["model"]
+
+
+def model_tag() -> str:
+    """Changes whenever the served model or its evaluation report does (for ETags)"""
+    stamps = []
+    for path in (COMPILED_MODEL_PATH, EVAL_REPORT_PATH):
+        try:
+            stamps.append(f"{os.stat(path).st_mtime_ns:x}")
+        except OSError:
+            stamps.append("0")
+    return "m" + ".".join(stamps)
+
+
+def score_patient(patient: dict):
+    """Outcome probabilities for one patient row, or None without a model"""
+    model = get_risk_model()
+    if model is None:
+        return None
+    with tracing.span("model score_patient"):
+        proba = model.predict_patients([patient])
+    return {outcome: float(p[0]) for outcome, p in proba.items()}
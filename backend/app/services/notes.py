@@ -0,0 +1,45 @@
+import json
+from datetime import datetime
+from app.db import repo
+from ml import nlp
+
+
+def add_notes(notes, author_user_id: int = None):
+    """
+    Store clinical notes with their NLP analysis.
+    notes: iterable of (patient_id, text, noted_at or None). The NLP pass runs
+    once here so reads never have to re-analyze note text.
+    """
+    notes = list(notes)
+    results = nlp.summarize_many([text for _, text, _ in notes])
+    now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+    rows = []
+    for (patient_id, text, noted_at), r in zip(notes, results):
+        rows.append((patient_id, author_user_id, text, r["summary"],
+                     json.dumps(r["findings"]), json.dumps(r["keywords"]),
+                     noted_at or now))
+    if rows:
+        repo.insert_notes(rows)
+    return results
+
+
+def _decode(row: dict) -> dict:
+    """JSON columns come back from pymysql as strings"""
+    for key, empty in (("findings", []), ("keywords", {})):
+        val = row.get(key)
+        if isinstance(val, (str, bytes)):
+            row[key] = json.loads(val)
+        elif val is None and key in row:
+            row[key] = empty
+    return row
+
+
+def get_patient_notes(patient_id: int, limit: int = 100) -> dict:
+    """A patient's notes plus a combined summary from the stored findings"""
+    notes = [_decode(r) for r in repo.get_patient_notes(patient_id, limit)]
+    return {"patient_id": patient_id, "notes": notes, "total_notes": len(notes),
+            **nlp.combine_results(notes)}
+
+
+def search_notes(query: str, patient_id: int = None, limit: int = 50) -> list:
+    return [_decode(r) for r in repo.search_notes(query, patient_id, limit)]
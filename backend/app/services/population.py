@@ -0,0 +1,41 @@
+"""
+Population-level aggregates for the analytics pages.
+
+Everything is grouped in SQL (patients joined to their vitals summary) or
+read from the daily observation rollup, so responses are a handful of rows
+however many patients and observations there are.
+"""
+
+from decimal import Decimal
+from app.db import repo
+from app.db.queries import POPULATION_GROUPS
+
+BREAKDOWNS = tuple(POPULATION_GROUPS)
+COUNT_COLUMNS = {"patients", "male_patients", "female_patients", "n"}
+
+
+def _clean(row: dict, digits: int = 2) -> dict:
+    """MySQL SUM/AVG come back as Decimal (None over no rows): counts to int, the rest rounded"""
+    out = {}
+    for key, value in row.items():
+        if isinstance(value, (Decimal, float)):
+            value = int(value) if key in COUNT_COLUMNS else round(float(value), digits)
+        out[key] = value
+    return out
+
+
+def get_overview(start, end, types=None) -> dict:
+    """Patient counts, summary-vital averages and per obs_type observation averages"""
+    overview = _clean(repo.get_population_overview() or {})
+    observations = [_clean(r) for r in repo.get_population_obs_averages(start, end, types)]
+    return {"patients": overview, "observations": observations}
+
+
+def get_breakdown(by: str) -> dict:
+    """Summary-vital averages per group; ValueError for unknown groupings"""
+    if by not in POPULATION_GROUPS:
+        raise ValueError(f"Unknown breakdown '{by}' (one of: {', '.join(BREAKDOWNS)})")
+    rows = [_clean(r) for r in repo.get_population_breakdown(by)]
+    for r in rows:
+        r[by] = r.pop("grp")
+    return {"by": by, "groups": rows}
@@ -0,0 +1,147 @@
+"""
+Early-warning risk scoring over the whole patient population.
+
+Each patient's latest EWS_WINDOW values of every scored obs_type come back
+from one query and are scored in a single vectorized pass: the latest value
+is checked against the type's normal range (2 points when out of range) and
+against the window mean (1 point when moving in the adverse direction).
+"""
+
+from datetime import datetime, timedelta
+import numpy as np
+from app.db import repo
+
+EWS_WINDOW = 24
+# (level, minimum score), highest first
+LEVELS = (("High", 4), ("Medium", 2), ("Low", 0))
+STATUS_LABELS = {-1: "LOW", 0: "NORMAL", 1: "HIGH"}
+TREND_LABELS = {-1: "DOWN", 0: "STABLE", 1: "UP"}
+
+# obs_type -> (low, high, adverse trend): LOW below low, HIGH above high (None
+# for no bound), adverse trend 1 when rising is worse, -1 when falling is, 0 neither
+EWS_RULES = {
+    "HEART_RATE": (60, 100, 1),
+    "BP_SYSTOLIC": (90, 140, 1),
+    "BP_DIASTOLIC": (60, 90, 0),
+    "TEMPERATURE": (97.0, 100.4, 1),
+    "SPO2": (95, None, -1),
+    "RESTING_BP": (90, 140, 1),
+    "CHOLESTEROL": (None, 240, 1),
+    "ST_DEPRESSION": (None, 2.0, 1),
+}
+
+
+def select_rules(types=None) -> dict:
+    """EWS_RULES restricted to `types`; ValueError for types without a rule"""
+    if not types:
+        return EWS_RULES
+    unknown = [t for t in types if t not in EWS_RULES]
+    if unknown:
+        raise ValueError(f"No early-warning rule for {', '.join(unknown)} "
+                         f"(scored types: {', '.join(EWS_RULES)})")
+    return {t: EWS_RULES[t] for t in types}
+
+
+def score_observations(patient_ids, obs_types, values, ranks, rules=EWS_RULES) -> dict:
+    """
+    Score flat observation columns (rank 1 = a patient's latest value of a
+    type). Returns patient_ids (P,), types (T), latest and average (P x T,
+    NaN where a patient has no values), status and trend (P x T in -1/0/1),
+    score (P,) and level (P,).
+    """
+    types = list(rules)
+    type_index = {t: i for i, t in enumerate(types)}
+    pids, p_idx = np.unique(np.asarray(patient_ids), return_inverse=True)
+    t_idx = np.fromiter((type_index[t] for t in obs_types), dtype=np.intp, count=len(obs_types))
+    values = np.asarray(values, dtype=float)
+    n_cells = len(pids) * len(types)
+    cell = p_idx * len(types) + t_idx
+
+    counts = np.bincount(cell, minlength=n_cells)
+    sums = np.bincount(cell, weights=values, minlength=n_cells)
+    latest = np.full(n_cells, np.nan)
+    is_latest = np.asarray(ranks) == 1
+    latest[cell[is_latest]] = values[is_latest]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        average = (sums / counts).reshape(len(pids), len(types))
+    latest = latest.reshape(len(pids), len(types))
+
+    # NaN bounds and missing values compare False, so they never count
+    low = np.array([np.nan if r[0] is None else r[0] for r in rules.values()], dtype=float)
+    high = np.array([np.nan if r[1] is None else r[1] for r in rules.values()], dtype=float)
+    adverse = np.array([r[2] for r in rules.values()], dtype=int)
+    status = np.where(latest < low, -1, np.where(latest > high, 1, 0))
+    trend = np.nan_to_num(np.sign(latest - average)).astype(int)
+
+    score = 2 * (status != 0).sum(axis=1) + ((adverse != 0) & (trend == adverse)).sum(axis=1)
+    level = np.select([score >= minimum for _, minimum in LEVELS[:-1]],
+                      [name for name, _ in LEVELS[:-1]], LEVELS[-1][0])
+    return {"patient_ids": pids, "types": types, "latest": latest, "average": average,
+            "status": status, "trend": trend, "score": score, "level": level}
+
+
+def _patient_vitals(scored: dict, i: int) -> dict:
+    vitals = {}
+    for j, obs_type in enumerate(scored["types"]):
+        current = scored["latest"][i, j]
+        if np.isnan(current):
+            continue
+        vitals[obs_type] = {
+            "current": float(current),
+            "average": round(float(scored["average"][i, j]), 2),
+            "status": STATUS_LABELS[int(scored["status"][i, j])],
+            "trend": TREND_LABELS[int(scored["trend"][i, j])],
+        }
+    return vitals
+
+
+def stratify(types=None, level: str = None, min_score: int = 0, sex: str = None,
+             min_age: int = None, max_age: int = None, days: int = None,
+             window: int = EWS_WINDOW, limit: int = 50) -> dict:
+    """
+    Early-warning scores for every patient matching the demographic filters,
+    with the level distribution and the top `limit` patients by score that
+    also pass `level` / `min_score`.
+    """
+    rules = select_rules(types)
+    since = datetime.utcnow() - timedelta(days=days) if days else None
+    patient_ids, obs_types, values, ranks = repo.get_recent_observations(
+        list(rules), window, since, sex, min_age, max_age)
+    distribution = {name: 0 for name, _ in LEVELS}
+    result = {"window": window, "types": list(rules), "scored_patients": 0,
+              "distribution": distribution, "matched": 0, "patients": []}
+    if not patient_ids:
+        return result
+
+    scored = score_observations(patient_ids, obs_types, values, ranks, rules)
+    names, counts = np.unique(scored["level"], return_counts=True)
+    distribution.update({str(name): int(n) for name, n in zip(names, counts)})
+
+    mask = scored["score"] >= min_score
+    if level:
+        mask &= scored["level"] == level
+    matched = np.flatnonzero(mask)
+    # highest score first, then most abnormal vitals, then patient id
+    abnormal = (scored["status"] != 0).sum(axis=1)
+    order = matched[np.lexsort((scored["patient_ids"][matched], -abnormal[matched],
+                                -scored["score"][matched]))][:limit]
+
+    brief = repo.get_patients_brief([int(p) for p in scored["patient_ids"][order]])
+    patients = []
+    for i in order:
+        pid = int(scored["patient_ids"][i])
+        info = brief.get(pid, {})
+        patients.append({
+            "id": pid,
+            "uid": info.get("patient_uid"),
+            "name": info.get("patient_name"),
+            "age": info.get("age"),
+            "sex": info.get("sex"),
+            "risk_score": int(scored["score"][i]),
+            "risk_level": str(scored["level"][i]),
+            "abnormal_vitals": int(abnormal[i]),
+            "vitals": _patient_vitals(scored, i),
+        })
+    result.update(scored_patients=len(scored["patient_ids"]), matched=len(matched),
+                  patients=patients)
+    return result
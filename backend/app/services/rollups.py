@@ -0,0 +1,99 @@
+import math
+from datetime import datetime, timedelta
+from app.db import repo
+
+HOUR = 3600
+DAY = 86400
+# rollup name -> bucket width, coarsest first
+POPULATION_ROLLUPS = (("daily", DAY), ("hourly", HOUR))
+PATIENT_ROLLUPS = (("patient_daily", DAY),)
+
+
+def _as_datetime(ts) -> datetime:
+    """Ingest passes observed_at as 'YYYY-MM-DD HH:MM:SS' strings"""
+    return ts if isinstance(ts, datetime) else datetime.strptime(str(ts), "%Y-%m-%d %H:%M:%S")
+
+
+def _merge(acc: dict, key, value: float):
+    cur = acc.get(key)
+    if cur is None:
+        acc[key] = [1, value, value, value]
+    else:
+        cur[0] += 1
+        cur[1] += value
+        cur[2] = min(cur[2], value)
+        cur[3] = max(cur[3], value)
+
+
+def aggregate(obs_rows):
+    """
+    Pre-aggregate observation insert rows (patient_id, obs_type, value_num,
+    value_text, unit, observed_at, upload_id) into hourly, daily and
+    per-patient daily (key..., n, sum, min, max) rows, sorted by key so
+    concurrent upserts lock rows in the same order.
+    """
+    hourly, daily, patient_daily = {}, {}, {}
+    for pid, obs_type, value, _, _, observed_at, _ in obs_rows:
+        if value is None:
+            continue
+        ts = _as_datetime(observed_at)
+        day = ts.date()
+        _merge(hourly, (obs_type, ts.replace(minute=0, second=0, microsecond=0)), value)
+        _merge(daily, (obs_type, day), value)
+        _merge(patient_daily, (pid, obs_type, day), value)
+    return tuple([key + tuple(v) for key, v in sorted(acc.items())]
+                 for acc in (hourly, daily, patient_daily))
+
+
+def update_rollups(obs_rows):
+    """Fold newly inserted observations into the rollup tables"""
+    repo.upsert_rollups(*aggregate(obs_rows))
+
+
+def plan_buckets(first: datetime, last: datetime, points: int, rollups=POPULATION_ROLLUPS):
+    """
+    Bucket width for about `points` buckets over [first, last), and the rollup
+    that can serve it. A rollup is used when buckets are at least as wide as
+    its rows; width is then rounded up to whole rows and the start aligned
+    down to a row boundary, since rollup rows cannot be split: the first
+    bucket may then begin (and include observations from) before `first`.
+    Returns (rollup name or None for raw, start of the first bucket, seconds).
+    """
+    seconds = max(1, math.ceil((last - first).total_seconds() / points))
+    for name, width in rollups:
+        if seconds >= width:
+            epoch = (first - datetime(1970, 1, 1)).total_seconds()
+            start = datetime(1970, 1, 1) + timedelta(seconds=epoch // width * width)
+            return name, start, math.ceil(seconds / width) * width
+    return None, first, seconds
+
+
+def with_timestamps(rows, start: datetime, bucket_seconds: int):
+    """Replace each row's bucket index with its bucket start time"""
+    for r in rows:
+        r["observed_at"] = start + timedelta(seconds=int(r.pop("bucket")) * bucket_seconds)
+    return rows
+
+
+def get_population_trend(start: datetime, end: datetime, types=None, points: int = 200) -> dict:
+    """
+    Per obs_type avg/min/max/count over all patients in about `points` time
+    buckets. Served from the daily or hourly rollup when buckets are at least
+    an hour wide, otherwise aggregated from raw observations.
+    """
+    span = repo.get_rollup_span(start, end, types)
+    if not span or not span["n"]:
+        return {"vitals": [], "total_observations": 0, "downsample": None}
+    first = max(start, span["first_at"])
+    last = min(end, span["last_at"] + timedelta(hours=1))
+    rollup, bucket_start, seconds = plan_buckets(first, last, points)
+    if rollup:
+        rows = repo.get_rollup_buckets(rollup, bucket_start, last, seconds, types)
+    else:
+        rows = repo.get_population_vitals_buckets(bucket_start, last, seconds, types)
+    return {
+        "vitals": with_timestamps(rows, bucket_start, seconds),
+        "total_observations": int(span["n"]),
+        "downsample": {"method": "bucket", "points": points, "bucket_seconds": seconds,
+                       "source": rollup or "raw", "start": bucket_start},
+    }
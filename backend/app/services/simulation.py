@@ -0,0 +1,32 @@
+from app.core import tracing
+from app.db import repo
+from app.services.model import get_risk_model
+from ml import simulate as sim
+from ml.features import patients_to_matrix
+
+
+def list_interventions():
+    """Available interventions with their label, unit and feature shifts"""
+    return [{"name": name, "label": spec["label"], "unit": spec["unit"],
+             "effects": spec["effects"]} for name, spec in sim.INTERVENTIONS.items()]
+
+
+def run_simulation(intervention: str, magnitudes, base: dict = None, patient_ids=None,
+                   cohort_limit: int = 10000, include_patients: bool = False) -> dict:
+    """
+    Re-score a patient or cohort under a sweep of intervention magnitudes.
+    Raises LookupError when there is no model or no matching patients and
+    ValueError for unknown interventions.
+    """
+    model = get_risk_model()
+    if model is None:
+        raise LookupError("Risk model not available (run python -m ml.train)")
+    rows = repo.get_cohort_features(patient_ids, cohort_limit)
+    if not rows:
+        raise LookupError("No patients with vitals found")
+
+    scenarios = sim.sweep(intervention, magnitudes, base)
+    with tracing.span("model simulate", patients=len(rows)):
+        result = sim.simulate(model, patients_to_matrix(rows), scenarios)
+    ids = [r["id"] for r in rows] if include_patients else None
+    return sim.summarize(result, scenarios, ids)
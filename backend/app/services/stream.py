@@ -0,0 +1,235 @@
+"""
+Group-committed ingestion for streamed observations.
+
+Requests hand their rows to a bounded queue and return. One writer thread
+drains the queue into micro-batches (up to MAX_BATCH_ROWS rows or
+MAX_BATCH_WAIT seconds) and commits each batch with one insert, one rollup
+merge and one vitals-summary merge, all in one transaction. When the queue
+is full, submit() fails fast so the API can tell the client to back off.
+If a batch fails on the data itself (a value that does not fit its column),
+each request's rows are committed on their own, and row by row for the
+request that holds the bad rows, so other clients' rows are not lost. Rows
+that still fail are counted and kept in ObservationBatcher.failed.
+"""
+
+import collections
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from app.db import repo
+from app.db.connection import DATA_ERRORS, transaction
+from app.services import events
+from app.services.rollups import update_rollups
+
+MAX_PENDING_CHUNKS = 256
+MAX_BATCH_ROWS = 5000
+MAX_BATCH_WAIT = 0.05
+# rows set aside after failing on their own, most recent last
+FAILED_ROWS_KEPT = 1000
+
+# obs_type -> patient_vitals_summary column, in SQL_MERGE_VITALS_SUMMARY order
+SUMMARY_COLUMNS = {
+    "CHEST_PAIN_TYPE": "chest_pain_type",
+    "RESTING_BP": "resting_bp",
+    "CHOLESTEROL": "cholesterol",
+    "FASTING_BS": "fasting_bs",
+    "RESTING_ECG": "resting_ecg",
+    "MAX_HEART_RATE": "max_heart_rate",
+    "EXERCISE_ANGINA": "exercise_angina",
+    "ST_DEPRESSION": "st_depression",
+    "ST_SLOPE": "st_slope",
+    "NUM_VESSELS": "num_vessels",
+    "THALASSEMIA": "thalassemia",
+    "HEART_DISEASE": "target",
+}
+_SUMMARY_INDEX = {obs_type: i for i, obs_type in enumerate(SUMMARY_COLUMNS)}
+
+
+class Backpressure(Exception):
+    """The ingest queue is full; the client should retry later"""
+
+
+def summary_rows(obs_rows):
+    """
+    One merge row per patient: the latest value of each summary column seen
+    in the batch, then each of those values' observed_at (None for columns
+    the batch did not touch). The merge compares every column's time with
+    the stored one, so late data never overwrites a newer value.
+    """
+    latest = {}
+    for pid, obs_type, value, _, _, observed_at, _ in obs_rows:
+        i = _SUMMARY_INDEX.get(obs_type)
+        if i is None or value is None:
+            continue
+        cols = latest.setdefault(pid, [None] * len(SUMMARY_COLUMNS))
+        if cols[i] is None or observed_at >= cols[i][0]:
+            cols[i] = (observed_at, value)
+    return [(pid, *[c[1] if c else None for c in cols], *[c[0] if c else None for c in cols])
+            for pid, cols in sorted(latest.items())]
+
+
+def merged_summaries(old: dict, summaries) -> dict:
+    """{patient_id: summary dict} after SQL_MERGE_VITALS_SUMMARY applies `summaries` to `old`"""
+    n = len(SUMMARY_COLUMNS)
+    new = {}
+    for pid, *fields in summaries:
+        row = dict(old.get(pid) or {})
+        for col, value, observed_at in zip(SUMMARY_COLUMNS.values(), fields[:n], fields[n:]):
+            stored_at = row.get(f"{col}_at")
+            if value is not None and (stored_at is None or observed_at >= stored_at):
+                row[col], row[f"{col}_at"] = value, observed_at
+        new[pid] = row
+    return new
+
+
+class ObservationBatcher:
+    """Bounded queue plus a single writer thread doing micro-batch group commits"""
+
+    def __init__(self, max_pending: int = MAX_PENDING_CHUNKS, max_rows: int = MAX_BATCH_ROWS,
+                 max_wait: float = MAX_BATCH_WAIT, commit=None):
+        self._queue = queue.Queue(maxsize=max_pending)
+        self.max_rows = max_rows
+        self.max_wait = max_wait
+        self._commit = commit or commit_batch
+        self._thread = None
+        self._stop = None
+        self._lock = threading.Lock()
+        self.stats = {"batches": 0, "rows": 0, "rejected": 0, "errors": 0, "failed": 0}
+        self.failed = collections.deque(maxlen=FAILED_ROWS_KEPT)
+
+    def submit(self, rows) -> Future:
+        """Queue insert rows; the future resolves to the commit result of their batch"""
+        self._ensure_started()
+        fut = Future()
+        try:
+            self._queue.put_nowait((rows, fut))
+        except queue.Full:
+            raise Backpressure(f"{self._queue.qsize()} batches pending")
+        return fut
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop = None
+                self._thread = threading.Thread(target=self._run, name="obs-writer", daemon=True)
+                self._thread.start()
+
+    def _next_batch(self):
+        """Block for one chunk, then gather more until max_rows or max_wait; [(rows, future)]"""
+        chunks, n = [], 0
+        deadline = None
+        while n < self.max_rows:
+            try:
+                if deadline is None:
+                    chunk, fut = self._queue.get()
+                    deadline = time.monotonic() + self.max_wait
+                else:
+                    chunk, fut = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if chunk is None:
+                # close(): commit what we have, then stop
+                self._stop = fut
+                break
+            chunks.append((chunk, fut))
+            n += len(chunk)
+        return chunks
+
+    def _count(self, result):
+        self.stats["batches"] += 1
+        self.stats["rows"] += result["committed"]
+        self.stats["rejected"] += result["rejected"]
+
+    def _commit_alone(self, rows, split: bool) -> dict:
+        """
+        Commit one request's rows; on a data error, commit them row by row
+        (split) and set aside the rows that fail on their own
+        """
+        try:
+            result = self._commit(rows)
+            self._count(result)
+            return result
+        except DATA_ERRORS:
+            if not split:
+                raise
+            self.stats["errors"] += 1
+        total = {"committed": 0, "rejected": 0, "patients": 0, "failed": 0}
+        patients = set()
+        for row in rows:
+            try:
+                result = self._commit_alone([row], split=False)
+            except DATA_ERRORS as e:
+                self.stats["failed"] += 1
+                self.failed.append(row)
+                total["failed"] += 1
+                print(f"⚠️  Observation for patient {row[0]} ({row[1]!r}) not stored: {e}")
+                continue
+            total["committed"] += result["committed"]
+            total["rejected"] += result["rejected"]
+            if result["committed"]:
+                patients.add(row[0])
+        total["patients"] = len(patients)
+        return total
+
+    def _run(self):
+        while self._stop is None:
+            chunks = self._next_batch()
+            if not chunks:
+                continue
+            try:
+                result = self._commit([r for rows, _ in chunks for r in rows])
+            except DATA_ERRORS:
+                # a bad row must not fail the other requests' rows in its batch
+                self.stats["errors"] += 1
+                for rows, fut in chunks:
+                    try:
+                        fut.set_result(self._commit_alone(rows, split=True))
+                    except Exception as e:
+                        fut.set_exception(e)
+                continue
+            except Exception as e:
+                self.stats["errors"] += 1
+                for _, fut in chunks:
+                    fut.set_exception(e)
+                continue
+            self._count(result)
+            for _, fut in chunks:
+                fut.set_result(result)
+        self._stop.set_result(None)
+
+    def close(self, timeout: float = 10.0):
+        """Commit everything queued so far and stop the writer"""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        fut = Future()
+        self._queue.put((None, fut))
+        fut.result(timeout)
+
+
+def commit_batch(rows) -> dict:
+    """Insert one micro-batch and fold it into rollups and vitals summaries, in one transaction"""
+    with transaction():
+        known = repo.existing_patient_ids(sorted({r[0] for r in rows}))
+        accepted = [r for r in rows if r[0] in known]
+        if accepted:
+            repo.insert_observations(accepted)
+            update_rollups(accepted)
+            summaries = summary_rows(accepted)
+            old = repo.get_vitals_summaries([r[0] for r in summaries]) if summaries else {}
+            if summaries:
+                repo.merge_vitals_summaries(summaries)
+            new = merged_summaries(old, summaries)
+    if accepted:
+        # after the commit, so clients refetching on the event see the rows
+        delta = events.summary_delta({pid: old[pid] for pid in new if pid in old}, new)
+        events.publish_delta("stream", {"total_observations": len(accepted), **delta["stats"]},
+                             delta["vitals_summary"])
+    return {"committed": len(accepted), "rejected": len(rows) - len(accepted),
+            "patients": len({r[0] for r in accepted})}
+
+
+batcher = ObservationBatcher()
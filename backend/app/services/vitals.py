@@ -0,0 +1,182 @@
+from datetime import datetime, timedelta, timezone
+import numpy as np
+from app.db import repo
+from app.services import rollups
+
+# open-ended windows still go through the (patient_id, obs_type, observed_at) index
+MIN_TIME = datetime(1970, 1, 1)
+MAX_TIME = datetime(9999, 12, 31)
+METHODS = ("bucket", "lttb")
+
+
+def parse_types(types: str = None):
+    """Comma-separated obs_types (case-insensitive) to a list, or None for all"""
+    if not types:
+        return None
+    return [t.strip().upper() for t in types.split(",") if t.strip()] or None
+
+
+def naive_utc(ts):
+    """observed_at is stored as naive UTC"""
+    if ts is not None and ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+def window(start: datetime = None, end: datetime = None):
+    """Naive-UTC [start, end) with open ends replaced by the sentinel bounds"""
+    return naive_utc(start) or MIN_TIME, naive_utc(end) or MAX_TIME
+
+
+def lttb(x: np.ndarray, y: np.ndarray, points: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: indices of `points` samples that keep the
+    visual shape of the (x, y) series. x must be sorted ascending.
+    """
+    n = len(x)
+    if points >= n or points < 3:
+        return np.arange(n)
+    # first and last points are always kept, the rest split into points - 2 buckets
+    edges = np.linspace(1, n - 1, points - 1).astype(int)
+    keep = np.empty(points, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # average of the next bucket (or the last point) is the third vertex
+        nlo, nhi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        cx, cy = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(area.argmax())
+        keep[i + 1] = a
+    return keep
+
+
+def _bucketed(patient_id, start, end, types, points):
+    """Bucket rows, total observations, bucket width, source (rollup or raw) and first bucket start"""
+    span = repo.get_patient_vitals_span(patient_id, start, end, types)
+    if not span or not span["n"]:
+        return [], 0, None, None, None
+    first = max(start, span["first_at"])
+    last = min(end, span["last_at"] + timedelta(seconds=1))
+    rollup, bucket_start, bucket_seconds = rollups.plan_buckets(
+        first, last, points, rollups.PATIENT_ROLLUPS)
+    if rollup:
+        rows = repo.get_rollup_buckets(rollup, bucket_start, last, bucket_seconds, types,
+                                       patient_id=patient_id)
+    else:
+        rows = repo.get_patient_vitals_buckets(patient_id, bucket_start, last, bucket_seconds, types)
+    return (rollups.with_timestamps(rows, bucket_start, bucket_seconds), int(span["n"]),
+            bucket_seconds, rollup or "raw", bucket_start)
+
+
+def _lttb(batches, points):
+    """
+    Downsample each numeric obs_type series to `points` from batches of
+    newest-first rows, as they are read; returns (rows, rows read)
+    """
+    series, total = {}, 0
+    for rows in batches:
+        total += len(rows)
+        for r in rows:
+            if r["value_num"] is not None:
+                series.setdefault(r["obs_type"], []).append(r)
+    out = []
+    for obs_type, items in series.items():
+        items.reverse()
+        x = np.array([r["observed_at"].timestamp() for r in items])
+        y = np.array([r["value_num"] for r in items], dtype=float)
+        out.extend(items[i] for i in lttb(x, y, points))
+    return out, total
+
+
+def get_vitals(patient_id: int, start: datetime = None, end: datetime = None, types=None,
+               points: int = None, method: str = "bucket") -> dict:
+    """
+    A patient's observations in [start, end), optionally only some obs_types.
+    With `points`, each numeric series is reduced to about that many points:
+    "bucket" averages fixed time buckets in SQL (rows also carry value_min,
+    value_max and n), read from the daily rollup once buckets span whole
+    days (the first bucket then starts at midnight, possibly before `start`:
+    downsample["start"]); "lttb" keeps the most shape-preserving raw samples.
+    Raw rows are newest first, downsampled rows oldest first per obs_type.
+    Raises ValueError for an unknown method.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown downsampling method: {method}")
+    start, end = window(start, end)
+    result = {"patient_id": patient_id, "from": start if start != MIN_TIME else None,
+              "to": end if end != MAX_TIME else None, "types": types}
+
+    if points and method == "bucket":
+        rows, total, bucket_seconds, source, bucket_start = _bucketed(
+            patient_id, start, end, types, points)
+        result["downsample"] = {"method": method, "points": points, "bucket_seconds": bucket_seconds,
+                                "source": source, "start": bucket_start}
+    elif points:
+        # the full history is only walked once, straight off an unbuffered cursor
+        with repo.stream_patient_vitals_range(patient_id, start, end, types) as stream:
+            rows, total = _lttb(stream, points)
+        result["downsample"] = {"method": method, "points": points}
+    else:
+        rows = repo.get_patient_vitals_range(patient_id, start, end, types)
+        total = len(rows)
+    result.update(vitals=rows, total_observations=total, returned_points=len(rows))
+    return result
+
+
+def pivot_series(rows) -> dict:
+    """
+    Long (obs_type, value_num, observed_at) rows to column arrays aligned on
+    one sorted timestamp axis (epoch milliseconds); gaps are None. Several
+    values of one obs_type at the same millisecond are averaged.
+    """
+    rows = [r for r in rows if r.get("value_num") is not None]
+    if not rows:
+        return {"timestamps": [], "series": {}, "units": {}}
+    ts = np.array([int(r["observed_at"].replace(tzinfo=timezone.utc).timestamp() * 1000)
+                   for r in rows], dtype=np.int64)
+    types = [r["obs_type"] for r in rows]
+    axis, col = np.unique(ts, return_inverse=True)
+    names = sorted(set(types))
+    row_of = {name: i for i, name in enumerate(names)}
+    cell = np.array([row_of[t] for t in types]) * len(axis) + col
+    size = len(names) * len(axis)
+    counts = np.bincount(cell, minlength=size)
+    sums = np.bincount(cell, weights=[float(r["value_num"]) for r in rows], minlength=size)
+    with np.errstate(invalid="ignore"):
+        grid = (sums / counts).reshape(len(names), len(axis))
+    units = {}
+    for r in rows:
+        units.setdefault(r["obs_type"], r.get("unit") or "")
+    return {
+        "timestamps": axis.tolist(),
+        "series": {name: [None if np.isnan(v) else v for v in grid[i].tolist()]
+                   for i, name in enumerate(names)},
+        "units": units,
+    }
+
+
+def series_to_arrow(series: dict) -> bytes:
+    """Arrow IPC stream: a `timestamp` column plus one float64 column per obs_type"""
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ValueError("Arrow output needs pyarrow (pip install pyarrow)")
+    columns = {"timestamp": pa.array(series["timestamps"], type=pa.timestamp("ms", tz="UTC"))}
+    for name, values in series["series"].items():
+        columns[name] = pa.array(values, type=pa.float64())
+    table = pa.table(columns)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def get_vitals_series(patient_id: int, start: datetime = None, end: datetime = None,
+                      types=None, points: int = None, method: str = "bucket") -> dict:
+    """get_vitals() pivoted to wide, column-oriented series"""
+    result = get_vitals(patient_id, start, end, types, points, method)
+    out = {k: v for k, v in result.items() if k not in ("vitals", "returned_points")}
+    out.update(pivot_series(result["vitals"]))
+    return out
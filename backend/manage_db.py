@@ -4,9 +4,12 @@ Database management CLI for AegisCare
 """
 
 from app.db.connection import init_database, get_conn
+from app.db import partitions as obs_partitions
+from app.db import repo
 import typer
 import sys
 import os
+from datetime import date
 
 # Add the app directory to Python path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
@@ -90,5 +93,49 @@ def reset():
         raise typer.Exit(1)
 
 
+@app.command()
+def partitions(months_ahead: int = typer.Option(obs_partitions.DEFAULT_MONTHS_AHEAD,
+                                                help="Months to create ahead of today"),
+               retain_months: int = typer.Option(0, help="Drop partitions older than this (0 keeps all)"),
+               dry_run: bool = typer.Option(False, help="Only show what would change")):
+    """Create upcoming monthly observation partitions and apply retention"""
+    try:
+        current = obs_partitions.list_partitions()
+        if not current:
+            typer.echo("❌ patient_observations is not partitioned (run migrate_observations.py)")
+            raise typer.Exit(1)
+        if dry_run:
+            today = date.today()
+            added = [name for name, _ in obs_partitions.plan_roll(current, today, months_ahead)]
+            dropped = obs_partitions.plan_retention(current, today, retain_months) if retain_months else []
+        else:
+            added = obs_partitions.roll_partitions(months_ahead)
+            dropped = obs_partitions.drop_expired(retain_months) if retain_months else []
+        prefix = "Would " if dry_run else ""
+        typer.echo(f"📅 {prefix}add: {', '.join(added) or 'nothing'}")
+        typer.echo(f"🗑️  {prefix}drop: {', '.join(dropped) or 'nothing'}")
+        for p in obs_partitions.list_partitions():
+            typer.echo(f"   - {p['name']}: < {obs_partitions.bound_to_date(p['bound']) or 'MAXVALUE'}"
+                       f" (~{p['est_rows']} rows)")
+        typer.echo("✅ Partitions up to date")
+    except typer.Exit:
+        raise
+    except Exception as e:
+        typer.echo(f"❌ Failed to manage partitions: {e}")
+        raise typer.Exit(1)
+
+
+@app.command()
+def rollups():
+    """Rebuild the vitals rollup tables from raw observations"""
+    typer.echo("🔄 Rebuilding vitals rollups...")
+    try:
+        repo.rebuild_rollups()
+        typer.echo("✅ Rollups rebuilt")
+    except Exception as e:
+        typer.echo(f"❌ Failed to rebuild rollups: {e}")
+        raise typer.Exit(1)
+
+
 if __name__ == "__main__":
     app()
@@ -139,6 +139,22 @@ def migrate_database():
             else:
                 print("✅ Database schema is already up to date!")
 
+            # Streamed observations only overwrite summary columns with newer data
+            previous = "target"
+            for column in ("chest_pain_type", "resting_bp", "cholesterol", "fasting_bs",
+                           "resting_ecg", "max_heart_rate", "exercise_angina", "st_depression",
+                           "st_slope", "num_vessels", "thalassemia", "target"):
+                at = f"{column}_at"
+                if at not in column_names:
+                    try:
+                        cursor.execute(
+                            f"ALTER TABLE patient_vitals_summary ADD COLUMN {at} DATETIME NULL AFTER {previous}")
+                        connection.commit()
+                        print(f"✅ Added column: {at}")
+                    except Error as e:
+                        print(f"⚠️  Warning adding column {at}: {e}")
+                previous = at
+
             # Verify final structure
             print("\n📋 Final table structure:")
             cursor.execute("DESCRIBE patient_vitals_summary")
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Observation partitioning migration for AegisCare
+Databases created before patient_observations was partitioned keep the old
+table, because schema.sql only creates it if it does not exist. This script
+copies the rows into a partitioned table and swaps the two.
+Stop the API and any uploads first: rows written during the copy are lost.
+"""
+
+import typer
+
+from app.db import partitions
+from app.db.connection import init_database
+
+
+def main(months_ahead: int = typer.Option(partitions.DEFAULT_MONTHS_AHEAD,
+                                          help="Months to create ahead of today"),
+         batch_rows: int = typer.Option(partitions.COPY_BATCH_ROWS, help="Observation ids copied per statement"),
+         drop_old: bool = typer.Option(False, help=f"Drop {partitions.UNPARTITIONED_TABLE} after the swap")):
+    """Move patient_observations to monthly range partitions"""
+    typer.echo("🚀 Migrating patient_observations to the partitioned layout...")
+    try:
+        init_database()
+        result = partitions.migrate_to_partitioned(months_ahead, batch_rows, drop_old, echo=typer.echo)
+    except Exception as e:
+        typer.echo(f"❌ Migration failed: {e}")
+        raise typer.Exit(1)
+    if not result["migrated"]:
+        added = ", ".join(result["indexes_added"]) or "none"
+        typer.echo(f"✅ Already partitioned (indexes added: {added})")
+        return
+    typer.echo(f"✅ Moved {result['rows']:,} observations into the partitioned table")
+    if not drop_old:
+        typer.echo(f"ℹ️  The old table is kept as {partitions.UNPARTITIONED_TABLE}; drop it once verified")
+
+
+if __name__ == "__main__":
+    typer.run(main)
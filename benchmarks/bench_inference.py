@@ -0,0 +1,95 @@
+"""
+Microbenchmark: full sklearn pipelines vs the compiled NumPy risk model.
+
+Reports process startup (import + load) and per-call latency percentiles for
+scoring all outcomes of a single patient, and checks that both produce the
+same probabilities. Requires `python -m ml.train` to have been run.
+
+    python -m benchmarks.bench_inference
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+import typer
+
+from ml.compiled import ARTIFACT_FILE, check_parity, load_compiled
+from ml.evaluate import percentiles, score
+from ml.features import FEATURES, MODEL_DIR, ROOT_DIR, load_dataset
+from ml.train import MODEL_FILE, load_bundle
+
+RESULTS_DIR = os.path.join(ROOT_DIR, "benchmarks", "results")
+
+STARTUP_SNIPPETS = {
+    "full": f"import joblib; joblib.load({os.path.join(MODEL_DIR, MODEL_FILE)!r})",
+    "compiled": ("from ml.compiled import load_compiled; "
+                 f"load_compiled({os.path.join(MODEL_DIR, ARTIFACT_FILE)!r})"),
+}
+
+
+def startup_ms(snippet: str, runs: int) -> float:
+    """Best-of-N wall time for a fresh interpreter to import and load a model"""
+    best = float("inf")
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, "-c", snippet], cwd=ROOT_DIR, check=True)
+        best = min(best, (time.perf_counter() - t0) * 1000)
+    return round(best, 1)
+
+
+def time_calls(fn, rows, calls: int) -> list:
+    samples = []
+    for i in range(calls):
+        row = rows[i % len(rows)]
+        t0 = time.perf_counter()
+        fn(row)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return samples
+
+
+def main(calls: int = 1000, startup_runs: int = 3, output: str = os.path.join(RESULTS_DIR, "inference.json")):
+    """Compare startup and single-patient latency of full vs compiled models"""
+    bundle = load_bundle()
+    compiled = load_compiled()
+    X, _ = load_dataset()
+    X = X[FEATURES]
+
+    frames = [X.iloc[[i]] for i in range(min(len(X), 256))]
+    arrays = [f.to_numpy() for f in frames]
+
+    # warm up both paths before timing
+    score(bundle["models"], frames[0])
+    compiled.predict_proba(arrays[0])
+
+    full = percentiles(time_calls(lambda r: score(bundle["models"], r), frames, calls))
+    fast = percentiles(time_calls(compiled.predict_proba, arrays, calls))
+
+    result = {
+        "model_version": bundle["version"],
+        "calls": calls,
+        "parity_max_abs_diff": check_parity(bundle, compiled, X),
+        "single_call": {"full": full, "compiled": fast,
+                        "speedup_p50": round(full["p50_ms"] / fast["p50_ms"], 1)},
+        "startup_ms": {name: startup_ms(snippet, startup_runs)
+                       for name, snippet in STARTUP_SNIPPETS.items()},
+    }
+
+    typer.echo(f"{'':<10}{'p50 ms':>10}{'p99 ms':>10}{'startup ms':>12}")
+    for name, stats in (("full", full), ("compiled", fast)):
+        typer.echo(f"{name:<10}{stats['p50_ms']:>10.3f}{stats['p99_ms']:>10.3f}"
+                   f"{result['startup_ms'][name]:>12.0f}")
+    typer.echo(f"parity max |diff| = {result['parity_max_abs_diff']:.2e}, "
+               f"p50 speedup x{result['single_call']['speedup_p50']}")
+
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    typer.echo(f"✅ Wrote {output}")
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,128 @@
+"""
+CSV ingest throughput: rows/s, DB round trips, peak RSS and stage timings.
+
+For each size, a CSV is generated by benchmarks.datasets (with `--duplicates`
+of the rows re-sending an earlier patient) and loaded end to end by every
+engine in ENGINES, each run in a fresh process so peak RSS is its own.
+Patient uids are new for every run, so the insert path is measured, not only
+updates. Runs write to the database named by MYSQL_* (point MYSQL_DB at a
+scratch database).
+
+Stages are reported as:
+- parse: decoding and csv.DictReader over the whole file, timed on its own
+- load: time inside the DB helpers, including pool checkout (from the query
+  profiling histograms)
+- transform: the rest of the engine's wall time (type conversion, summaries,
+  rollups, notes)
+
+Round trips are the queries issued through the profiled DB helpers.
+
+    python -m benchmarks.bench_ingest --sizes 10000,100000 --duplicates 0.1
+"""
+
+import csv
+import io
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import typer
+
+from benchmarks import datasets
+from ml.features import ROOT_DIR
+
+sys.path.append(os.path.join(ROOT_DIR, "backend"))
+
+from app.db import connection, profiling, repo, statements  # noqa: E402
+from app.services.ingest import ingest_csv  # noqa: E402
+
+RESULTS_DIR = os.path.join(ROOT_DIR, "benchmarks", "results")
+BENCH_EMAIL = "ingest-bench@aegiscare.local"
+
+# name -> fn(user_id, filename, file_bytes), same signature as ingest_csv
+ENGINES = {
+    "ingest_csv": ingest_csv,
+}
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_once(engine: str, path: str) -> dict:
+    """Load `path` with `engine` in this process and measure it"""
+    connection.init_database()
+    user = repo.get_user_by_email(BENCH_EMAIL)
+    user_id = user["id"] if user else repo.create_user(BENCH_EMAIL, "Ingest Bench", "bench", "doctor")
+    with open(path, "rb") as f:
+        body = f.read()
+    rss_before = _peak_rss_mb()
+    for metric in (profiling.QUERY_SECONDS, profiling.ACQUIRE_SECONDS):
+        metric.reset()
+    statements.reset()
+
+    t0 = time.perf_counter()
+    result = ENGINES[engine](user_id, os.path.basename(path), body)
+    total = time.perf_counter() - t0
+    rss_peak = _peak_rss_mb()
+
+    round_trips, query_s = profiling.QUERY_SECONDS.totals()
+    _, acquire_s = profiling.ACQUIRE_SECONDS.totals()
+    t1 = time.perf_counter()
+    rows = sum(1 for _ in csv.DictReader(io.StringIO(body.decode("utf-8", errors="ignore"))))
+    parse = time.perf_counter() - t1
+    load = query_s + acquire_s
+    return {"rows": rows, "seconds": round(total, 3), "rows_per_s": round(rows / total, 1),
+            "db_round_trips": round_trips, "round_trips_per_row": round(round_trips / rows, 2),
+            "peak_rss_mb": rss_peak, "baseline_rss_mb": rss_before,
+            "stages_s": {"parse": round(parse, 3), "transform": round(max(0.0, total - parse - load), 3),
+                         "load": round(load, 3)},
+            "top_statements": statements.stats()[:5], "result": result}
+
+
+def main(sizes: str = "10000,100000", duplicates: float = 0.1, seed: int = 7,
+         engines: str = typer.Option(",".join(ENGINES), help="Comma-separated subset"),
+         output: str = os.path.join(RESULTS_DIR, "ingest.json")):
+    """End-to-end ingest throughput per engine and file size"""
+    try:
+        connection.init_database()
+    except Exception as e:
+        typer.echo(f"❌ MySQL is not reachable ({e}); set MYSQL_HOST/MYSQL_DB/MYSQL_USER/MYSQL_PASSWORD")
+        raise typer.Exit(1)
+    header, _ = datasets.source_rows()
+    stamp = time.strftime("%m%d%H%M%S")
+    ctx = multiprocessing.get_context("spawn")
+    result = {"duplicates": duplicates, "seed": seed, "runs": []}
+    for size in (int(s) for s in sizes.split(",")):
+        for engine in (e.strip() for e in engines.split(",")):
+            with tempfile.NamedTemporaryFile("w", suffix=".csv", newline="", delete=False) as f:
+                writer = csv.DictWriter(f, fieldnames=header)
+                writer.writeheader()
+                writer.writerows(datasets.scaled_rows(size, seed, duplicates=duplicates,
+                                                      prefix=f"B{stamp}{engine[:4]}{size}-"))
+            try:
+                with ctx.Pool(1) as pool:
+                    stats = pool.apply(run_once, (engine, f.name))
+            finally:
+                os.unlink(f.name)
+            result["runs"].append({"engine": engine, "size": size, **stats})
+            stages = stats["stages_s"]
+            typer.echo(f"{engine:<12}{size:>10,} rows {stats['rows_per_s']:>10,.0f} rows/s "
+                       f"{stats['db_round_trips']:>10,} round trips {stats['peak_rss_mb']:>8.1f} MB  "
+                       f"parse {stages['parse']:.2f}s transform {stages['transform']:.2f}s "
+                       f"load {stages['load']:.2f}s")
+
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2, default=str)
+    typer.echo(f"✅ Wrote {output}")
+
+
+if __name__ == "__main__":
+    typer.run(main)
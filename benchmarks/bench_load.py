@@ -0,0 +1,245 @@
+"""
+Load test: concurrent clients against the running API, per endpoint.
+
+Seeds the MySQL database named by the MYSQL_* environment variables up to
+`--patients` patients (the bundled CSV resampled by benchmarks.datasets and
+loaded with ingest_csv), starts the API under uvicorn (or uses `--base-url`),
+then drives each endpoint in turn for `--duration` seconds with `--clients`
+concurrent clients: login, dashboard stats, patient list pages, search,
+patient vitals and predictions. Throughput, errors and latency percentiles
+per endpoint go to a JSON report stamped with the git commit; pass an older
+report as `--baseline` to print the change.
+
+    python -m benchmarks.bench_load --patients 100000 --clients 16 --duration 15
+    python -m benchmarks.bench_load --patients 1000000 --baseline benchmarks/results/load_main.json
+"""
+
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+import httpx
+import numpy as np
+import typer
+
+from benchmarks import datasets
+from ml.evaluate import percentiles
+from ml.features import ROOT_DIR
+
+sys.path.append(os.path.join(ROOT_DIR, "backend"))
+
+from app.db import connection, repo  # noqa: E402
+from app.services.ingest import ingest_csv  # noqa: E402
+
+RESULTS_DIR = os.path.join(ROOT_DIR, "benchmarks", "results")
+BENCH_EMAIL = "loadtest@aegiscare.local"
+BENCH_PASSWORD = "loadtest"
+SEED_CHUNK = 20000
+PAGE_SIZE = 50
+ENDPOINTS = ("login", "dashboard", "patients", "search", "vitals", "predictions")
+
+
+def bench_user() -> int:
+    user = repo.get_user_by_email(BENCH_EMAIL)
+    if user:
+        return user["id"]
+    return repo.create_user(BENCH_EMAIL, "Load Test", BENCH_PASSWORD, "doctor")
+
+
+def seed_patients(patients: int, user_id: int, seed: int):
+    """Top the database up to `patients` patients, SEED_CHUNK rows per ingest_csv call"""
+    have = repo.count_patients()
+    if have >= patients:
+        typer.echo(f"📦 {have:,} patients already loaded")
+        return
+    header, _ = datasets.source_rows()
+    rows = datasets.scaled_rows(patients - have, seed, start=have + 1)
+    t0 = time.perf_counter()
+    for start in range(have, patients, SEED_CHUNK):
+        chunk = [next(rows) for _ in range(min(SEED_CHUNK, patients - start))]
+        ingest_csv(user_id, f"load_{start}.csv", datasets.to_csv(chunk, header))
+        typer.echo(f"📦 {start + len(chunk):,}/{patients:,} patients "
+                   f"({time.perf_counter() - t0:.0f} s)")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workers: int):
+    """(process, base url) of uvicorn serving app.main:app, once it answers"""
+    port = free_port()
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(
+        p for p in (ROOT_DIR, os.environ.get("PYTHONPATH")) if p)}
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        cwd=os.path.join(ROOT_DIR, "backend"), env=env)
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with {proc.returncode}")
+        try:
+            httpx.get(f"{base_url}/metrics", timeout=1)
+            return proc, base_url
+        except httpx.TransportError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("uvicorn did not start within 60 s")
+
+
+def login(client: httpx.Client) -> str:
+    r = client.post("/auth/login", json={"email": BENCH_EMAIL, "password": BENCH_PASSWORD})
+    r.raise_for_status()
+    return r.json()["session_id"]
+
+
+def requests_for(name: str, rng: random.Random, ids: list, terms: list, total: int):
+    """fn(client) issuing one `name` request"""
+    if name == "login":
+        body = {"email": BENCH_EMAIL, "password": BENCH_PASSWORD}
+        return lambda c: c.post("/auth/login", json=body)
+    if name == "dashboard":
+        return lambda c: c.get("/dashboard/stats")
+    if name == "patients":
+        pages = max(1, total // PAGE_SIZE)
+        return lambda c: c.get("/patients/", params={
+            "limit": PAGE_SIZE, "offset": rng.randrange(pages) * PAGE_SIZE})
+    if name == "search":
+        return lambda c: c.get("/patients/search", params={"q": rng.choice(terms),
+                                                           "limit": PAGE_SIZE})
+    if name == "vitals":
+        return lambda c: c.get(f"/patients/{rng.choice(ids)}/vitals")
+    if name == "predictions":
+        return lambda c: c.get(f"/patients/{rng.choice(ids)}/predictions")
+    raise ValueError(f"Unknown endpoint {name}")
+
+
+def drive(base_url: str, sessions: list, request, duration: float, warmup: float) -> dict:
+    """Run `request` from one thread per session; latencies after `warmup` are kept"""
+    samples = [[] for _ in sessions]
+    errors = [0] * len(sessions)
+    t0 = time.monotonic()
+    start, stop = t0 + warmup, t0 + warmup + duration
+
+    def client_loop(i: int):
+        with httpx.Client(base_url=base_url, headers={"X-Session-Id": sessions[i]},
+                          timeout=30) as client:
+            while (now := time.monotonic()) < stop:
+                t = time.perf_counter()
+                try:
+                    ok = request(client).status_code < 400
+                except httpx.HTTPError:
+                    ok = False
+                ms = (time.perf_counter() - t) * 1000
+                if now >= start:
+                    samples[i].append(ms)
+                    errors[i] += not ok
+
+    threads = [threading.Thread(target=client_loop, args=(i,)) for i in range(len(sessions))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    latencies = [ms for s in samples for ms in s]
+    if not latencies:
+        return {"requests": 0, "errors": 0, "rps": 0.0}
+    return {"requests": len(latencies), "errors": sum(errors),
+            "rps": round(len(latencies) / duration, 1),
+            **percentiles(latencies), "max_ms": round(float(np.max(latencies)), 4)}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(result: dict, baseline_path: str):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    typer.echo(f"Δ vs {baseline['meta'].get('commit')} ({baseline_path})")
+    for name, stats in result["endpoints"].items():
+        old = baseline.get("endpoints", {}).get(name)
+        if not old or not old.get("rps") or not stats.get("rps"):
+            continue
+        typer.echo(f"  {name:<12} rps {stats['rps'] / old['rps'] - 1:>+7.1%}"
+                   f"   p95 {stats['p95_ms'] / old['p95_ms'] - 1:>+7.1%}")
+
+
+def main(patients: int = 100000, clients: int = 16, duration: float = 15.0,
+         warmup: float = 2.0, workers: int = 1, seed: int = 7,
+         base_url: str = typer.Option(None, help="Use a running API instead of starting uvicorn"),
+         endpoints: str = typer.Option(",".join(ENDPOINTS), help="Comma-separated subset"),
+         baseline: str = typer.Option(None, help="Earlier report to compare against"),
+         output: str = os.path.join(RESULTS_DIR, "load.json")):
+    """Throughput and latency percentiles per endpoint under concurrent clients"""
+    try:
+        connection.init_database()
+    except Exception as e:
+        typer.echo(f"❌ MySQL is not reachable ({e}); set MYSQL_HOST/MYSQL_USER/MYSQL_PASSWORD")
+        raise typer.Exit(1)
+    user_id = bench_user()
+    seed_t0 = time.perf_counter()
+    seed_patients(patients, user_id, seed)
+    seed_seconds = time.perf_counter() - seed_t0
+
+    proc = None
+    if base_url is None:
+        proc, base_url = start_server(workers)
+    try:
+        with httpx.Client(base_url=base_url, timeout=30) as client:
+            sessions = [login(client) for _ in range(clients)]
+            client.headers["X-Session-Id"] = sessions[0]
+            total = client.get("/patients/", params={"limit": 1}).json()["total"]
+            rng = random.Random(seed)
+            ids = []
+            for _ in range(20):
+                page = client.get("/patients/", params={
+                    "limit": PAGE_SIZE, "offset": rng.randrange(max(1, total - PAGE_SIZE))})
+                ids.extend(p["id"] for p in page.json()["patients"])
+        terms = sorted({r["patient_name"].split(" ")[0][:4] for r in datasets.source_rows()[1]
+                        if r["patient_name"]})
+
+        result = {"meta": {"commit": git_commit(), "at": datetime.now().isoformat(timespec="seconds"),
+                           "patients": total, "clients": clients, "duration_s": duration,
+                           "workers": workers, "seed_seconds": round(seed_seconds, 1),
+                           "python": platform.python_version(), "base_url": base_url},
+                  "endpoints": {}}
+        for name in (e.strip() for e in endpoints.split(",")):
+            request = requests_for(name, random.Random(seed), ids, terms, total)
+            stats = drive(base_url, sessions, request, duration, warmup)
+            result["endpoints"][name] = stats
+            if stats["requests"]:
+                typer.echo(f"{name:<12}{stats['rps']:>9.1f} req/s  p50 {stats['p50_ms']:>8.2f}"
+                           f"  p95 {stats['p95_ms']:>8.2f}  p99 {stats['p99_ms']:>8.2f} ms"
+                           f"  errors {stats['errors']}")
+            else:
+                typer.echo(f"{name:<12}no completed requests")
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=10)
+
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    typer.echo(f"✅ Wrote {output}")
+    if baseline:
+        compare(result, baseline)
+
+
+if __name__ == "__main__":
+    typer.run(main)
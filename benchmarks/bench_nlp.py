@@ -0,0 +1,112 @@
+"""
+Throughput benchmark for clinical notes analysis on a synthetic corpus.
+
+Compares the original four-regex summarizer, the same per-finding approach
+over the full lexicon, and ml.nlp (single compiled matcher) sequentially and
+through the process pool in summarize_many.
+
+    python -m benchmarks.bench_nlp --notes 100000 --workers 4
+"""
+
+import json
+import os
+import random
+import re
+import time
+
+import typer
+
+from ml import nlp
+from ml.features import ROOT_DIR
+
+RESULTS_DIR = os.path.join(ROOT_DIR, "benchmarks", "results")
+
+# same templates as frontend/utils/data.generate_clinical_notes, plus a few
+# lexicon-heavy ones so matching is exercised
+TEMPLATES = [
+    "Patient shows stable vitals with minor fluctuations. Continue medication.",
+    "Blood pressure elevated during morning rounds.",
+    "Patient reports feeling better today.",
+    "Oxygen saturation slightly low overnight.",
+    "Temperature spike noted at 14:00.",
+    "Patient comfortable, pain well controlled.",
+    "Heart rate irregular during exercise.",
+    "Reports fatigue and missed doses of metformin; fasting glucose 182.",
+    "Complains of chest pain on exertion and shortness of breath climbing stairs.",
+    "Hypertensive urgency resolved, BP 138/86 after second dose.",
+]
+FILLER = ("follow up in clinic review labs plan discussed with family nursing "
+          "handover medications reconciled no acute distress ambulating").split()
+
+
+def make_corpus(n: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(n):
+        parts = rng.sample(TEMPLATES, rng.randint(1, 4))
+        parts.append(" ".join(rng.choices(FILLER, k=rng.randint(5, 30))))
+        corpus.append(" ".join(parts))
+    return corpus
+
+
+def legacy_summarize(text: str) -> str:
+    """ml.nlp.summarize_notes before the single-pass matcher"""
+    findings = []
+    if re.search(r"fatigue|tired", text.lower()):
+        findings.append("Patient reports fatigue")
+    if re.search(r"adherence|non-compliance", text.lower()):
+        findings.append("Possible medication non-adherence")
+    if re.search(r"bp|blood pressure|hypertension", text.lower()):
+        findings.append("Hypertension noted")
+    if re.search(r"sugar|glucose|diabetes", text.lower()):
+        findings.append("Diabetes-related issues present")
+    return "; ".join(findings) if findings else "No significant insights extracted."
+
+
+def naive_full_lexicon(text: str) -> str:
+    """The legacy approach (lowercase + re.search per finding) over the full lexicon"""
+    findings = [finding for finding, terms in nlp.CLINICAL_LEXICON.items()
+                if re.search("|".join(terms), text.lower())]
+    return "; ".join(findings) if findings else nlp.NO_FINDINGS
+
+
+def run(label: str, fn, corpus: list, total_bytes: int) -> dict:
+    t0 = time.perf_counter()
+    fn(corpus)
+    elapsed = time.perf_counter() - t0
+    stats = {
+        "seconds": round(elapsed, 3),
+        "notes_per_sec": round(len(corpus) / elapsed, 1),
+        "mb_per_sec": round(total_bytes / elapsed / 1e6, 2),
+    }
+    typer.echo(f"{label:<24}{stats['notes_per_sec']:>14,.0f}{stats['mb_per_sec']:>10.2f}")
+    return stats
+
+
+def main(notes: int = 100000, workers: int = 4, output: str = os.path.join(RESULTS_DIR, "nlp.json")):
+    """Measure notes/sec for legacy, sequential and pooled summarization"""
+    corpus = make_corpus(notes)
+    total_bytes = sum(len(t) for t in corpus)
+    typer.echo(f"{notes} notes, {total_bytes / 1e6:.1f} MB, "
+               f"{len(nlp.CLINICAL_LEXICON)} findings in lexicon")
+    typer.echo(f"{'':<24}{'notes/sec':>14}{'MB/sec':>10}")
+
+    result = {"notes": notes, "bytes": total_bytes, "workers": workers, "runs": {}}
+    result["runs"]["legacy_4_regex"] = run(
+        "legacy (4 regex)", lambda c: [legacy_summarize(t) for t in c], corpus, total_bytes)
+    result["runs"]["naive_full_lexicon"] = run(
+        "naive, full lexicon", lambda c: [naive_full_lexicon(t) for t in c], corpus, total_bytes)
+    result["runs"]["compiled_sequential"] = run(
+        "compiled, sequential", lambda c: nlp.summarize_many(c), corpus, total_bytes)
+    result["runs"]["compiled_pool"] = run(
+        f"compiled, {workers} processes", lambda c: nlp.summarize_many(c, workers=workers),
+        corpus, total_bytes)
+
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    typer.echo(f"✅ Wrote {output}")
+
+
+if __name__ == "__main__":
+    typer.run(main)
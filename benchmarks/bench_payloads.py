@@ -0,0 +1,126 @@
+"""
+Response payload size and encode time: JSON rows vs compressed and columnar.
+
+Builds synthetic pages of patient rows and a patient vitals history, then
+encodes each the way the API can return it: JSON rows through FastAPI's
+jsonable_encoder and through the shared formats.dumps path, gzip/brotli of that, column arrays as JSON
+(`application/vnd.aegiscare.columns+json`) with and without gzip, and
+MessagePack / Arrow when those optional packages are installed.
+
+    python -m benchmarks.bench_payloads --patients 1000 --vitals 20000
+"""
+
+import gzip
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import typer
+from fastapi.encoders import jsonable_encoder
+
+from ml.features import ROOT_DIR
+
+sys.path.append(os.path.join(ROOT_DIR, "backend"))
+
+from app.api import formats  # noqa: E402
+from app.api.routers.patients import PATIENT_COLUMNS  # noqa: E402
+from app.core import compression  # noqa: E402
+
+RESULTS_DIR = os.path.join(ROOT_DIR, "benchmarks", "results")
+VITAL_TYPES = ("HEART_RATE", "BP_SYSTOLIC", "BP_DIASTOLIC", "TEMPERATURE", "SPO2")
+
+
+def patient_rows(n: int, rng: random.Random) -> list:
+    start = datetime(2024, 1, 1)
+    return [{"id": i, "uid": f"P{i:06d}", "name": f"Patient {i}", "age": rng.randint(25, 90),
+             "sex": rng.choice(("M", "F")), "phone": f"555-{i:07d}",
+             "created_at": start + timedelta(minutes=i), "condition": rng.choice(("Stable", "Critical")),
+             "chest_pain_type": rng.randint(0, 3), "resting_bp": rng.randint(95, 180),
+             "cholesterol": rng.randint(120, 380), "fasting_bs": rng.randint(0, 1),
+             "resting_ecg": rng.randint(0, 2), "max_heart_rate": rng.randint(80, 200),
+             "exercise_angina": rng.randint(0, 1), "st_depression": round(rng.uniform(0, 5), 1),
+             "st_slope": rng.randint(0, 2), "num_vessels": rng.randint(0, 3),
+             "thalassemia": rng.randint(0, 3), "target": rng.randint(0, 1)}
+            for i in range(n)]
+
+
+def vitals_rows(n: int, rng: random.Random) -> list:
+    start = datetime(2024, 1, 1)
+    return [{"obs_type": VITAL_TYPES[i % len(VITAL_TYPES)],
+             "ts": start + timedelta(minutes=i // len(VITAL_TYPES)),
+             "value": round(rng.uniform(36, 180), 1)} for i in range(n)]
+
+
+def timed(fn, runs: int):
+    """(result, best-of-N ms)"""
+    best, out = float("inf"), None
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, (time.perf_counter() - t0) * 1000)
+    return out, round(best, 2)
+
+
+def encodings(rows: list, columns, key: str, runs: int) -> dict:
+    json_body, json_ms = timed(lambda: json.dumps(jsonable_encoder({key: rows})).encode(), runs)
+    results = {"json": {"bytes": len(json_body), "ms": json_ms}}
+    # the routers' path: cursor rows straight into formats.dumps (orjson when installed)
+    fast, fast_ms = timed(lambda: formats.dumps({key: rows}), runs)
+    results["json (dumps)"] = {"bytes": len(fast), "ms": fast_ms}
+    gz, gz_ms = timed(lambda: gzip.compress(json_body, compression.GZIP_LEVEL), runs)
+    results["json+gzip"] = {"bytes": len(gz), "ms": round(json_ms + gz_ms, 2)}
+    if compression.brotli is not None:
+        br, br_ms = timed(lambda: compression.brotli.compress(
+            json_body, quality=compression.BROTLI_QUALITY), runs)
+        results["json+br"] = {"bytes": len(br), "ms": round(json_ms + br_ms, 2)}
+    else:
+        results["json+br"] = "unavailable (pip install brotli)"
+
+    for name, media in (("columns", formats.COLUMNS_JSON), ("msgpack", formats.MSGPACK),
+                        ("arrow", formats.ARROW_STREAM)):
+        try:
+            body, ms = timed(lambda: formats.encode_columns(
+                formats.to_columns(rows, columns), media), runs)
+        except Exception as e:
+            results[name] = f"unavailable ({getattr(e, 'detail', e)})"
+            continue
+        results[name] = {"bytes": len(body), "ms": ms}
+        gz, gz_ms = timed(lambda: gzip.compress(body, compression.GZIP_LEVEL), runs)
+        results[f"{name}+gzip"] = {"bytes": len(gz), "ms": round(ms + gz_ms, 2)}
+    return results
+
+
+def main(patients: int = 1000, vitals: int = 20000, runs: int = 5, seed: int = 7,
+         output: str = os.path.join(RESULTS_DIR, "payloads.json")):
+    """Bytes on the wire and encode time per response encoding"""
+    rng = random.Random(seed)
+    result = {
+        "patients": {"rows": patients,
+                     "encodings": encodings(patient_rows(patients, rng), PATIENT_COLUMNS,
+                                            "patients", runs)},
+        "vitals": {"rows": vitals,
+                   "encodings": encodings(vitals_rows(vitals, rng), ("obs_type", "ts", "value"),
+                                          "vitals", runs)},
+    }
+
+    for name, section in result.items():
+        typer.echo(f"{name} ({section['rows']} rows)")
+        base = section["encodings"]["json"]["bytes"]
+        for enc, stats in section["encodings"].items():
+            if isinstance(stats, str):
+                typer.echo(f"  {enc:<14}{stats}")
+                continue
+            typer.echo(f"  {enc:<14}{stats['bytes']:>12,} B {stats['bytes'] / base:>7.1%}"
+                       f"{stats['ms']:>10.2f} ms")
+
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    typer.echo(f"✅ Wrote {output}")
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,74 @@
+"""
+What-if simulation throughput: vectorized cohort sweep vs per-patient loop.
+
+Tiles the bundled dataset to the requested cohort size, runs a sweep of
+intervention magnitudes through ml.simulate, and compares against scoring
+one patient and one magnitude at a time (the shape of the old Streamlit
+simulate_intervention_impact flow). Requires `python -m ml.train`.
+
+    python -m benchmarks.bench_simulation --patients 10000 --magnitudes 20
+"""
+
+import json
+import os
+import time
+
+import numpy as np
+import typer
+
+from ml import simulate as sim
+from ml.compiled import load_compiled
+from ml.features import FEATURES, ROOT_DIR, load_dataset
+
+RESULTS_DIR = os.path.join(ROOT_DIR, "benchmarks", "results")
+
+
+def main(patients: int = 10000, magnitudes: int = 20, loop_patients: int = 200,
+         intervention: str = "bp_medication",
+         output: str = os.path.join(RESULTS_DIR, "simulation.json")):
+    """Patient-scenarios/sec for vectorized and looped what-if simulation"""
+    model = load_compiled()
+    X, _ = load_dataset()
+    X = np.resize(X[FEATURES].to_numpy(), (patients, len(FEATURES)))
+    scenarios = sim.sweep(intervention, np.linspace(0, 30, magnitudes))
+
+    t0 = time.perf_counter()
+    result = sim.simulate(model, X, scenarios)
+    vec_s = time.perf_counter() - t0
+
+    # per-patient, per-magnitude scoring on a subset, extrapolated per row
+    sub = X[:loop_patients]
+    t0 = time.perf_counter()
+    for row in sub:
+        for scenario in scenarios:
+            shifted = sim.apply_shifts(row[None, :], FEATURES,
+                                       sim.scenario_shifts(FEATURES, [scenario]))
+            model.predict_proba(shifted[0])
+    loop_s = time.perf_counter() - t0
+
+    vec_rate = patients * len(scenarios) / vec_s
+    loop_rate = loop_patients * len(scenarios) / loop_s
+    out = {
+        "patients": patients,
+        "scenarios": len(scenarios),
+        "vectorized": {"seconds": round(vec_s, 3),
+                       "patient_scenarios_per_sec": round(vec_rate, 1),
+                       "patients_per_sec_full_sweep": round(patients / vec_s, 1)},
+        "per_patient_loop": {"patients": loop_patients,
+                             "patient_scenarios_per_sec": round(loop_rate, 1)},
+        "speedup": round(vec_rate / loop_rate, 1),
+        "baseline_mean_target": round(float(result["baseline"]["target"].mean()), 4),
+    }
+    typer.echo(f"vectorized: {patients} patients x {len(scenarios)} magnitudes in "
+               f"{vec_s:.2f}s ({vec_rate:,.0f} patient-scenarios/s, "
+               f"{patients / vec_s:,.0f} patients/s for the full sweep)")
+    typer.echo(f"loop:       {loop_rate:,.0f} patient-scenarios/s (x{out['speedup']} slower)")
+
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(out, f, indent=2)
+    typer.echo(f"✅ Wrote {output}")
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,123 @@
+"""
+Scale the bundled heart-disease CSV to an arbitrary number of rows.
+
+Each generated patient is drawn from a row of
+data/merged_with_synthetic_outcomes.csv, so the joint distribution of
+vitals and outcomes is the dataset's own. Continuous vitals get a little
+Gaussian noise (JITTER of the column's standard deviation, clipped to its
+observed range and kept non-negative) and names are recombined from the
+dataset's first and last names, so a million rows are not just 100 copies
+of 10k. Missing markers (empty, -1, a cholesterol of 0) are left alone.
+
+`--duplicates` is the share of rows that re-send an earlier patient from the
+same file: same uid, name, phone, age and sex, with a fresh measurement of
+the same vitals. That exercises the update path of ingest_csv the way
+repeated uploads do.
+
+    python -m benchmarks.datasets --patients 100000 --output data/patients_100k.csv
+    python -m benchmarks.datasets --patients 1000000 --duplicates 0.1
+"""
+
+import csv
+import io
+import os
+import random
+from functools import lru_cache
+
+import typer
+
+from ml.features import DATA_PATH, ROOT_DIR
+
+JITTER = 0.05
+# CSV column -> decimals kept after jitter
+CONTINUOUS = {
+    "Resting blood pressure": 0,
+    "Serum cholesterol level (mg/dl).": 0,
+    "Maximum Heart Rate Achieved": 0,
+    "ST Depression Induced by Exercise": 1,
+}
+
+
+@lru_cache(maxsize=2)
+def _source(path: str):
+    with open(path, newline="") as f:
+        reader = csv.DictReader(f)
+        rows = list(reader)
+    names = [r["patient_name"].split(" ", 1) for r in rows if " " in r["patient_name"]]
+    ranges = {}
+    for col in CONTINUOUS:
+        values = [v for v in (_number(r.get(col)) for r in rows) if v]
+        mean = sum(values) / len(values)
+        std = (sum((v - mean) ** 2 for v in values) / len(values)) ** 0.5
+        ranges[col] = (min(values), max(values), std)
+    return (tuple(reader.fieldnames), rows, sorted({n[0] for n in names}),
+            sorted({n[1] for n in names}), ranges)
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def source_rows(path: str = DATA_PATH) -> tuple:
+    """(header, rows) of the bundled CSV"""
+    header, rows, *_ = _source(path)
+    return list(header), rows
+
+
+def _identity(seed: int, index: int, path: str) -> tuple:
+    """(base row, name) for patient `index`; the same for every row of that patient"""
+    _, rows, firsts, lasts, _ = _source(path)
+    rng = random.Random(f"{seed}:{index}")
+    return rows[rng.randrange(len(rows))], f"{rng.choice(firsts)} {rng.choice(lasts)}"
+
+
+def scaled_rows(patients: int, seed: int = 7, start: int = 1, duplicates: float = 0.0,
+                prefix: str = "L", path: str = DATA_PATH):
+    """`patients` rows; patient uids are `prefix` + index from `start`, duplicates reuse earlier ones"""
+    if not 0 <= duplicates < 1:
+        raise ValueError("duplicates must be in [0, 1)")
+    ranges = _source(path)[4]
+    rng = random.Random(seed)
+    for i in range(start, start + patients):
+        index = i
+        if i > start and rng.random() < duplicates:
+            index = rng.randrange(start, i)
+        base, name = _identity(seed, index, path)
+        row = dict(base)
+        row["patient_id"] = f"{prefix}{index:07d}"
+        row["patient_name"] = name
+        row["phone"] = f"-8{index:09d}"
+        for col, decimals in CONTINUOUS.items():
+            value = _number(row.get(col))
+            if not value or value < 0:
+                continue
+            low, high, std = ranges[col]
+            value = min(high, max(low, 0.0, rng.gauss(value, std * JITTER)))
+            row[col] = f"{value:.{decimals}f}" if decimals else str(round(value))
+        yield row
+
+
+def to_csv(rows, header) -> bytes:
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=header)
+    writer.writeheader()
+    writer.writerows(rows)
+    return buf.getvalue().encode()
+
+
+def main(patients: int = 100000, seed: int = 7, duplicates: float = 0.0,
+         output: str = os.path.join(ROOT_DIR, "data", "patients_scaled.csv")):
+    """Write a CSV of `patients` rows in the upload format"""
+    header, _ = source_rows()
+    with open(output, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=header)
+        writer.writeheader()
+        writer.writerows(scaled_rows(patients, seed, duplicates=duplicates))
+    typer.echo(f"✅ Wrote {patients:,} rows ({duplicates:.0%} repeat patients) to {output}")
+
+
+if __name__ == "__main__":
+    typer.run(main)
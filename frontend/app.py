@@ -1,7 +1,7 @@
 import streamlit as st
 import time
-import pandas as pd
-from utils.api import post, get
+from utils.api import post
+from utils import directory
 from utils.state import ensure_keys
 
 st.set_page_config(page_title="AegisCare", layout="wide")
@@ -71,37 +71,6 @@ if not st.session_state.session_id:
 
     st.stop()  # Stop execution until authenticated
 
-# Load patients data from backend after authentication
-if st.session_state.session_id and not st.session_state.patients_data:
-    try:
-        patients_response = get("/patients/")
-        if patients_response.ok:
-            patients_data = patients_response.json()
-            patients = patients_data.get('patients', [])
-
-            # Convert to the expected format
-            for patient in patients:
-                patient_id = patient.get('uid', str(patient.get('id', '')))
-
-                st.session_state.patients_data[patient_id] = {
-                    # Store numeric ID for backend API
-                    'id': patient.get('id', patient_id),
-                    'name': patient.get('name', f"Patient {patient_id}"),
-                    'age': patient.get('age', 0),
-                    'gender': 'M' if patient.get('sex') == 'M' else 'F',
-                    'condition': patient.get('condition', 'Unknown'),
-                    'vitals': pd.DataFrame(),  # Will be populated from real data
-                    'notes': []
-                }
-
-            st.success(f"✅ Loaded {len(patients)} patients from database")
-        else:
-            st.error("❌ Failed to load patients data from backend")
-            st.session_state.patients_data = {}
-    except Exception as e:
-        st.error(f"❌ Error connecting to backend: {str(e)}")
-        st.session_state.patients_data = {}
-
 # CSV Upload Section - Only show if logged in but haven't uploaded yet
 if st.session_state.session_id and not st.session_state.passed_loader:
     st.divider()
@@ -142,8 +111,8 @@ if st.session_state.session_id and not st.session_state.passed_loader:
                             st.session_state.upload_status = "completed"
                             st.session_state.passed_loader = True
 
-                            # Clear existing patients data to force reload
-                            st.session_state.patients_data = {}
+                            # Drop cached directory pages so new patients show up
+                            directory.reset()
 
                             st.success(f"""
                             ✅ **Data Processing Complete!**
@@ -166,31 +135,6 @@ if st.session_state.session_id and not st.session_state.passed_loader:
 if st.session_state.session_id and st.session_state.passed_loader:
     st.divider()
 
-    # Refresh patients data if needed
-    if not st.session_state.patients_data:
-        try:
-            patients_response = get("/patients/")
-            if patients_response.ok:
-                patients_data = patients_response.json()
-                patients = patients_data.get('patients', [])
-
-                # Convert to the expected format
-                for patient in patients:
-                    patient_id = patient.get('uid', str(patient.get('id', '')))
-
-                    st.session_state.patients_data[patient_id] = {
-                        # Store numeric ID for backend API
-                        'id': patient.get('id', patient_id),
-                        'name': patient.get('name', f"Patient {patient_id}"),
-                        'age': patient.get('age', 0),
-                        'gender': 'M' if patient.get('sex') == 'M' else 'F',
-                        'condition': patient.get('condition', 'Unknown'),
-                        'vitals': pd.DataFrame(),  # Will be populated from real data
-                        'notes': []
-                    }
-        except Exception as e:
-            st.error(f"❌ Could not refresh patients data: {str(e)}")
-
     # Add refresh button
     col1, col2 = st.columns([3, 1])
     with col1:
@@ -198,7 +142,7 @@ if st.session_state.session_id and st.session_state.passed_loader:
             "📊 **Dashboard Ready:** You can now access all features from the sidebar.")
     with col2:
         if st.button("🔄 Refresh Data", type="secondary"):
-            st.session_state.patients_data = {}
+            directory.reset()
             st.rerun()
 
     # Role-based navigation
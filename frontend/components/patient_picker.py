@@ -0,0 +1,46 @@
+import streamlit as st
+from utils.directory import PAGE_SIZE, fetch_page
+
+
+def patient_picker(label: str = "Select Patient", key: str = "patient"):
+    """
+    Server-side search box, page selector and patient select box.
+    Returns the selected patient ({id, uid, name, age, sex}) or None.
+    """
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        search = st.text_input("🔍 Search by name or ID", key=f"{key}_search",
+                               placeholder="Type to search, Enter to apply").strip()
+    # a new search starts again from the first page
+    if st.session_state.get(f"{key}_last_search") != search:
+        st.session_state[f"{key}_last_search"] = search
+        st.session_state[f"{key}_page"] = 1
+    page = st.session_state.get(f"{key}_page", 1)
+
+    try:
+        data = fetch_page(search, page)
+    except Exception as e:
+        st.error(f"❌ Error connecting to backend: {str(e)}")
+        return None
+    total_pages = max(1, (data["total"] + PAGE_SIZE - 1) // PAGE_SIZE)
+    if page > total_pages:
+        # the census shrank or the search narrowed since this page was chosen
+        st.session_state[f"{key}_page"] = page = total_pages
+        data = fetch_page(search, page)
+    with col2:
+        st.number_input(f"Page (of {total_pages})", min_value=1, max_value=total_pages,
+                        key=f"{key}_page")
+
+    patients = data["patients"]
+    if not patients:
+        st.info("📋 No patients found." if search else
+                "📋 No patients found. Please upload patient data first.")
+        return None
+    by_id = {p["id"]: p for p in patients}
+    selected = st.selectbox(
+        f"{label} ({data['total']} matching, showing {len(patients)})",
+        options=list(by_id),
+        format_func=lambda pid: f"{by_id[pid]['uid']} - {by_id[pid]['name']}",
+        key=f"{key}_select",
+    )
+    return by_id.get(selected)
@@ -3,7 +3,8 @@ import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 from utils.styling import apply_custom_css
-from utils.api import get
+from utils.api import get, get_many
+from utils.live import dashboard_events, apply_events, event_mark
 import pandas as pd
 
 apply_custom_css()
@@ -12,183 +13,217 @@ st.markdown('<h1 class="main-header">Healthcare Analytics Dashboard</h1>',
 
 st.header("📊 Dashboard Overview")
 
-# Fetch dashboard statistics from backend
-try:
-    stats_response = get("/dashboard/stats")
-    if stats_response.ok:
-        stats = stats_response.json()
+live_updates = st.toggle("🔴 Live updates", value=False,
+                         help="Apply upload and streamed-observation changes as they happen")
+# how often the overview re-runs to apply queued deltas; it never blocks on the stream
+LIVE_REFRESH_SECONDS = 2
+
+
+def load_dashboard():
+    """
+    Fetch stats and vitals summary once; later reruns apply pushed deltas.
+    Each response's X-Event-Id is the last event published before the server
+    read it: later deltas at or below it are already in the body.
+    """
+    cache = {"stats": {}, "vitals": None, "marks": {"stats": 0, "vitals": 0}}
+    responses = get_many({"stats": "/dashboard/stats", "vitals": "/dashboard/vitals-summary"})
+    stats_response, vitals_response = responses["stats"], responses["vitals"]
+    if isinstance(stats_response, Exception):
+        st.error(f"Error connecting to backend: {str(stats_response)}")
+    elif stats_response.ok:
+        cache["stats"] = stats_response.json()
+        cache["marks"]["stats"] = event_mark(stats_response)
     else:
         st.error("Failed to fetch dashboard statistics")
-        stats = {}
-except Exception as e:
-    st.error(f"Error connecting to backend: {str(e)}")
-    stats = {}
-
-# Display key metrics
-col1, col2, col3, col4 = st.columns(4)
-
-with col1:
-    st.markdown(
-        f"""
-    <div class="metric-card">
-    <h3>Total Patients</h3>
-    <h2>{stats.get('total_patients', 0)}</h2>
-    </div>
-    """,
-        unsafe_allow_html=True,
-    )
-
-with col2:
-    st.markdown(
-        f"""
-    <div class="metric-card">
-    <h3>Total Observations</h3>
-    <h2>{stats.get('total_observations', 0)}</h2>
-    </div>
-    """,
-        unsafe_allow_html=True,
-    )
-
-with col3:
-    st.markdown(
-        f"""
-    <div class="metric-card">
-    <h3>Avg Age</h3>
-    <h2>{stats.get('avg_age', 0):.1f}</h2>
-    </div>
-    """,
-        unsafe_allow_html=True,
-    )
-
-with col4:
-    st.markdown(
-        f"""
-    <div class="metric-card">
-    <h3>Patient Recovery Rate</h3>
-    <h2>{stats.get('recovery_rate', 0):.1%}</h2>
-    </div>
-    """,
-        unsafe_allow_html=True,
-    )
-
-# Additional metrics row
-col5, col6, col7, col8 = st.columns(4)
-
-with col5:
-    st.markdown(
-        f"""
-    <div class="metric-card">
-    <h3>Male Patients</h3>
-    <h2>{stats.get('male_patients', 0)}</h2>
-    </div>
-    """,
-        unsafe_allow_html=True,
-    )
-
-with col6:
-    st.markdown(
-        f"""
-    <div class="metric-card">
-    <h3>Female Patients</h3>
-    <h2>{stats.get('female_patients', 0)}</h2>
-    </div>
-    """,
-        unsafe_allow_html=True,
-    )
-
-with col7:
-    st.markdown(
-        f"""
-    <div class="metric-card">
-    <h3>Data Uploads</h3>
-    <h2>{stats.get('total_uploads', 0)}</h2>
-    </div>
-    """,
-        unsafe_allow_html=True,
-    )
-
-with col8:
-    # Calculate critical patients based on heart disease status
-    critical_count = stats.get('heart_disease_count', 0)
-    st.markdown(
-        f"""
-    <div class="metric-card">
-    <h3>Heart Disease Cases</h3>
-    <h2>{critical_count}</h2>
-    </div>
-    """,
-        unsafe_allow_html=True,
-    )
-
-# Fetch and display vitals summary charts
-try:
-    vitals_response = get("/dashboard/vitals-summary")
-    if vitals_response.ok:
-        vitals_data = vitals_response.json()
-
-        st.subheader("📈 Heart Disease Vitals Distribution")
-
-        # Create charts for different vital ranges
-        col_chart1, col_chart2 = st.columns(2)
-
-        with col_chart1:
-            if 'blood_pressure_ranges' in vitals_data:
-                bp_data = vitals_data['blood_pressure_ranges']
-                fig_bp = px.pie(
-                    values=list(bp_data.values()),
-                    names=list(bp_data.keys()),
-                    title="Blood Pressure Distribution",
-                    color_discrete_map={
-                        'normal': '#00ff00',
-                        'elevated': '#ffff00',
-                        'high': '#ff0000'
-                    }
+    if isinstance(vitals_response, Exception):
+        st.warning(f"Could not load vitals charts: {str(vitals_response)}")
+    elif vitals_response.ok:
+        cache["vitals"] = vitals_response.json()
+        cache["marks"]["vitals"] = event_mark(vitals_response)
+    return cache
+
+
+@st.fragment(run_every=LIVE_REFRESH_SECONDS if live_updates else None)
+def overview():
+    """Key metrics and vitals charts; with live updates, re-run on a timer to apply pushed deltas"""
+    events = dashboard_events() if live_updates else None
+    cache = st.session_state.get("dashboard_cache")
+    if cache is None or not live_updates:
+        cache = load_dashboard()
+        st.session_state.dashboard_cache = cache
+    elif not apply_events(cache, events.drain()):
+        cache = load_dashboard()
+        st.session_state.dashboard_cache = cache
+    stats = cache["stats"]
+
+    # Display key metrics
+    col1, col2, col3, col4 = st.columns(4)
+
+    with col1:
+        st.markdown(
+            f"""
+        <div class="metric-card">
+        <h3>Total Patients</h3>
+        <h2>{stats.get('total_patients', 0)}</h2>
+        </div>
+        """,
+            unsafe_allow_html=True,
+        )
+
+    with col2:
+        st.markdown(
+            f"""
+        <div class="metric-card">
+        <h3>Total Observations</h3>
+        <h2>{stats.get('total_observations', 0)}</h2>
+        </div>
+        """,
+            unsafe_allow_html=True,
+        )
+
+    with col3:
+        st.markdown(
+            f"""
+        <div class="metric-card">
+        <h3>Avg Age</h3>
+        <h2>{stats.get('avg_age', 0):.1f}</h2>
+        </div>
+        """,
+            unsafe_allow_html=True,
+        )
+
+    with col4:
+        st.markdown(
+            f"""
+        <div class="metric-card">
+        <h3>Patient Recovery Rate</h3>
+        <h2>{stats.get('recovery_rate', 0):.1%}</h2>
+        </div>
+        """,
+            unsafe_allow_html=True,
+        )
+
+    # Additional metrics row
+    col5, col6, col7, col8 = st.columns(4)
+
+    with col5:
+        st.markdown(
+            f"""
+        <div class="metric-card">
+        <h3>Male Patients</h3>
+        <h2>{stats.get('male_patients', 0)}</h2>
+        </div>
+        """,
+            unsafe_allow_html=True,
+        )
+
+    with col6:
+        st.markdown(
+            f"""
+        <div class="metric-card">
+        <h3>Female Patients</h3>
+        <h2>{stats.get('female_patients', 0)}</h2>
+        </div>
+        """,
+            unsafe_allow_html=True,
+        )
+
+    with col7:
+        st.markdown(
+            f"""
+        <div class="metric-card">
+        <h3>Data Uploads</h3>
+        <h2>{stats.get('total_uploads', 0)}</h2>
+        </div>
+        """,
+            unsafe_allow_html=True,
+        )
+
+    with col8:
+        # Calculate critical patients based on heart disease status
+        critical_count = stats.get('heart_disease_count', 0)
+        st.markdown(
+            f"""
+        <div class="metric-card">
+        <h3>Heart Disease Cases</h3>
+        <h2>{critical_count}</h2>
+        </div>
+        """,
+            unsafe_allow_html=True,
+        )
+
+    # Fetch and display vitals summary charts
+    try:
+        vitals_data = cache["vitals"]
+        if vitals_data is not None:
+
+            st.subheader("📈 Heart Disease Vitals Distribution")
+
+            # Create charts for different vital ranges
+            col_chart1, col_chart2 = st.columns(2)
+
+            with col_chart1:
+                if 'blood_pressure_ranges' in vitals_data:
+                    bp_data = vitals_data['blood_pressure_ranges']
+                    fig_bp = px.pie(
+                        values=list(bp_data.values()),
+                        names=list(bp_data.keys()),
+                        title="Blood Pressure Distribution",
+                        color_discrete_map={
+                            'normal': '#00ff00',
+                            'elevated': '#ffff00',
+                            'high': '#ff0000'
+                        }
+                    )
+                    st.plotly_chart(fig_bp, use_container_width=True)
+
+            with col_chart2:
+                if 'heart_rate_ranges' in vitals_data:
+                    hr_data = vitals_data['heart_rate_ranges']
+                    fig_hr = px.pie(
+                        values=list(hr_data.values()),
+                        names=list(hr_data.keys()),
+                        title="Heart Rate Distribution",
+                        color_discrete_map={
+                            'low': '#87ceeb',
+                            'normal': '#90ee90',
+                            'high': '#ff6347'
+                        }
+                    )
+                    st.plotly_chart(fig_hr, use_container_width=True)
+
+            # Cholesterol distribution
+            if 'cholesterol_ranges' in vitals_data:
+                chol_data = vitals_data['cholesterol_ranges']
+                fig_chol = px.bar(
+                    x=list(chol_data.keys()),
+                    y=list(chol_data.values()),
+                    title="Cholesterol Distribution",
+                    color=list(chol_data.values()),
+                    color_continuous_scale='RdYlGn_r'
                 )
-                st.plotly_chart(fig_bp, use_container_width=True)
-
-        with col_chart2:
-            if 'heart_rate_ranges' in vitals_data:
-                hr_data = vitals_data['heart_rate_ranges']
-                fig_hr = px.pie(
-                    values=list(hr_data.values()),
-                    names=list(hr_data.keys()),
-                    title="Heart Rate Distribution",
+                st.plotly_chart(fig_chol, use_container_width=True)
+
+            # Heart disease status
+            if 'heart_disease_status' in vitals_data:
+                hd_data = vitals_data['heart_disease_status']
+                fig_hd = px.pie(
+                    values=list(hd_data.values()),
+                    names=list(hd_data.keys()),
+                    title="Heart Disease Status",
                     color_discrete_map={
-                        'low': '#87ceeb',
-                        'normal': '#90ee90',
-                        'high': '#ff6347'
+                        'healthy': '#00ff00',
+                        'heart_disease': '#ff0000'
                     }
                 )
-                st.plotly_chart(fig_hr, use_container_width=True)
-
-        # Cholesterol distribution
-        if 'cholesterol_ranges' in vitals_data:
-            chol_data = vitals_data['cholesterol_ranges']
-            fig_chol = px.bar(
-                x=list(chol_data.keys()),
-                y=list(chol_data.values()),
-                title="Cholesterol Distribution",
-                color=list(chol_data.values()),
-                color_continuous_scale='RdYlGn_r'
-            )
-            st.plotly_chart(fig_chol, use_container_width=True)
-
-        # Heart disease status
-        if 'heart_disease_status' in vitals_data:
-            hd_data = vitals_data['heart_disease_status']
-            fig_hd = px.pie(
-                values=list(hd_data.values()),
-                names=list(hd_data.keys()),
-                title="Heart Disease Status",
-                color_discrete_map={
-                    'healthy': '#00ff00',
-                    'heart_disease': '#ff0000'
-                }
-            )
-            st.plotly_chart(fig_hd, use_container_width=True)
+                st.plotly_chart(fig_hd, use_container_width=True)
 
-except Exception as e:
-    st.warning(f"Could not load vitals charts: {str(e)}")
+    except Exception as e:
+        st.warning(f"Could not load vitals charts: {str(e)}")
+
+
+overview()
+stats = st.session_state.dashboard_cache["stats"]
 
 # Recent Activity Section
 st.subheader("🔄 Recent Activity")
@@ -2,8 +2,29 @@ import streamlit as st
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 from utils.styling import apply_custom_css
-from utils.api import get
+from utils.api import get, post
+from utils import directory
+from components.patient_picker import patient_picker
 import pandas as pd
+from datetime import datetime, timedelta
+
+# server-side downsampling target per series; plots stay responsive for long histories
+CHART_POINTS = 500
+# obs_type -> label, unit, chart colour
+VITAL_SERIES = [
+    ("RESTING_BP", "Resting BP", "mmHg", "blue"),
+    ("MAX_HEART_RATE", "Max Heart Rate", "bpm", "red"),
+    ("CHOLESTEROL", "Cholesterol", "mg/dl", "orange"),
+    ("ST_DEPRESSION", "ST Depression", "mm", "purple"),
+    ("FASTING_BS", "Fasting BS > 120", "", "green"),
+]
+TIME_WINDOWS = {
+    "Last 24 hours": timedelta(days=1),
+    "Last 7 days": timedelta(days=7),
+    "Last 30 days": timedelta(days=30),
+    "Last year": timedelta(days=365),
+    "All time": None,
+}
 
 apply_custom_css()
 st.markdown('<h1 class="main-header">Healthcare Analytics Dashboard</h1>',
@@ -11,214 +32,89 @@ st.markdown('<h1 class="main-header">Healthcare Analytics Dashboard</h1>',
 
 st.header("📈 Patient Vitals Trends")
 
-# Check if patients data is available
-if not st.session_state.patients_data:
-    st.warning(
-        "⚠️ No patients data available. Please log in and ensure data is loaded.")
-    st.stop()
-
-# Check if patients_data has any entries
-if len(st.session_state.patients_data) == 0:
-    st.info("📋 No patients found. Please upload patient data first.")
-    st.stop()
-
-# Add pagination for patient selection
-total_patients = len(st.session_state.patients_data)
-patients_per_page = 100
-total_pages = (total_patients + patients_per_page - 1) // patients_per_page
-
-# Page navigation
-col1, col2, col3 = st.columns([2, 1, 1])
+col1, col2 = st.columns([3, 1])
 with col1:
-    st.info(
-        f"📊 **Patient Vitals Analysis:** Total {total_patients} patients available")
+    st.info("📊 **Patient Vitals Analysis:** search the patient directory to pick a patient")
 with col2:
-    current_page = st.selectbox("Page", range(
-        1, total_pages + 1), key="patient_page")
-with col3:
     if st.button("🔄 Refresh Patient Data", type="secondary"):
+        directory.reset()
         st.rerun()
 
-# Get patients for current page
-start_idx = (current_page - 1) * patients_per_page
-end_idx = min(start_idx + patients_per_page, total_patients)
-patient_options = list(st.session_state.patients_data.keys())[
-    start_idx:end_idx]
+selected = patient_picker("Select Patient", key="trends_patient")
 
-# Create patient selection dropdown with pagination
-selected_patient_id = st.selectbox(
-    f"Select Patient (Page {current_page} of {total_pages}, Showing {len(patient_options)} patients)",
-    options=patient_options,
-    format_func=lambda x: f"{x} - {st.session_state.patients_data[x]['name']}"
-)
-
-if selected_patient_id:
-    selected_patient = st.session_state.patients_data[selected_patient_id]
+if selected:
+    try:
+        selected_patient = directory.get_patient(selected['id'])
+    except Exception as e:
+        st.error(f"❌ Error connecting to backend: {str(e)}")
+        st.stop()
 
     # Display patient basic info
     col1, col2, col3, col4 = st.columns(4)
     col1.metric("Name", selected_patient['name'])
     col2.metric("Age", selected_patient['age'])
-    col3.metric("Gender", selected_patient['gender'])
-    col4.metric("Condition", selected_patient['condition'])
+    col3.metric("Gender", selected_patient['sex'])
+    col4.metric("Condition", {1: "Heart Disease", 0: "No Heart Disease"}.get(
+        selected_patient.get('target'), "Unknown"))
 
     # Fetch real vitals data from backend
     try:
-        # Convert patient ID to numeric ID for backend API
-        patient_numeric_id = None
-        for pid, patient_data in st.session_state.patients_data.items():
-            if pid == selected_patient_id:
-                # Try to get numeric ID from the patient data
-                patient_numeric_id = patient_data.get('id', pid)
-                break
-
-        if not patient_numeric_id:
-            st.error("❌ Could not determine patient ID for backend API")
-            st.stop()
-
-        vitals_response = get(f"/patients/{patient_numeric_id}/vitals")
+        patient_numeric_id = selected_patient['id']
+
+        window = st.selectbox("Time window", list(TIME_WINDOWS), index=len(TIME_WINDOWS) - 1)
+        params = {"points": CHART_POINTS}
+        if TIME_WINDOWS[window]:
+            params["from"] = (datetime.utcnow() - TIME_WINDOWS[window]).isoformat()
+        vitals_response = get(f"/patients/{patient_numeric_id}/vitals/series", params=params)
         if vitals_response.ok:
             vitals_data = vitals_response.json()
-            vitals_df = pd.DataFrame(vitals_data.get('vitals', []))
+            # one column per obs_type, already aligned on a shared time axis
+            vitals_df = pd.DataFrame(
+                vitals_data.get('series', {}),
+                index=pd.to_datetime(vitals_data.get('timestamps', []), unit='ms'))
+            charted = [v for v in VITAL_SERIES if v[0] in vitals_df.columns]
 
             if not vitals_df.empty:
-                # Convert timestamp to datetime
-                vitals_df['timestamp'] = pd.to_datetime(
-                    vitals_df['observed_at'])
-
                 # Display current vital signs from the latest data
                 st.subheader("Current Vital Signs")
-                latest_vitals = vitals_df.iloc[-1]
-                vital_cols = st.columns(5)
-
-                vital_cols[0].metric(
-                    "Heart Rate", f"{latest_vitals.get('heart_rate', 'N/A')} bpm")
-                vital_cols[1].metric(
-                    "Systolic BP", f"{latest_vitals.get('bp_sys', 'N/A')} mmHg")
-                vital_cols[2].metric(
-                    "Diastolic BP", f"{latest_vitals.get('bp_dia', 'N/A')} mmHg")
-                vital_cols[3].metric(
-                    "Temperature", f"{latest_vitals.get('temperature', 'N/A')}°F")
-                vital_cols[4].metric(
-                    "O2 Saturation", f"{latest_vitals.get('oxygen_saturation', 'N/A')}%")
+                vital_cols = st.columns(len(VITAL_SERIES))
+                for c, (obs_type, label, unit, _) in zip(vital_cols, VITAL_SERIES):
+                    values = vitals_df[obs_type].dropna() if obs_type in vitals_df else []
+                    c.metric(label, f"{values.iloc[-1]:g} {unit}" if len(values) else "N/A")
 
                 # Display vitals trends over time
                 st.subheader("Vitals Trends Over Time")
-
-                # Create subplots for different vitals
-                fig = make_subplots(
-                    rows=3, cols=2,
-                    subplot_titles=('Heart Rate', 'Blood Pressure (Systolic)', 'Blood Pressure (Diastolic)',
-                                    'Temperature', 'Oxygen Saturation', 'Vitals Summary'),
-                    specs=[[{"secondary_y": False}, {"secondary_y": False}],
-                           [{"secondary_y": False}, {"secondary_y": False}],
-                           [{"secondary_y": False}, {"secondary_y": False}]],
-                    vertical_spacing=0.08,
-                )
-
-                # Heart Rate
-                if 'heart_rate' in vitals_df.columns:
-                    fig.add_trace(
-                        go.Scatter(x=vitals_df['timestamp'], y=vitals_df['heart_rate'],
-                                   name='Heart Rate', mode='lines+markers', line=dict(color='red')),
-                        row=1, col=1,
-                    )
-
-                # Systolic Blood Pressure
-                if 'bp_sys' in vitals_df.columns:
-                    fig.add_trace(
-                        go.Scatter(x=vitals_df['timestamp'], y=vitals_df['bp_sys'],
-                                   name='Systolic BP', mode='lines+markers', line=dict(color='blue')),
-                        row=1, col=2,
+                if charted:
+                    fig = make_subplots(
+                        rows=len(charted), cols=1, shared_xaxes=True,
+                        subplot_titles=[label for _, label, _, _ in charted],
+                        vertical_spacing=0.06,
                     )
-
-                # Diastolic Blood Pressure
-                if 'bp_dia' in vitals_df.columns:
-                    fig.add_trace(
-                        go.Scatter(x=vitals_df['timestamp'], y=vitals_df['bp_dia'],
-                                   name='Diastolic BP', mode='lines+markers', line=dict(color='green')),
-                        row=2, col=1,
-                    )
-
-                # Temperature
-                if 'temperature' in vitals_df.columns:
-                    fig.add_trace(
-                        go.Scatter(x=vitals_df['timestamp'], y=vitals_df['temperature'],
-                                   name='Temperature', mode='lines+markers', line=dict(color='orange')),
-                        row=2, col=2,
+                    for i, (obs_type, label, unit, color) in enumerate(charted, 1):
+                        values = vitals_df[obs_type].dropna()
+                        fig.add_trace(
+                            go.Scatter(x=values.index, y=values.values, name=label,
+                                       mode='lines+markers', line=dict(color=color)),
+                            row=i, col=1,
+                        )
+                        fig.update_yaxes(title_text=unit, row=i, col=1)
+                    fig.update_xaxes(title_text="Time", row=len(charted), col=1)
+                    fig.update_layout(
+                        height=200 * len(charted) + 100,
+                        showlegend=False,
+                        title_text=f"Patient Vitals Analysis - {selected_patient['name']}"
                     )
-
-                # Oxygen Saturation
-                if 'oxygen_saturation' in vitals_df.columns:
-                    fig.add_trace(
-                        go.Scatter(x=vitals_df['timestamp'], y=vitals_df['oxygen_saturation'],
-                                   name='O2 Saturation', mode='lines+markers', line=dict(color='purple')),
-                        row=3, col=1,
-                    )
-
-                # Vitals Summary (Heart Rate vs Blood Pressure correlation)
-                if 'heart_rate' in vitals_df.columns and 'bp_sys' in vitals_df.columns:
-                    fig.add_trace(
-                        go.Scatter(x=vitals_df['heart_rate'], y=vitals_df['bp_sys'],
-                                   name='HR vs BP', mode='markers', marker=dict(color='brown', size=8)),
-                        row=3, col=2,
-                    )
-
-                fig.update_layout(
-                    height=800,
-                    showlegend=True,
-                    title_text=f"Patient Vitals Analysis - {selected_patient['name']}"
-                )
-
-                # Update axis labels
-                fig.update_xaxes(title_text="Time", row=3, col=1)
-                fig.update_xaxes(title_text="Heart Rate (bpm)", row=3, col=2)
-                fig.update_yaxes(title_text="Heart Rate (bpm)", row=1, col=1)
-                fig.update_yaxes(
-                    title_text="Blood Pressure (mmHg)", row=1, col=2)
-                fig.update_yaxes(
-                    title_text="Blood Pressure (mmHg)", row=2, col=1)
-                fig.update_yaxes(title_text="Temperature (°F)", row=2, col=2)
-                fig.update_yaxes(title_text="O2 Saturation (%)", row=3, col=1)
-                fig.update_yaxes(title_text="Systolic BP (mmHg)", row=3, col=2)
-
-                st.plotly_chart(fig, use_container_width=True)
+                    st.plotly_chart(fig, use_container_width=True)
+                if 'downsample' in vitals_data:
+                    st.caption(f"{vitals_data['total_observations']} observations, "
+                               f"downsampled to at most {CHART_POINTS} points per series")
 
                 # Statistical Summary
                 st.subheader("📊 Statistical Summary")
-                col1, col2, col3, col4 = st.columns(4)
-
-                with col1:
-                    if 'heart_rate' in vitals_df.columns:
-                        st.metric("Mean Heart Rate",
-                                  f"{vitals_df['heart_rate'].mean():.1f} bpm")
-                    if 'temperature' in vitals_df.columns:
-                        st.metric("Mean Temperature",
-                                  f"{vitals_df['temperature'].mean():.1f}°F")
-
-                with col2:
-                    if 'bp_sys' in vitals_df.columns:
-                        st.metric("Mean Systolic BP",
-                                  f"{vitals_df['bp_sys'].mean():.1f} mmHg")
-                    if 'oxygen_saturation' in vitals_df.columns:
-                        st.metric("Mean O2 Saturation",
-                                  f"{vitals_df['oxygen_saturation'].mean():.1f}%")
-
-                with col3:
-                    if 'heart_rate' in vitals_df.columns:
-                        st.metric("Max Heart Rate",
-                                  f"{vitals_df['heart_rate'].max():.0f} bpm")
-                    if 'temperature' in vitals_df.columns:
-                        st.metric("Max Temperature",
-                                  f"{vitals_df['temperature'].max():.1f}°F")
-
-                with col4:
-                    if 'heart_rate' in vitals_df.columns:
-                        st.metric("Min Heart Rate",
-                                  f"{vitals_df['heart_rate'].min():.0f} bpm")
-                    if 'oxygen_saturation' in vitals_df.columns:
-                        st.metric("Min O2 Saturation",
-                                  f"{vitals_df['oxygen_saturation'].min():.0f}%")
+                if charted:
+                    stats = vitals_df[[v[0] for v in charted]].agg(['mean', 'min', 'max']).T
+                    stats.index = [f"{label} ({unit})" for _, label, unit, _ in charted]
+                    st.dataframe(stats.round(1), use_container_width=True)
 
                 # ML Model Predictions Section
                 st.subheader("🤖 ML Model Predictions")
@@ -228,13 +124,19 @@ if selected_patient_id:
                     ml_response = get(
                         f"/patients/{patient_numeric_id}/predictions")
                     if ml_response.ok:
-                        predictions = ml_response.json()
+                        predictions = ml_response.json().get('predictions', {})
 
                         # Display predictions in a structured format
                         col1, col2 = st.columns(2)
 
                         with col1:
                             st.subheader("📊 Risk Assessment")
+                            if 'heart_disease_risk' in predictions:
+                                hd_risk = "High" if predictions['heart_disease_risk'] > 0.7 else "Medium" if predictions[
+                                    'heart_disease_risk'] > 0.3 else "Low"
+                                st.metric(
+                                    "Heart Disease Risk", f"{predictions['heart_disease_risk']:.1%}", delta=hd_risk)
+
                             if 'readmission_risk' in predictions:
                                 risk_level = "High" if predictions['readmission_risk'] > 0.7 else "Medium" if predictions[
                                     'readmission_risk'] > 0.3 else "Low"
@@ -259,6 +161,10 @@ if selected_patient_id:
                                 outcome = "Positive" if predictions['target'] == 1 else "Negative"
                                 st.metric("Treatment Outcome", outcome)
 
+                            if 'heart_disease' in predictions:
+                                heart_disease = "Yes" if predictions['heart_disease'] == 1 else "No"
+                                st.metric("Heart Disease Predicted", heart_disease)
+
                             if 'readmiss' in predictions:
                                 readmiss = "Yes" if predictions['readmiss'] == 1 else "No"
                                 st.metric("Readmission Likely", readmiss)
@@ -299,10 +205,11 @@ if selected_patient_id:
                             fig_trend = go.Figure()
 
                             # Add vitals trend line
-                            if 'heart_rate' in vitals_df.columns:
+                            if 'MAX_HEART_RATE' in vitals_df.columns:
+                                hr = vitals_df['MAX_HEART_RATE'].dropna()
                                 fig_trend.add_trace(go.Scatter(
-                                    x=vitals_df['timestamp'],
-                                    y=vitals_df['heart_rate'],
+                                    x=hr.index,
+                                    y=hr.values,
                                     name='Heart Rate Trend',
                                     mode='lines+markers'
                                 ))
@@ -326,45 +233,28 @@ if selected_patient_id:
                 # Trend Analysis
                 st.subheader("📈 Trend Analysis")
 
-                # Calculate trends (last 24 hours vs previous 24 hours)
-                if len(vitals_df) >= 12:
-                    recent_data = vitals_df.tail(6)  # Last 24 hours
-                    previous_data = vitals_df.iloc[-12:-6]  # Previous 24 hours
-
-                    col1, col2, col3 = st.columns(3)
-
-                    with col1:
-                        if 'heart_rate' in vitals_df.columns:
-                            hr_trend = recent_data['heart_rate'].mean(
-                            ) - previous_data['heart_rate'].mean()
-                            hr_icon = "📈" if hr_trend > 0 else "📉" if hr_trend < 0 else "➡️"
-                            st.metric(
-                                "Heart Rate Trend", f"{hr_trend:+.1f} bpm", delta=f"{hr_icon} {abs(hr_trend):.1f}")
-
-                    with col2:
-                        if 'bp_sys' in vitals_df.columns:
-                            bp_trend = recent_data['bp_sys'].mean(
-                            ) - previous_data['bp_sys'].mean()
-                            bp_icon = "📈" if bp_trend > 0 else "📉" if bp_trend < 0 else "➡️"
-                            st.metric(
-                                "BP Trend", f"{bp_trend:+.1f} mmHg", delta=f"{bp_icon} {abs(bp_trend):.1f}")
-
-                    with col3:
-                        if 'temperature' in vitals_df.columns:
-                            temp_trend = recent_data['temperature'].mean(
-                            ) - previous_data['temperature'].mean()
-                            temp_icon = "📈" if temp_trend > 0 else "📉" if temp_trend < 0 else "➡️"
-                            st.metric(
-                                "Temperature Trend", f"{temp_trend:+.1f}°F", delta=f"{temp_icon} {abs(temp_trend):.1f}")
+                # Calculate trends (last 6 points vs previous 6 points per series)
+                trend_series = [v for v in charted if vitals_df[v[0]].count() >= 12][:3]
+                if trend_series:
+                    trend_cols = st.columns(len(trend_series))
+                    for c, (obs_type, label, unit, _) in zip(trend_cols, trend_series):
+                        values = vitals_df[obs_type].dropna()
+                        trend = values.tail(6).mean() - values.iloc[-12:-6].mean()
+                        icon = "📈" if trend > 0 else "📉" if trend < 0 else "➡️"
+                        c.metric(f"{label} Trend", f"{trend:+.1f} {unit}",
+                                 delta=f"{icon} {abs(trend):.1f}")
                 else:
                     st.info(
                         "📊 Insufficient data for trend analysis (need at least 12 data points)")
 
                 # Clinical Notes
                 st.subheader("📝 Clinical Notes")
-                if selected_patient.get('notes'):
-                    for i, note in enumerate(selected_patient['notes'], 1):
-                        st.info(f"**Note {i}:** {note}")
+                notes_response = get(f"/patients/{patient_numeric_id}/notes")
+                patient_notes = notes_response.json().get(
+                    'notes', []) if notes_response.ok else []
+                if patient_notes:
+                    for i, note in enumerate(patient_notes, 1):
+                        st.info(f"**Note {i}:** {note['note_text']}")
                 else:
                     st.info("📝 No clinical notes available for this patient")
 
@@ -381,13 +271,14 @@ if selected_patient_id:
                         with col1:
                             if st.form_submit_button("✅ Add Note"):
                                 if new_note.strip():
-                                    if 'notes' not in selected_patient:
-                                        selected_patient['notes'] = []
-                                    selected_patient['notes'].append(
-                                        new_note.strip())
-                                    st.session_state.show_add_note = False
-                                    st.success("✅ Note added successfully!")
-                                    st.rerun()
+                                    r = post(f"/patients/{patient_numeric_id}/notes",
+                                             json={"text": new_note.strip()})
+                                    if r.ok:
+                                        st.session_state.show_add_note = False
+                                        st.success("✅ Note added successfully!")
+                                        st.rerun()
+                                    else:
+                                        st.error(f"❌ Failed to add note: {r.text}")
                                 else:
                                     st.error("❌ Please enter a note")
                         with col2:
@@ -2,131 +2,95 @@ import streamlit as st
 import plotly.graph_objects as go
 from utils.styling import apply_custom_css
 from components.navbar import render_navbar
-from utils.analysis import simulate_intervention_impact
-import pandas as pd
+from components.patient_picker import patient_picker
+from utils.api import get, post
+import numpy as np
 
 apply_custom_css()
 st.markdown('<h1 class="main-header">Healthcare Analytics Dashboard</h1>',
             unsafe_allow_html=True)
 render_navbar()
 
+# model outcome -> label; `target` is the heart disease outcome
+OUTCOME_LABELS = {"target": "Heart Disease", "readmission": "Readmission",
+                  "complication": "Complication", "mortality": "Mortality"}
 
 st.header("🔮 What-If Simulator")
-st.write("Simulate the potential impact of medical interventions on patient vitals.")
+st.write("Simulate how medical interventions change predicted risk for a patient or the whole cohort.")
 
-# Check if patients data is available
-if not st.session_state.patients_data:
-    st.warning(
-        "⚠️ No patients data available. Please log in and ensure data is loaded.")
-    st.stop()
-
-# Check if patients_data has any entries
-if len(st.session_state.patients_data) == 0:
-    st.info("📋 No patients found. Please upload patient data first.")
+try:
+    r = get("/simulations/interventions")
+    if not r.ok:
+        st.error(f"❌ Failed to load interventions: {r.text}")
+        st.stop()
+    interventions = {i['name']: i for i in r.json()['interventions']}
+except Exception as e:
+    st.error(f"❌ Error connecting to backend: {str(e)}")
     st.stop()
 
-sim_patient = st.selectbox(
-    "Select Patient for Simulation",
-    options=list(st.session_state.patients_data.keys()),
-    format_func=lambda x: f"{x} - {st.session_state.patients_data[x]['name']}"
-)
-
-if sim_patient:
-    patient = st.session_state.patients_data[sim_patient]
-    vitals_df: pd.DataFrame = patient['vitals']
-
-    # Check if vitals data is available
-    if vitals_df.empty:
-        st.warning(
-            "⚠️ No vitals data available for this patient. Please ensure the patient has vital signs recorded.")
+scope = st.radio("Simulate for", ["Single patient", "Whole cohort"], horizontal=True)
+sim_patient = None
+if scope == "Single patient":
+    sim_patient = patient_picker("Select Patient for Simulation", key="sim_patient")
+    if sim_patient is None:
         st.stop()
 
-    col1, col2 = st.columns([1, 2])
-
-    with col1:
-        st.subheader("Intervention Parameters")
-
-        intervention = st.selectbox(
-            "Select Intervention",
-            ["Blood Pressure Medication", "Beta Blocker",
-                "Oxygen Therapy", "Fever Reducer"],
-        )
-
-        if intervention == "Blood Pressure Medication":
-            magnitude = st.slider("BP Reduction (mmHg)", 5, 30, 15)
-            st.info("Simulates antihypertensive medication effect")
-        elif intervention == "Beta Blocker":
-            magnitude = st.slider("Heart Rate Reduction (bpm)", 5, 25, 10)
-            st.info("Simulates beta-blocker medication effect")
-        elif intervention == "Oxygen Therapy":
-            magnitude = st.slider("O2 Increase (%)", 1, 10, 5)
-            st.info("Simulates supplemental oxygen therapy")
-        elif intervention == "Fever Reducer":
-            magnitude = st.slider("Temperature Reduction (°F)", 1.0, 3.0, 1.5)
-            st.info("Simulates fever-reducing medication")
-
-        simulate_btn = st.button("Run Simulation", type="primary")
-        with col2:
-            if simulate_btn:
-                st.subheader("Simulation Results")
-
-                simulated_df = simulate_intervention_impact(
-                    vitals_df, intervention, magnitude)
-                fig = go.Figure()
-
-                if intervention in ["Blood Pressure Medication", "Beta Blocker"]:
-                    if intervention == "Blood Pressure Medication":
-                        fig.add_trace(go.Scatter(
-                            x=vitals_df['timestamp'], y=vitals_df['blood_pressure_sys'], name='Original Systolic BP'))
-                        fig.add_trace(go.Scatter(
-                            x=simulated_df['timestamp'], y=simulated_df['blood_pressure_sys'], name='Simulated Systolic BP'))
-                        fig.update_layout(yaxis_title="Blood Pressure (mmHg)")
-                    else:
-                        fig.add_trace(go.Scatter(
-                            x=vitals_df['timestamp'], y=vitals_df['heart_rate'], name='Original Heart Rate'))
-                        fig.add_trace(go.Scatter(
-                            x=simulated_df['timestamp'], y=simulated_df['heart_rate'], name='Simulated Heart Rate'))
-                        fig.update_layout(yaxis_title="Heart Rate (bpm)")
-
-                elif intervention == "Oxygen Therapy":
-                    fig.add_trace(go.Scatter(
-                        x=vitals_df['timestamp'], y=vitals_df['oxygen_saturation'], name='Original O2 Sat'))
-                    fig.add_trace(go.Scatter(
-                        x=simulated_df['timestamp'], y=simulated_df['oxygen_saturation'], name='Simulated O2 Sat'))
-                    fig.update_layout(yaxis_title="Oxygen Saturation (%)")
-
-                else:
-                    fig.add_trace(go.Scatter(
-                        x=vitals_df['timestamp'], y=vitals_df['temperature'], name='Original Temperature'))
-                    fig.add_trace(go.Scatter(
-                        x=simulated_df['timestamp'], y=simulated_df['temperature'], name='Simulated Temperature'))
-                    fig.update_layout(yaxis_title="Temperature (°F)")
-
-                fig.update_layout(
-                    title=f"Impact of {intervention}", xaxis_title="Time", height=400)
-                st.plotly_chart(fig, use_container_width=True)
-
-                st.subheader("Impact Summary")
-                original_mean = vitals_df.iloc[-24:].mean()
-                simulated_mean = simulated_df.iloc[-24:].mean()
-
-                if intervention == "Blood Pressure Medication":
-                    improvement = original_mean['blood_pressure_sys'] - \
-                        simulated_mean['blood_pressure_sys']
-                    st.success(
-                        f"Average systolic BP reduction: {improvement:.1f} mmHg")
-                elif intervention == "Beta Blocker":
-                    improvement = original_mean['heart_rate'] - \
-                        simulated_mean['heart_rate']
-                    st.success(
-                        f"Average heart rate reduction: {improvement:.1f} bpm")
-                elif intervention == "Oxygen Therapy":
-                    improvement = simulated_mean['oxygen_saturation'] - \
-                        original_mean['oxygen_saturation']
-                    st.success(
-                        f"Average O2 saturation increase: {improvement:.1f}%")
-                else:
-                    improvement = original_mean['temperature'] - \
-                        simulated_mean['temperature']
-                    st.success(
-                        f"Average temperature reduction: {improvement:.1f}°F")
+col1, col2 = st.columns([1, 2])
+
+with col1:
+    st.subheader("Intervention Parameters")
+
+    intervention = st.selectbox(
+        "Select Intervention",
+        options=list(interventions),
+        format_func=lambda x: interventions[x]['label'],
+    )
+    spec = interventions[intervention]
+    max_magnitude = 1.0 if spec['unit'] == "fraction" else 30.0
+    max_magnitude = st.slider(f"Maximum reduction ({spec['unit']})", 0.0,
+                              max_magnitude, max_magnitude)
+    steps = st.slider("Sweep steps", 2, 50, 11)
+    st.info("Shifts: " + ", ".join(f"{k} {v:+g} per {spec['unit']}"
+                                    for k, v in spec['effects'].items()))
+
+    simulate_btn = st.button("Run Simulation", type="primary")
+
+with col2:
+    if simulate_btn:
+        st.subheader("Simulation Results")
+
+        magnitudes = [round(float(m), 3) for m in np.linspace(0, max_magnitude, steps)]
+        body = {"intervention": intervention, "magnitudes": magnitudes}
+        if sim_patient is not None:
+            body["patient_ids"] = [sim_patient['id']]
+        try:
+            r = post("/simulations/", json=body)
+        except Exception as e:
+            st.error(f"❌ Error connecting to backend: {str(e)}")
+            st.stop()
+        if not r.ok:
+            st.error(f"❌ Simulation failed: {r.text}")
+            st.stop()
+        result = r.json()
+
+        fig = go.Figure()
+        for outcome in result['baseline']:
+            fig.add_trace(go.Scatter(
+                x=magnitudes, y=[s['mean_risk'][outcome] for s in result['scenarios']],
+                mode='lines+markers', name=OUTCOME_LABELS.get(outcome, outcome)))
+        fig.update_layout(
+            title=f"Predicted risk under {spec['label']}",
+            xaxis_title=f"Reduction ({spec['unit']})",
+            yaxis_title="Mean predicted risk", yaxis_range=[0, 1], height=400)
+        st.plotly_chart(fig, use_container_width=True)
+
+        st.subheader("Impact Summary")
+        st.caption(f"{result['cohort_size']} patient(s) simulated")
+        final = result['scenarios'][-1]
+        cols = st.columns(len(result['baseline']))
+        for c, outcome in zip(cols, result['baseline']):
+            c.metric(OUTCOME_LABELS.get(outcome, outcome), f"{final['mean_risk'][outcome]:.1%}",
+                     f"{final['mean_change'][outcome]:+.1%}", delta_color="inverse")
+        if sim_patient is None:
+            st.success(f"Patients with lower predicted heart disease risk at {magnitudes[-1]:g} {spec['unit']}: "
+                       f"{final['patients_improved']['target']} of {result['cohort_size']}")
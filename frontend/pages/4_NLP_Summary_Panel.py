@@ -4,6 +4,8 @@ from datetime import datetime, timedelta
 import pandas as pd
 from utils.styling import apply_custom_css
 from components.navbar import render_navbar
+from components.patient_picker import patient_picker
+from utils.api import get
 
 apply_custom_css()
 st.markdown('<h1 class="main-header">Healthcare Analytics Dashboard</h1>',
@@ -13,64 +15,74 @@ render_navbar()
 st.header("📝 NLP Summary Panel")
 st.write("AI-powered analysis of clinical notes and patient summaries.")
 
-# Check if patients data is available
-if not st.session_state.patients_data:
-    st.warning(
-        "⚠️ No patients data available. Please log in and ensure data is loaded.")
-    st.stop()
+patient = patient_picker("Select Patient for Analysis", key="nlp_patient")
 
-# Check if patients_data has any entries
-if len(st.session_state.patients_data) == 0:
-    st.info("📋 No patients found. Please upload patient data first.")
-    st.stop()
+if patient:
 
-nlp_patient = st.selectbox(
-    "Select Patient for Analysis",
-    options=list(st.session_state.patients_data.keys()),
-    format_func=lambda x: f"{x} - {st.session_state.patients_data[x]['name']}"
-)
-
-if nlp_patient:
-    patient = st.session_state.patients_data[nlp_patient]
+    # Notes and their stored NLP findings come back in one request
+    analysis = None
+    try:
+        r = get(f"/patients/{patient['id']}/notes")
+        if r.ok:
+            analysis = r.json()
+        else:
+            st.error(f"❌ Failed to load clinical notes: {r.text}")
+    except Exception as e:
+        st.error(f"❌ Error connecting to backend: {str(e)}")
 
     col1, col2 = st.columns([1, 1])
 
     with col1:
         st.subheader("Clinical Notes")
-        for i, note in enumerate(patient['notes'], 1):
-            st.text_area(f"Note {i}", note, height=80, disabled=True)
+        if analysis:
+            for i, note in enumerate(analysis.get('notes', []), 1):
+                st.text_area(f"Note {i} ({note.get('noted_at', '')})",
+                             note['note_text'], height=80, disabled=True)
+                st.caption(note.get('summary', ''))
 
     with col2:
         st.subheader("AI Analysis Summary")
-        st.markdown(
-            """
-            <div class="summary-panel">
-            <h4>📊 Key Insights:</h4>
-            <ul>
-                <li><strong>Primary Concerns:</strong> Cardiovascular monitoring, blood pressure management</li>
-                <li><strong>Treatment Response:</strong> Patient showing positive response to current regimen</li>
-                <li><strong>Risk Factors:</strong> Elevated BP episodes, irregular heart rate patterns</li>
-                <li><strong>Recommendations:</strong> Continue monitoring, consider medication adjustment</li>
-            </ul>
-
-            <h4>🔍 Sentiment Analysis:</h4>
-            <p><span style="color: green;">●</span> Overall sentiment: <strong>Positive</strong> (Patient improving)</p>
-            <p><span style="color: orange;">●</span> Concern level: <strong>Moderate</strong> (Requires monitoring)</p>
+        if not analysis or not analysis.get('notes'):
+            st.info("📝 No clinical notes available for this patient")
+        else:
+            findings_html = "".join(
+                f"<li>{f}</li>" for f in analysis.get('findings', []))
+            st.markdown(
+                f"""
+                <div class="summary-panel">
+                <h4>📊 Key Insights:</h4>
+                <ul>{findings_html or "<li>" + analysis.get('summary', '') + "</li>"}</ul>
+                <p>Analyzed <strong>{analysis.get('total_notes', 0)}</strong> notes.</p>
+                </div>
+                """,
+                unsafe_allow_html=True,
+            )
 
-            <h4>📈 Trend Analysis:</h4>
-            <p>Recent notes show improvement in patient condition with stable vitals and good treatment compliance.</p>
-            </div>
-            """,
-            unsafe_allow_html=True,
-        )
+            st.subheader("📌 Extracted Keywords")
+            keywords = list(analysis.get('keywords', {}).keys())
+            if keywords:
+                keyword_cols = st.columns(3)
+                for i, keyword in enumerate(keywords):
+                    with keyword_cols[i % 3]:
+                        st.code(keyword)
+            else:
+                st.info("No clinical keywords found")
 
-        st.subheader("📌 Extracted Keywords")
-        keywords = ["stable vitals", "medication",
-                    "blood pressure", "monitoring", "improved", "comfortable"]
-        keyword_cols = st.columns(3)
-        for i, keyword in enumerate(keywords):
-            with keyword_cols[i % 3]:
-                st.code(keyword)
+    st.subheader("🔎 Search Notes Across Patients")
+    notes_query = st.text_input("Search clinical notes", placeholder="e.g. chest pain")
+    if notes_query:
+        try:
+            r = get("/notes/search", params={"q": notes_query})
+            if r.ok and r.json().get('notes'):
+                results_df = pd.DataFrame(r.json()['notes'])
+                st.dataframe(
+                    results_df[['patient_uid', 'patient_name',
+                                'noted_at', 'note_text', 'summary']],
+                    use_container_width=True)
+            else:
+                st.info("No matching notes")
+        except Exception as e:
+            st.error(f"❌ Error connecting to backend: {str(e)}")
 
     st.subheader("🕒 Clinical Timeline")
     timeline_data = {
@@ -2,8 +2,8 @@ import streamlit as st
 import pandas as pd
 from utils.styling import apply_custom_css
 from components.navbar import render_navbar
-from utils.api import get, post
-from datetime import datetime
+from utils.api import download, get, post
+from datetime import datetime, timedelta
 import io
 
 apply_custom_css()
@@ -280,89 +280,66 @@ with tab2:
 
 with tab3:
     st.subheader("Export Patient Data")
-
-    try:
-        patients_response = get("/patients/")
-        if patients_response.ok:
-            patients_data = patients_response.json()
-            patients = patients_data.get('patients', [])
-
-            if patients:
-                col1, col2 = st.columns(2)
-
-                with col1:
-                    st.subheader("Export Summary Data")
-                    if st.button("📊 Export Patient Summary CSV", type="primary"):
-                        # Create summary for export
-                        export_summary = []
-                        for patient in patients:
-                            export_summary.append({
-                                'Patient_ID': patient.get('uid', 'N/A'),
-                                'First_Name': patient.get('name', 'N/A').split()[0] if patient.get('name') else 'N/A',
-                                'Last_Name': ' '.join(patient.get('name', 'N/A').split()[1:]) if patient.get('name') and len(patient.get('name', '').split()) > 1 else 'N/A',
-                                'Age': patient.get('age', 'N/A'),
-                                'Gender': patient.get('sex', 'N/A'),
-                                'Contact_Phone': patient.get('contact_phone', 'N/A'),
-                                'Height_cm': patient.get('height_cm', 'N/A'),
-                                'Weight_kg': patient.get('weight_kg', 'N/A'),
-                                'BMI': patient.get('bmi', 'N/A'),
-                                'BP_Systolic': patient.get('bp_systolic', 'N/A'),
-                                'BP_Diastolic': patient.get('bp_diastolic', 'N/A'),
-                                'Heart_Rate': patient.get('heart_rate', 'N/A'),
-                                'Temperature': patient.get('temperature', 'N/A'),
-                                'O2_Saturation': patient.get('oxygen_saturation', 'N/A'),
-                                'Cholesterol': patient.get('cholesterol', 'N/A'),
-                                'Glucose': patient.get('glucose', 'N/A')
-                            })
-
-                        summary_df = pd.DataFrame(export_summary)
-                        csv = summary_df.to_csv(index=False)
-                        st.download_button(
-                            label="📥 Download Patient Summary CSV",
-                            data=csv,
-                            file_name=f"patient_summary_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                            mime="text/csv",
-                        )
-
-                with col2:
-                    st.subheader("Export Individual Patient Data")
-                    # Create patient selector for detailed export
-                    patient_options = {
-                        f"{p['uid']} - {p['name']}": p['id'] for p in patients}
-                    selected_export_patient = st.selectbox(
-                        "Select Patient for Detailed Export",
-                        options=list(patient_options.keys())
-                    )
-
-                    if selected_export_patient and st.button("📥 Export Patient Vitals"):
-                        selected_patient_id = patient_options[selected_export_patient]
-
-                        # Fetch patient vitals
-                        vitals_response = get(
-                            f"/patients/{selected_patient_id}/vitals")
-                        if vitals_response.ok:
-                            vitals_data = vitals_response.json()
-                            vitals = vitals_data.get('vitals', [])
-
-                            if vitals:
-                                vitals_df = pd.DataFrame(vitals)
-                                csv = vitals_df.to_csv(index=False)
-                                st.download_button(
-                                    label="📥 Download Patient Vitals CSV",
-                                    data=csv,
-                                    file_name=f"vitals_{selected_export_patient.split(' - ')[0]}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                                    mime="text/csv",
-                                )
-                            else:
-                                st.warning(
-                                    "No vitals data available for this patient")
-                        else:
-                            st.error("Failed to fetch vitals data")
-            else:
-                st.info("No patient data available for export")
-
-    except Exception as e:
-        st.error(f"Error during export: {str(e)}")
+    st.caption("Exports are streamed from the database by the backend; the whole "
+               "table is never loaded into this page.")
+    export_format = st.radio("Format", ["csv", "ndjson", "parquet"], horizontal=True)
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    mimes = {"csv": "text/csv", "ndjson": "application/x-ndjson",
+             "parquet": "application/vnd.apache.parquet"}
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.subheader("Export Patients")
+        sex_filter = st.selectbox("Sex", ["All", "M", "F", "O"])
+        age_range = st.slider("Age", 0, 120, (0, 120))
+        condition_filter = st.selectbox("Heart disease", ["All", "Yes", "No"])
+        if st.button("📊 Prepare Patient Export", type="primary"):
+            params = {"format": export_format}
+            if sex_filter != "All":
+                params["sex"] = sex_filter
+            if age_range != (0, 120):
+                params["min_age"], params["max_age"] = age_range
+            if condition_filter != "All":
+                params["target"] = 1 if condition_filter == "Yes" else 0
+            try:
+                with st.spinner("Exporting patients..."):
+                    data = download("/exports/patients", params)
+                st.download_button(
+                    label="📥 Download Patients",
+                    data=data,
+                    file_name=f"patients_{stamp}.{export_format}",
+                    mime=mimes[export_format],
+                )
+            except Exception as e:
+                st.error(f"Export failed: {str(e)}")
+
+    with col2:
+        st.subheader("Export Observations")
+        patient_ids = st.text_input("Patient IDs (comma-separated, blank for all)")
+        obs_types = st.text_input("Observation types (comma-separated, blank for all)",
+                                  placeholder="HEART_RATE,BP_SYSTOLIC")
+        date_range = st.date_input("Observed between", value=())
+        if st.button("📥 Prepare Observation Export"):
+            params = {"format": export_format}
+            if patient_ids.strip():
+                params["patients"] = patient_ids.strip()
+            if obs_types.strip():
+                params["types"] = obs_types.strip()
+            if len(date_range) == 2:
+                params["from"] = date_range[0].isoformat()
+                params["to"] = (date_range[1] + timedelta(days=1)).isoformat()
+            try:
+                with st.spinner("Exporting observations..."):
+                    data = download("/exports/observations", params)
+                st.download_button(
+                    label="📥 Download Observations",
+                    data=data,
+                    file_name=f"observations_{stamp}.{export_format}",
+                    mime=mimes[export_format],
+                )
+            except Exception as e:
+                st.error(f"Export failed: {str(e)}")
 
 # System information
 st.divider()
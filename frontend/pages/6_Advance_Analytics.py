@@ -1,9 +1,9 @@
-from utils.analysis import analyze_vitals_trends
 import streamlit as st
 import plotly.express as px
 import pandas as pd
 from utils.styling import apply_custom_css
 from components.navbar import render_navbar
+from utils.api import get, get_many
 
 apply_custom_css()
 st.markdown('<h1 class="main-header">Healthcare Analytics Dashboard</h1>',
@@ -12,115 +12,141 @@ render_navbar()
 
 st.header("🧠 Advanced Analytics")
 
-# Check if patients data is available
-if not st.session_state.patients_data:
-    st.warning(
-        "⚠️ No patients data available. Please log in and ensure data is loaded.")
-    st.stop()
 
-# Check if patients_data has any entries
-if len(st.session_state.patients_data) == 0:
-    st.info("📋 No patients found. Please upload patient data first.")
-    st.stop()
+def bucket_width(seconds: int) -> str:
+    """Bucket width in the largest unit it is a whole number of"""
+    for unit, size in (("d", 86400), ("h", 3600), ("min", 60)):
+        if seconds >= size and seconds % size == 0:
+            return f"{seconds // size}{unit}"
+    return f"{seconds}s"
+
+
+st.subheader("Population Vitals Over Time")
+try:
+    r = get("/dashboard/vitals-trend", params={"points": 200, "series": True,
+                                               "types": "RESTING_BP,MAX_HEART_RATE,CHOLESTEROL"})
+    trend = r.json() if r.ok else {}
+    if trend.get('timestamps'):
+        trend_df = pd.DataFrame(trend['series'],
+                                index=pd.to_datetime(trend['timestamps'], unit='ms'))
+        fig_trend = px.line(trend_df, labels={'index': 'Time', 'value': 'Average'},
+                            title="Average Vitals Across All Patients")
+        st.plotly_chart(fig_trend, use_container_width=True)
+        st.caption(f"{trend['total_observations']} observations, "
+                   f"{bucket_width(trend['downsample']['bucket_seconds'])} buckets "
+                   f"from {trend['downsample']['source']} data")
+    else:
+        st.info(f"📊 No population trend data yet {trend.get('error', '')}")
+except Exception as e:
+    st.error(f"❌ Error connecting to backend: {str(e)}")
 
 st.subheader("Population Health Metrics")
 
-all_vitals = []
-for pid, patient in st.session_state.patients_data.items():
-    patient_vitals = patient['vitals'].copy()
-    patient_vitals['patient_id'] = pid
-    patient_vitals['age_group'] = '65+' if patient['age'] >= 65 else '45-64' if patient['age'] >= 45 else '18-44'
-    patient_vitals['condition'] = patient['condition']
-    all_vitals.append(patient_vitals)
-
-combined_df = pd.concat(all_vitals, ignore_index=True)
-
-pop_col1, pop_col2, pop_col3, pop_col4 = st.columns(4)
-with pop_col1:
-    avg_hr = combined_df['heart_rate'].mean()
-    st.metric("Population Avg HR", f"{avg_hr:.1f} bpm")
-with pop_col2:
-    avg_bp = combined_df['blood_pressure_sys'].mean()
-    st.metric("Population Avg BP", f"{avg_bp:.0f} mmHg")
-with pop_col3:
-    avg_temp = combined_df['temperature'].mean()
-    st.metric("Population Avg Temp", f"{avg_temp:.1f}°F")
-with pop_col4:
-    avg_o2 = combined_df['oxygen_saturation'].mean()
-    st.metric("Population Avg O2", f"{avg_o2:.1f}%")
-
-st.subheader("Vitals by Age Group")
-age_analysis = (
-    combined_df.groupby('age_group').agg({
-        'heart_rate': 'mean',
-        'blood_pressure_sys': 'mean',
-        'temperature': 'mean',
-        'oxygen_saturation': 'mean',
-    }).round(1)
-)
-
-fig_age = px.bar(
-    age_analysis.reset_index(),
-    x='age_group',
-    y=['heart_rate', 'blood_pressure_sys', 'oxygen_saturation'],
-    title="Average Vitals by Age Group",
-    barmode='group',
-)
-st.plotly_chart(fig_age, use_container_width=True)
-
-st.subheader("Vitals by Medical Condition")
-condition_analysis = (
-    combined_df.groupby('condition').agg({
-        'heart_rate': 'mean',
-        'blood_pressure_sys': 'mean',
-        'temperature': 'mean',
-        'oxygen_saturation': 'mean',
-    }).round(1)
-)
-
-fig_condition = px.imshow(
-    condition_analysis,
-    title="Vitals Heatmap by Medical Condition",
-    aspect='auto',
-)
-st.plotly_chart(fig_condition, use_container_width=True)
+VITAL_AVERAGES = {
+    'avg_resting_bp': 'Resting BP',
+    'avg_cholesterol': 'Cholesterol',
+    'avg_max_heart_rate': 'Max Heart Rate',
+    'avg_st_depression': 'ST Depression',
+}
+
+
+def breakdown_frame(r, by):
+    """Average vitals per group from a breakdown response, indexed by group"""
+    groups = r.json().get('groups', []) if r.ok else []
+    if not groups:
+        return pd.DataFrame()
+    return pd.DataFrame(groups).set_index(by).rename(columns=VITAL_AVERAGES)
 
-st.subheader("Risk Stratification")
 
-risk_patients = []
-for pid, patient in st.session_state.patients_data.items():
-    trends = analyze_vitals_trends(patient['vitals'])
-    risk_score = 0
-    for vital, data in trends.items():
-        if data['status'] in ['HIGH', 'LOW']:
-            risk_score += 2
-        if data['trend'] == 'UP' and vital in ['heart_rate', 'blood_pressure_sys', 'temperature']:
-            risk_score += 1
-        elif data['trend'] == 'DOWN' and vital == 'oxygen_saturation':
-            risk_score += 1
-
-    risk_level = 'High' if risk_score >= 4 else 'Medium' if risk_score >= 2 else 'Low'
-    risk_patients.append({
-        'Patient ID': pid,
-        'Name': patient['name'],
-        'Age': patient['age'],
-        'Condition': patient['condition'],
-        'Risk Score': risk_score,
-        'Risk Level': risk_level,
+try:
+    responses = get_many({
+        "overview": "/analytics/population",
+        "age_group": ("/analytics/population/breakdown", {"by": "age_group"}),
+        "condition": ("/analytics/population/breakdown", {"by": "condition"}),
     })
+    for response in responses.values():
+        if isinstance(response, Exception):
+            raise response
+    r = responses["overview"]
+    overview = r.json().get('patients', {}) if r.ok else {}
+    pop_col1, pop_col2, pop_col3, pop_col4 = st.columns(4)
+    with pop_col1:
+        st.metric("Population Avg Age", f"{overview.get('avg_age') or 0:.1f}")
+    with pop_col2:
+        st.metric("Population Avg BP", f"{overview.get('avg_resting_bp') or 0:.0f} mmHg")
+    with pop_col3:
+        st.metric("Population Avg Cholesterol", f"{overview.get('avg_cholesterol') or 0:.0f} mg/dl")
+    with pop_col4:
+        st.metric("Population Avg Max HR", f"{overview.get('avg_max_heart_rate') or 0:.0f} bpm")
+
+    st.subheader("Vitals by Age Group")
+    age_analysis = breakdown_frame(responses['age_group'], 'age_group')
+    if not age_analysis.empty:
+        fig_age = px.bar(
+            age_analysis.reset_index(),
+            x='age_group',
+            y=['Resting BP', 'Cholesterol', 'Max Heart Rate'],
+            title="Average Vitals by Age Group",
+            barmode='group',
+        )
+        st.plotly_chart(fig_age, use_container_width=True)
+
+    st.subheader("Vitals by Medical Condition")
+    condition_analysis = breakdown_frame(responses['condition'], 'condition')
+    if not condition_analysis.empty:
+        fig_condition = px.imshow(
+            condition_analysis[list(VITAL_AVERAGES.values())],
+            title="Vitals Heatmap by Medical Condition",
+            aspect='auto',
+        )
+        st.plotly_chart(fig_condition, use_container_width=True)
+except Exception as e:
+    st.error(f"❌ Error connecting to backend: {str(e)}")
+
+st.subheader("Risk Stratification")
 
-risk_df = pd.DataFrame(risk_patients)
-
-risk_counts = risk_df['Risk Level'].value_counts()
-fig_risk = px.pie(
-    values=risk_counts.values,
-    names=risk_counts.index,
-    title="Patient Risk Distribution",
-)
-st.plotly_chart(fig_risk, use_container_width=True)
-
-high_risk = risk_df[risk_df['Risk Level'] ==
-                    'High'].sort_values('Risk Score', ascending=False)
-if len(high_risk) > 0:
-    st.subheader("🚨 High-Risk Patients")
-    st.dataframe(high_risk, use_container_width=True)
+risk_col1, risk_col2, risk_col3 = st.columns(3)
+with risk_col1:
+    risk_level = st.selectbox("Risk level", ["All", "High", "Medium", "Low"])
+with risk_col2:
+    risk_sex = st.selectbox("Sex", ["All", "M", "F"])
+with risk_col3:
+    risk_top = st.number_input("Top patients", min_value=5, max_value=500, value=50, step=5)
+
+params = {"limit": risk_top}
+if risk_level != "All":
+    params["level"] = risk_level
+if risk_sex != "All":
+    params["sex"] = risk_sex
+
+try:
+    r = get("/analytics/risk-stratification", params=params)
+    risk_data = r.json() if r.ok else {}
+    if not r.ok:
+        st.error(f"❌ Failed to load risk stratification: {risk_data.get('detail', r.status_code)}")
+    elif risk_data.get('scored_patients'):
+        distribution = risk_data['distribution']
+        fig_risk = px.pie(
+            values=list(distribution.values()),
+            names=list(distribution.keys()),
+            title="Patient Risk Distribution",
+        )
+        st.plotly_chart(fig_risk, use_container_width=True)
+
+        risk_df = pd.DataFrame([{
+            'Patient ID': p['uid'],
+            'Name': p['name'],
+            'Age': p['age'],
+            'Sex': p['sex'],
+            'Risk Score': p['risk_score'],
+            'Risk Level': p['risk_level'],
+            'Abnormal': ", ".join(f"{t} {v['status']}" for t, v in p['vitals'].items()
+                                  if v['status'] != 'NORMAL'),
+        } for p in risk_data['patients']])
+        if len(risk_df) > 0:
+            st.subheader(f"🚨 Top {len(risk_df)} of {risk_data['matched']} Patients by Risk")
+            st.dataframe(risk_df, use_container_width=True)
+    else:
+        st.info("📊 No observations to score yet")
+except Exception as e:
+    st.error(f"❌ Error connecting to backend: {str(e)}")
@@ -1,8 +1,27 @@
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
 import streamlit as st
 
 API_BASE = st.secrets.get("API_BASE", "http://127.0.0.1:8000")
 SESSION_HEADER = "X-Session-Id"
+TIMEOUT = 60
+# GET responses remembered for If-None-Match revalidation, across all users
+ETAG_CACHE_SIZE = 256
+MAX_PARALLEL = 8
+
+# one keep-alive connection pool for every page and user of this process
+_http = requests.Session()
+_http.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=MAX_PARALLEL * 2))
+_http.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=MAX_PARALLEL * 2))
+_pool = ThreadPoolExecutor(max_workers=MAX_PARALLEL, thread_name_prefix="api")
+
+_etag_lock = threading.Lock()
+_etag_cache = OrderedDict()  # (session id, path, params) -> (etag, headers, content, encoding)
 
 
 def _headers():
@@ -13,9 +32,90 @@ def _headers():
     return h
 
 
+def _cache_key(headers, path, params):
+    return (headers.get(SESSION_HEADER), path, tuple(sorted((params or {}).items())))
+
+
+def _from_cache(entry, url):
+    """A 200 Response rebuilt from a cached body, for a 304 revalidation"""
+    _, headers, content, encoding = entry
+    r = requests.Response()
+    r.status_code = 200
+    r.headers.update(headers)
+    r._content = content
+    r.encoding = encoding
+    r.url = url
+    return r
+
+
+def _get(path, params, headers):
+    key = _cache_key(headers, path, params)
+    with _etag_lock:
+        entry = _etag_cache.get(key)
+    send = dict(headers)
+    if entry:
+        send["If-None-Match"] = entry[0]
+    r = _http.get(f"{API_BASE}{path}", params=params, headers=send, timeout=TIMEOUT)
+    if r.status_code == 304 and entry:
+        # a 304's headers update the stored response's (RFC 9111 4.3.4)
+        stored = CaseInsensitiveDict(entry[1])
+        stored.update({k: v for k, v in r.headers.items() if not k.lower().startswith("content-")})
+        entry = (entry[0], dict(stored), entry[2], entry[3])
+        with _etag_lock:
+            if key in _etag_cache:
+                _etag_cache[key] = entry
+                _etag_cache.move_to_end(key)
+        return _from_cache(entry, r.url)
+    etag = r.headers.get("ETag")
+    if r.status_code == 200 and etag:
+        with _etag_lock:
+            _etag_cache[key] = (etag, dict(r.headers), r.content, r.encoding)
+            _etag_cache.move_to_end(key)
+            while len(_etag_cache) > ETAG_CACHE_SIZE:
+                _etag_cache.popitem(last=False)
+    return r
+
+
 def post(path, json=None, files=None):
-    return requests.post(f"{API_BASE}{path}", json=json, files=files, headers=_headers(), timeout=60)
+    return _http.post(f"{API_BASE}{path}", json=json, files=files, headers=_headers(), timeout=TIMEOUT)
 
 
 def get(path, params=None):
-    return requests.get(f"{API_BASE}{path}", params=params, headers=_headers(), timeout=60)
+    return _get(path, params, _headers())
+
+
+def download(path, params=None, chunk_size=1 << 20):
+    """
+    Stream a GET response body into a temporary file, chunk by chunk, so
+    large exports never sit in memory whole. Returns the open file (rewound)
+    or raises for an error status.
+    """
+    with _http.get(f"{API_BASE}{path}", params=params, headers=_headers(),
+                   stream=True, timeout=TIMEOUT) as r:
+        r.raise_for_status()
+        out = tempfile.SpooledTemporaryFile(max_size=8 << 20)
+        for chunk in r.iter_content(chunk_size):
+            out.write(chunk)
+    out.seek(0)
+    return out
+
+
+def get_many(calls: dict) -> dict:
+    """
+    Issue independent GETs concurrently. `calls` maps a name to a path or a
+    (path, params) pair; returns name -> Response, or the exception raised
+    for that call.
+    """
+    # session state is only readable from the script thread
+    headers = _headers()
+    futures = {}
+    for name, call in calls.items():
+        path, params = (call, None) if isinstance(call, str) else call
+        futures[name] = _pool.submit(_get, path, params, headers)
+    results = {}
+    for name, fut in futures.items():
+        try:
+            results[name] = fut.result()
+        except Exception as e:
+            results[name] = e
+    return results
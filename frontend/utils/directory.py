@@ -0,0 +1,80 @@
+from collections import OrderedDict
+import streamlit as st
+from utils.api import get
+
+PAGE_SIZE = 50
+DETAIL_CACHE_SIZE = 64
+
+
+class LRUCache:
+    """Bounded mapping that evicts the least recently used entry"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+
+    def get(self, key):
+        if key not in self._items:
+            return None
+        self._items.move_to_end(key)
+        return self._items[key]
+
+    def put(self, key, value):
+        self._items[key] = value
+        self._items.move_to_end(key)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+    def clear(self):
+        self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+
+def _state():
+    """Per-session directory state: the last fetched page and the detail cache"""
+    if "patient_directory" not in st.session_state:
+        st.session_state.patient_directory = {
+            "page_key": None, "page": {"patients": [], "total": 0},
+            "details": LRUCache(DETAIL_CACHE_SIZE),
+        }
+    return st.session_state.patient_directory
+
+
+def fetch_page(search: str = "", page: int = 1, page_size: int = PAGE_SIZE) -> dict:
+    """One page of patients from the API; only the most recent page is kept in the session"""
+    state = _state()
+    key = (search, page, page_size)
+    if state["page_key"] != key:
+        params = {"limit": page_size, "offset": (page - 1) * page_size}
+        if search:
+            params["search"] = search
+        r = get("/patients/", params=params)
+        r.raise_for_status()
+        data = r.json()
+        # keep only what the picker shows, not the full vitals summary rows
+        state["page"] = {
+            "patients": [{k: p.get(k) for k in ("id", "uid", "name", "age", "sex")}
+                         for p in data.get("patients", [])],
+            "total": data.get("total", 0),
+        }
+        state["page_key"] = key
+    return state["page"]
+
+
+def get_patient(patient_id: int) -> dict:
+    """Patient details from GET /patients/{id}, through the bounded per-session LRU"""
+    details = _state()["details"]
+    patient = details.get(patient_id)
+    if patient is None:
+        r = get(f"/patients/{patient_id}")
+        r.raise_for_status()
+        patient = r.json()
+        details.put(patient_id, patient)
+    return patient
+
+
+def reset():
+    """Drop cached pages and details, e.g. after an upload"""
+    st.session_state.pop("patient_directory", None)
@@ -0,0 +1,128 @@
+import json
+import queue
+import threading
+import requests
+import streamlit as st
+from utils.api import API_BASE, SESSION_HEADER
+
+
+class DashboardEvents:
+    """
+    Background reader of the /events/dashboard Server-Sent Events stream.
+    Events are queued as (id, event, data) for the page to drain without
+    blocking. Ids come from the API process's broker, so they only line up
+    with X-Event-Id when the API runs a single worker.
+    """
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.events = queue.Queue()
+        self.last_id = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            headers = {SESSION_HEADER: self.session_id, "Accept": "text/event-stream"}
+            if self.last_id is not None:
+                headers["Last-Event-ID"] = str(self.last_id)
+            try:
+                with requests.get(f"{API_BASE}/events/dashboard", headers=headers,
+                                  stream=True, timeout=(5, 60)) as r:
+                    if r.status_code in (401, 403):
+                        return
+                    event, data = "message", []
+                    for line in r.iter_lines(decode_unicode=True):
+                        if self._stop.is_set():
+                            return
+                        if line:
+                            field, _, value = line.partition(":")
+                            value = value[1:] if value.startswith(" ") else value
+                            if field == "id":
+                                self.last_id = int(value)
+                            elif field == "event":
+                                event = value
+                            elif field == "data":
+                                data.append(value)
+                        elif data:
+                            self.events.put((self.last_id, event, json.loads("\n".join(data))))
+                            event, data = "message", []
+            except (requests.RequestException, ValueError):
+                pass
+            # reconnect after the server's retry interval; Last-Event-ID replays the gap
+            self._stop.wait(3)
+
+    def drain(self):
+        """All events received since the last call"""
+        out = []
+        while True:
+            try:
+                out.append(self.events.get_nowait())
+            except queue.Empty:
+                return out
+
+    def close(self):
+        self._stop.set()
+
+
+def dashboard_events():
+    """The per-session event reader, started on first use"""
+    sid = st.session_state.get("session_id")
+    live = st.session_state.get("dashboard_events")
+    if live is None or live.session_id != sid:
+        if live is not None:
+            live.close()
+        live = DashboardEvents(sid)
+        st.session_state.dashboard_events = live
+    return live
+
+
+def apply_delta(stats: dict, vitals_summary: dict, delta: dict):
+    """Add one delta event to cached /dashboard/stats and /dashboard/vitals-summary responses"""
+    old_patients = stats.get("total_patients", 0)
+    for key, n in delta.get("stats", {}).items():
+        stats[key] = stats.get(key, 0) + n
+    # running mean over the patients added by this delta
+    added = delta.get("stats", {}).get("total_patients", 0)
+    if added and "new_patients_age_sum" in delta:
+        total_age = stats.get("avg_age", 0) * old_patients + delta["new_patients_age_sum"]
+        stats["avg_age"] = round(total_age / (old_patients + added), 1)
+    if {"heart_disease_count", "healthy_count"} & delta.get("stats", {}).keys():
+        labelled = stats.get("heart_disease_count", 0) + stats.get("healthy_count", 0)
+        if labelled:
+            stats["recovery_rate"] = round(stats.get("healthy_count", 0) * 100.0 / labelled, 1)
+    for group, counts in delta.get("vitals_summary", {}).items():
+        if isinstance(counts, dict):
+            target = vitals_summary.setdefault(group, {})
+            for label, n in counts.items():
+                target[label] = target.get(label, 0) + n
+        else:
+            vitals_summary[group] = vitals_summary.get(group, 0) + counts
+
+
+def event_mark(response) -> int:
+    """X-Event-Id of a dashboard response: the last event already reflected in its body"""
+    try:
+        return int(response.headers.get("X-Event-Id", 0))
+    except ValueError:
+        return 0
+
+
+def apply_events(cache: dict, events) -> bool:
+    """
+    Apply queued (id, event, data) deltas in order to the cached stats and
+    vitals summary, skipping each one at or below the mark of the fetch it
+    would double count. False if the caches must be re-fetched.
+    """
+    marks = cache.get("marks", {})
+    for event_id, event, data in events:
+        if event == "resync":
+            return False
+        if event == "delta":
+            # a part's mark covers the deltas already in its fetched body
+            new = {part: event_id is None or event_id > marks.get(part, 0) for part in ("stats", "vitals")}
+            stats = cache["stats"] if new["stats"] else {}
+            vitals = cache["vitals"] if new["vitals"] and cache["vitals"] is not None else {}
+            apply_delta(stats, vitals, data)
+    return True
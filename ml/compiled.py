@@ -0,0 +1,208 @@
+"""
+Compiled (pure NumPy) representation of the risk model bundle.
+
+`compile_bundle` flattens every gradient boosting pipeline in the bundle into
+complete binary trees of fixed depth, stacked across outcomes:
+
+    tree_feature[t, node]    split feature of internal node (heap order)
+    tree_threshold[t, node]  split threshold (+inf for padded nodes)
+    tree_leaves[t, leaf]     leaf value, already scaled by the learning rate
+
+Scoring compares each row against every split of every tree at once and then
+walks `depth` levels with vectorized gathers, with no sklearn import and no
+per-estimator Python overhead. Imputation
+and the float32 cast match what the sklearn pipeline does, so probabilities
+agree with the full estimator to floating point rounding.
+
+    python -m ml.compiled   # re-export models/risk_model.npz from the joblib bundle
+"""
+
+import json
+import os
+
+import numpy as np
+
+from ml.features import MODEL_DIR, patients_to_matrix
+
+ARTIFACT_FILE = "risk_model.npz"
+
+
+def _fill(tree, node, pos, n_internal, feature, threshold, leaves, scale):
+    """Copy `tree` below `node` into heap position `pos`, padding short branches"""
+    if pos >= n_internal:
+        leaves[pos - n_internal] = tree.value[node, 0, 0] * scale
+        return
+    left, right = tree.children_left[node], tree.children_right[node]
+    if left == -1:
+        # leaf above max depth: route everything left to a copy of itself
+        feature[pos], threshold[pos] = 0, np.inf
+        _fill(tree, node, 2 * pos + 1, n_internal, feature, threshold, leaves, scale)
+        _fill(tree, node, 2 * pos + 2, n_internal, feature, threshold, leaves, scale)
+        return
+    feature[pos], threshold[pos] = tree.feature[node], tree.threshold[node]
+    _fill(tree, left, 2 * pos + 1, n_internal, feature, threshold, leaves, scale)
+    _fill(tree, right, 2 * pos + 2, n_internal, feature, threshold, leaves, scale)
+
+
+def compile_bundle(bundle: dict) -> "CompiledRiskModel":
+    """Flatten a bundle from ml.train into a CompiledRiskModel"""
+    outcomes = list(bundle["models"])
+    pipes = [bundle["models"][o] for o in outcomes]
+
+    impute = pipes[0]["impute"].statistics_
+    for pipe in pipes[1:]:
+        if not np.array_equal(pipe["impute"].statistics_, impute):
+            raise ValueError("All outcome pipelines must share imputer statistics")
+
+    trees, scales, init_raw, starts = [], [], [], []
+    for pipe in pipes:
+        gb = pipe["model"]
+        starts.append(len(trees))
+        trees.extend(est[0].tree_ for est in gb.estimators_)
+        scales.extend([gb.learning_rate] * len(gb.estimators_))
+        p = gb.init_.class_prior_[1]
+        init_raw.append(np.log(p / (1 - p)))
+
+    depth = max(t.max_depth for t in trees)
+    n_internal = 2 ** depth - 1
+    feature = np.zeros((len(trees), n_internal), dtype=np.intp)
+    threshold = np.full((len(trees), n_internal), np.inf)
+    leaves = np.zeros((len(trees), 2 ** depth))
+    for i, (tree, scale) in enumerate(zip(trees, scales)):
+        _fill(tree, 0, 0, n_internal, feature[i], threshold[i], leaves[i], scale)
+
+    return CompiledRiskModel(
+        features=list(bundle["features"]),
+        outcomes=outcomes,
+        impute=np.asarray(impute, dtype=np.float64),
+        tree_feature=feature,
+        tree_threshold=threshold,
+        tree_leaves=leaves,
+        outcome_starts=np.asarray(starts, dtype=np.intp),
+        init_raw=np.asarray(init_raw, dtype=np.float64),
+        meta={"version": bundle["version"], "trained": bundle["trained"]},
+    )
+
+
+class CompiledRiskModel:
+    # rows scored per vectorized step; bounds the (rows, trees) temporaries
+    CHUNK_ROWS = 2048
+
+    def __init__(self, features, outcomes, impute, tree_feature, tree_threshold,
+                 tree_leaves, outcome_starts, init_raw, meta=None):
+        self.features = list(features)
+        self.outcomes = list(outcomes)
+        self.impute = impute
+        self.tree_feature = tree_feature
+        self.tree_threshold = tree_threshold
+        self.tree_leaves = tree_leaves
+        self.outcome_starts = outcome_starts
+        self.init_raw = init_raw
+        self.meta = meta or {}
+        self.depth = int(np.log2(tree_leaves.shape[1]))
+        n_trees = tree_feature.shape[0]
+        # (trees, outcomes) one-hot: leaf matrix @ tree_outcome sums per outcome
+        tree_outcome = np.searchsorted(outcome_starts, np.arange(n_trees), side="right") - 1
+        self.tree_outcome = np.eye(len(self.outcomes))[tree_outcome]
+        self._all_trees = np.arange(n_trees)
+
+    def prepare(self, X) -> np.ndarray:
+        """Impute and round to float32 exactly as the sklearn pipeline does"""
+        X = np.asarray(X, dtype=np.float64).reshape(-1, len(self.features))
+        X = np.where(np.isnan(X), self.impute, X)
+        # sklearn trees compare float32 inputs against float64 thresholds
+        return X.astype(np.float32).astype(np.float64)
+
+    def trees_using(self, feature_idx) -> np.ndarray:
+        """Indices of trees with a real split on any of the given features"""
+        uses = np.isin(self.tree_feature, feature_idx) & np.isfinite(self.tree_threshold)
+        return np.flatnonzero(uses.any(axis=1))
+
+    def leaf_values(self, Xp, trees=None) -> np.ndarray:
+        """(rows, trees) leaf values for prepared rows, over all or selected trees"""
+        trees = self._all_trees if trees is None else np.asarray(trees)
+        n_internal = self.tree_feature.shape[1]
+        feature = self.tree_feature[trees].ravel()
+        threshold = self.tree_threshold[trees].ravel()
+        leaves = self.tree_leaves[trees].ravel()
+        node_base = np.arange(len(trees)) * n_internal
+        leaf_base = np.arange(len(trees)) * self.tree_leaves.shape[1] - n_internal
+
+        out = np.empty((Xp.shape[0], len(trees)))
+        for start in range(0, Xp.shape[0], self.CHUNK_ROWS):
+            chunk = Xp[start:start + self.CHUNK_ROWS]
+            # every split of every tree at once, then walk down `depth` levels
+            go_right = chunk[:, feature] > threshold
+            rows = np.arange(chunk.shape[0])[:, None]
+            pos = np.zeros((chunk.shape[0], len(trees)), dtype=np.intp)
+            for _ in range(self.depth):
+                pos = 2 * pos + 1 + go_right[rows, node_base + pos]
+            out[start:start + chunk.shape[0]] = leaves[leaf_base + pos]
+        return out
+
+    def raw_scores(self, X) -> np.ndarray:
+        """Log-odds per (row, outcome) for a float matrix in `features` order"""
+        return self.init_raw + self.leaf_values(self.prepare(X)) @ self.tree_outcome
+
+    def predict_proba(self, X) -> dict:
+        """Positive-class probability per outcome, like ml.evaluate.score"""
+        return self.proba_from_raw(self.raw_scores(X))
+
+    def proba_from_raw(self, raw) -> dict:
+        proba = 1.0 / (1.0 + np.exp(-raw))
+        return {o: proba[..., i] for i, o in enumerate(self.outcomes)}
+
+    def predict_patients(self, patients) -> dict:
+        """Score patient dicts (API/repo rows) directly"""
+        return self.predict_proba(patients_to_matrix(patients))
+
+    def save(self, model_dir: str = MODEL_DIR) -> str:
+        os.makedirs(model_dir, exist_ok=True)
+        path = os.path.join(model_dir, ARTIFACT_FILE)
+        np.savez(path,
+                 features=np.array(self.features),
+                 outcomes=np.array(self.outcomes),
+                 impute=self.impute,
+                 tree_feature=self.tree_feature,
+                 tree_threshold=self.tree_threshold,
+                 tree_leaves=self.tree_leaves,
+                 outcome_starts=self.outcome_starts,
+                 init_raw=self.init_raw,
+                 meta=np.array(json.dumps(self.meta)))
+        return path
+
+
+def load_compiled(path: str = os.path.join(MODEL_DIR, ARTIFACT_FILE)) -> CompiledRiskModel:
+    with np.load(path, allow_pickle=False) as a:
+        return CompiledRiskModel(
+            features=a["features"].tolist(),
+            outcomes=a["outcomes"].tolist(),
+            impute=a["impute"],
+            tree_feature=a["tree_feature"],
+            tree_threshold=a["tree_threshold"],
+            tree_leaves=a["tree_leaves"],
+            outcome_starts=a["outcome_starts"],
+            init_raw=a["init_raw"],
+            meta=json.loads(str(a["meta"])),
+        )
+
+
+def check_parity(bundle: dict, compiled: CompiledRiskModel, X) -> float:
+    """Largest absolute probability difference between bundle and compiled model"""
+    fast = compiled.predict_proba(X)
+    diff = 0.0
+    for o in compiled.outcomes:
+        full = bundle["models"][o].predict_proba(X)[:, 1]
+        diff = max(diff, float(np.max(np.abs(full - fast[o]))))
+    return diff
+
+
+if __name__ == "__main__":
+    from ml.features import FEATURES, load_dataset
+    from ml.train import load_bundle
+
+    bundle = load_bundle()
+    compiled = compile_bundle(bundle)
+    X, _ = load_dataset()
+    print(f"Max |p_full - p_compiled| = {check_parity(bundle, compiled, X[FEATURES]):.2e}")
+    print(f"✅ Saved compiled model to {compiled.save()}")
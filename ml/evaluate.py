@@ -1 +1,154 @@
-print("Evaluation placeholder")
+"""
+Offline evaluation harness for the AegisCare risk models.
+
+Scores the stratified holdout of the bundled dataset, computes discrimination
+and calibration metrics per outcome, measures single-row and batch inference
+latency, and writes models/eval_report.json. The backend reads that report
+and returns it as `model_meta` (see app.services.model).
+
+    python -m ml.train
+    python -m ml.evaluate
+"""
+
+import json
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+import typer
+from sklearn.metrics import (accuracy_score, brier_score_loss, f1_score, log_loss,
+                             precision_score, recall_score, roc_auc_score)
+
+from ml.features import DATA_PATH, FEATURES, MODEL_DIR, OUTCOMES, load_dataset, split_dataset
+from ml.train import load_bundle
+
+REPORT_FILE = "eval_report.json"
+CALIBRATION_BINS = 10
+BATCH_SIZES = (1, 32, 256, 1024)
+
+
+def percentiles(samples_ms) -> dict:
+    a = np.asarray(samples_ms, dtype=float)
+    return {
+        "p50_ms": round(float(np.percentile(a, 50)), 4),
+        "p95_ms": round(float(np.percentile(a, 95)), 4),
+        "p99_ms": round(float(np.percentile(a, 99)), 4),
+        "mean_ms": round(float(a.mean()), 4),
+    }
+
+
+def calibration(y_true, proba, n_bins: int = CALIBRATION_BINS) -> dict:
+    """Reliability table over equal-width bins plus expected calibration error"""
+    y_true = np.asarray(y_true)
+    proba = np.asarray(proba)
+    idx = np.minimum((proba * n_bins).astype(int), n_bins - 1)
+    bins = []
+    ece = 0.0
+    for b in range(n_bins):
+        mask = idx == b
+        n = int(mask.sum())
+        if not n:
+            continue
+        mean_pred = float(proba[mask].mean())
+        frac_pos = float(y_true[mask].mean())
+        ece += n / len(proba) * abs(mean_pred - frac_pos)
+        bins.append({"bin": b, "count": n, "mean_predicted": round(mean_pred, 4),
+                     "fraction_positive": round(frac_pos, 4)})
+    return {"ece": round(ece, 4), "bins": bins}
+
+
+def outcome_metrics(y_true, proba, threshold: float = 0.5) -> dict:
+    pred = (proba >= threshold).astype(int)
+    return {
+        "auroc": round(float(roc_auc_score(y_true, proba)), 4),
+        "brier": round(float(brier_score_loss(y_true, proba)), 4),
+        "log_loss": round(float(log_loss(y_true, proba, labels=[0, 1])), 4),
+        "accuracy": round(float(accuracy_score(y_true, pred)), 4),
+        "precision": round(float(precision_score(y_true, pred, zero_division=0)), 4),
+        "recall": round(float(recall_score(y_true, pred, zero_division=0)), 4),
+        "f1": round(float(f1_score(y_true, pred, zero_division=0)), 4),
+        "positive_rate": round(float(np.mean(y_true)), 4),
+        "calibration": calibration(y_true, proba),
+    }
+
+
+def score(models: dict, X) -> dict:
+    """Positive-class probability for every outcome"""
+    return {o: models[o].predict_proba(X)[:, 1] for o in OUTCOMES}
+
+
+def measure_latency(models: dict, X, single_calls: int = 200, repeats: int = 5) -> dict:
+    """Time all-outcome scoring for one row at a time and for fixed batch sizes"""
+    rng = np.random.default_rng(0)
+    rows = rng.integers(0, len(X), size=single_calls)
+    single = []
+    for i in rows:
+        row = X.iloc[[i]]
+        t0 = time.perf_counter()
+        score(models, row)
+        single.append((time.perf_counter() - t0) * 1000)
+
+    batches = {}
+    for size in BATCH_SIZES:
+        if size > len(X):
+            continue
+        batch = X.iloc[:size]
+        times = []
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            score(models, batch)
+            times.append((time.perf_counter() - t0) * 1000)
+        stats = percentiles(times)
+        stats["rows_per_sec"] = round(size / (np.median(times) / 1000), 1)
+        batches[str(size)] = stats
+
+    single_stats = percentiles(single)
+    single_stats["rows_per_sec"] = round(1000 / single_stats["p50_ms"], 1)
+    return {"single_row": single_stats, "batch": batches}
+
+
+def evaluate(bundle: dict, X_test, y_test) -> dict:
+    models = bundle["models"]
+    X_test = X_test[FEATURES]
+    probas = score(models, X_test)
+    metrics = {o: outcome_metrics(y_test[o].to_numpy(), probas[o]) for o in OUTCOMES}
+    return {
+        "version": bundle["version"],
+        "trained": bundle["trained"],
+        "evaluated": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "holdout_rows": int(len(X_test)),
+        "features": FEATURES,
+        "auroc": metrics["target"]["auroc"],
+        "metrics": metrics,
+        "latency": measure_latency(models, X_test),
+    }
+
+
+def write_report(report: dict, model_dir: str = MODEL_DIR) -> str:
+    os.makedirs(model_dir, exist_ok=True)
+    path = os.path.join(model_dir, REPORT_FILE)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    return path
+
+
+def main(data: str = DATA_PATH, model_dir: str = MODEL_DIR):
+    """Evaluate the trained risk models on the stratified holdout"""
+    X, y = load_dataset(data)
+    _, X_test, _, y_test = split_dataset(X, y)
+    bundle = load_bundle(model_dir)
+    typer.echo(f"📊 Evaluating {bundle['version']} on {len(X_test)} holdout rows...")
+    report = evaluate(bundle, X_test, y_test)
+    for o in OUTCOMES:
+        m = report["metrics"][o]
+        typer.echo(f"   {o:<13} AUROC {m['auroc']:.3f}  Brier {m['brier']:.3f}  "
+                   f"ECE {m['calibration']['ece']:.3f}")
+    lat = report["latency"]["single_row"]
+    typer.echo(f"   single-row p50 {lat['p50_ms']:.2f} ms  p99 {lat['p99_ms']:.2f} ms")
+    path = write_report(report, model_dir)
+    typer.echo(f"✅ Wrote report to {path}")
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -1 +1,83 @@
-print("Feature engineering placeholder")
+"""
+Feature engineering shared by training, evaluation and serving.
+
+The bundled dataset uses the raw CSV headers while the API works with the
+snake_case columns of `patient_vitals_summary`; both are mapped onto the same
+ordered feature vector here so train/serve stay in sync.
+"""
+
+import os
+
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_PATH = os.path.join(ROOT_DIR, "data", "merged_with_synthetic_outcomes.csv")
+MODEL_DIR = os.getenv("AEGIS_MODEL_DIR", os.path.join(ROOT_DIR, "models"))
+
+# CSV header -> feature name (same names as patient_vitals_summary columns).
+# num_vessels / thalassemia are -1 (missing) for every row of the dataset,
+# so they are left out of the model.
+CSV_FEATURES = {
+    "age": "age",
+    "sex": "sex",
+    "chest pain type": "chest_pain_type",
+    "Resting blood pressure": "resting_bp",
+    "Serum cholesterol level (mg/dl).": "cholesterol",
+    "Fasting Blood Sugar": "fasting_bs",
+    "Resting Electrocardiogram Results": "resting_ecg",
+    "Maximum Heart Rate Achieved": "max_heart_rate",
+    "Exercise-Induced Angina": "exercise_angina",
+    "ST Depression Induced by Exercise": "st_depression",
+    "Slope of the Peak Exercise ST Segment": "st_slope",
+}
+FEATURES = list(CSV_FEATURES.values())
+
+OUTCOMES = ["target", "readmission", "complication", "mortality"]
+
+# patients.sex is stored as M/F/O, the CSV uses 0=M, 1=F
+SEX_CODES = {"M": 0.0, "F": 1.0}
+
+TEST_SIZE = 0.2
+RANDOM_STATE = 42
+
+
+def load_dataset(path: str = DATA_PATH):
+    """Load the bundled CSV and return (X, y) with model feature names"""
+    # pandas/sklearn are imported here so the API can use the row helpers
+    # below without paying for them at startup
+    import pandas as pd
+
+    df = pd.read_csv(path).dropna(subset=OUTCOMES)
+    X = df[list(CSV_FEATURES)].rename(columns=CSV_FEATURES).astype(float)
+    # -1 is the dataset's missing-value marker (see ingest._safe_float)
+    X = X.mask(X == -1)
+    y = df[OUTCOMES].astype(int)
+    return X.reset_index(drop=True), y.reset_index(drop=True)
+
+
+def split_dataset(X, y, outcome: str = "target"):
+    """Stratified holdout split, identical for training and evaluation"""
+    from sklearn.model_selection import train_test_split
+
+    return train_test_split(X, y, test_size=TEST_SIZE, random_state=RANDOM_STATE,
+                            stratify=y[outcome])
+
+
+def patient_to_row(patient: dict) -> list:
+    """Build one feature vector from a patient row as returned by the API/repo"""
+    row = []
+    for name in FEATURES:
+        val = patient.get(name)
+        if name == "sex":
+            val = SEX_CODES.get(val, val) if isinstance(val, str) else val
+        try:
+            val = float(val) if val is not None else np.nan
+        except (ValueError, TypeError):
+            val = np.nan
+        row.append(val)
+    return row
+
+
+def patients_to_matrix(patients) -> np.ndarray:
+    """Stack patient rows into a float64 matrix in FEATURES order"""
+    return np.array([patient_to_row(p) for p in patients], dtype=np.float64).reshape(-1, len(FEATURES))
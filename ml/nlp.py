@@ -1,15 +1,137 @@
+"""
+Keyword-based clinical notes analysis.
+
+All lexicon terms are compiled into a single regex whose alternation is
+factored as a character trie ("hyperten(?:sion|sive)"), so a note is lowercased
+once and scanned once regardless of how many findings the lexicon defines.
+`summarize_many` fans large batches out to a process pool.
+"""
+
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
+
+# finding -> trigger terms; order here is the order findings are reported in
+CLINICAL_LEXICON = {
+    "Patient reports fatigue": ["fatigue", "fatigued", "tired", "exhausted", "lethargic"],
+    "Possible medication non-adherence": ["adherence", "non-adherence", "non-compliance",
+                                          "missed doses", "missed dose", "stopped taking"],
+    "Hypertension noted": ["bp", "blood pressure", "hypertension", "hypertensive"],
+    "Diabetes-related issues present": ["sugar", "glucose", "diabetes", "diabetic", "hba1c"],
+    "Low oxygen saturation": ["oxygen saturation", "spo2", "hypoxia", "hypoxic", "desaturation"],
+    "Fever or temperature spike": ["fever", "febrile", "temperature spike", "pyrexia"],
+    "Heart rhythm irregularity": ["irregular", "arrhythmia", "palpitations", "tachycardia",
+                                  "bradycardia", "atrial fibrillation", "afib"],
+    "Chest pain reported": ["chest pain", "angina", "chest tightness"],
+    "Shortness of breath": ["shortness of breath", "dyspnea", "sob", "breathless"],
+    "Patient improving": ["feeling better", "improving", "improved", "stable", "comfortable"],
+}
+
+NO_FINDINGS = "No significant insights extracted."
+
+
+def _trie_pattern(terms) -> str:
+    """Regex alternation for `terms` with shared prefixes factored out"""
+    trie = {}
+    for term in terms:
+        node = trie
+        for ch in term:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node):
+        if list(node) == [""]:
+            return ""
+        alts = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        if "" in node:
+            # a term ends here; greedy ? keeps the longest match
+            body = (body if len(alts) > 1 else "(?:" + body + ")") + "?"
+        return body
+
+    return build(trie)
+
+
+class NoteMatcher:
+    """Single-pass multi-term matcher over a findings lexicon"""
+
+    def __init__(self, lexicon: dict):
+        self.lexicon = {finding: list(terms) for finding, terms in lexicon.items()}
+        self._compile()
+
+    def _compile(self):
+        self._term_to_finding = {}
+        for finding, terms in self.lexicon.items():
+            for term in terms:
+                self._term_to_finding.setdefault(term.lower(), finding)
+        self._order = {finding: i for i, finding in enumerate(self.lexicon)}
+        # matched against lowercased text; IGNORECASE is several times slower
+        self.pattern = re.compile(r"\b" + _trie_pattern(self._term_to_finding) + r"\b")
+
+    def add_terms(self, finding: str, terms):
+        """Extend the lexicon (new finding or extra terms) and recompile"""
+        self.lexicon.setdefault(finding, []).extend(terms)
+        self._compile()
+
+    def analyze(self, text: str) -> dict:
+        matches = self.pattern.findall(text.lower()) if text else None
+        if not matches:
+            return {"summary": NO_FINDINGS, "findings": [], "keywords": {}}
+        keywords = {}
+        for term in matches:
+            keywords[term] = keywords.get(term, 0) + 1
+        findings = sorted({self._term_to_finding[k] for k in keywords}, key=self._order.get)
+        return {"summary": "; ".join(findings), "findings": findings, "keywords": keywords}
+
+
+_matcher = NoteMatcher(CLINICAL_LEXICON)
+
+
+def register_terms(finding: str, terms):
+    """Add terms to the module-level lexicon used by the functions below"""
+    _matcher.add_terms(finding, terms)
+
+
+def analyze_note(text: str) -> dict:
+    """Findings, matched keywords and a one-line summary for one note"""
+    return _matcher.analyze(text)
 
 
 def summarize_notes(text: str) -> str:
-    # naive keyword-based summarizer for hackathon demo
-    findings = []
-    if re.search(r"fatigue|tired", text.lower()):
-        findings.append("Patient reports fatigue")
-    if re.search(r"adherence|non-compliance", text.lower()):
-        findings.append("Possible medication non-adherence")
-    if re.search(r"bp|blood pressure|hypertension", text.lower()):
-        findings.append("Hypertension noted")
-    if re.search(r"sugar|glucose|diabetes", text.lower()):
-        findings.append("Diabetes-related issues present")
-    return "; ".join(findings) if findings else "No significant insights extracted."
+    """Semicolon-separated findings for one note"""
+    return _matcher.analyze(text)["summary"]
+
+
+def combine_results(results) -> dict:
+    """Merge per-note analyses into one patient-level summary"""
+    findings, keywords = [], {}
+    for r in results:
+        for finding in r["findings"]:
+            if finding not in findings:
+                findings.append(finding)
+        for kw, n in r["keywords"].items():
+            keywords[kw] = keywords.get(kw, 0) + n
+    return {
+        "summary": "; ".join(findings) if findings else NO_FINDINGS,
+        "findings": findings,
+        "keywords": dict(sorted(keywords.items(), key=lambda kv: -kv[1])),
+    }
+
+
+def _analyze_chunk(texts):
+    return [_matcher.analyze(t) for t in texts]
+
+
+def summarize_many(texts, workers: int = 1, chunksize: int = 2000) -> list:
+    """
+    analyze_note() for every text, in input order.
+    workers > 1 splits the batch into chunks scored in a process pool; only
+    worth it for batches of many thousands of notes. Terms added with
+    register_terms() are only seen by workers on fork-based platforms.
+    """
+    texts = list(texts)
+    if workers <= 1 or len(texts) <= chunksize:
+        return _analyze_chunk(texts)
+    chunks = [texts[i:i + chunksize] for i in range(0, len(texts), chunksize)]
+    with ProcessPoolExecutor(max_workers=min(workers, os.cpu_count() or 1)) as pool:
+        return [r for chunk in pool.map(_analyze_chunk, chunks) for r in chunk]
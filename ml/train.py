@@ -1 +1,83 @@
-print("Training pipeline placeholder")
+"""
+Training pipeline for the AegisCare risk models.
+
+Fits one imputer + gradient boosting pipeline per outcome on the stratified
+training split and saves them together to models/risk_model.joblib, plus the
+compiled NumPy export the API serves from (models/risk_model.npz).
+
+    python -m ml.train
+"""
+
+import os
+from datetime import date
+
+import joblib
+import typer
+from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+
+from ml.features import (DATA_PATH, FEATURES, MODEL_DIR, OUTCOMES, RANDOM_STATE,
+                         load_dataset, split_dataset)
+
+MODEL_VERSION = "v1.0"
+MODEL_FILE = "risk_model.joblib"
+PARITY_TOLERANCE = 1e-9
+
+
+def build_pipeline() -> Pipeline:
+    return Pipeline([
+        ("impute", SimpleImputer(strategy="median")),
+        ("model", GradientBoostingClassifier(n_estimators=150, max_depth=3,
+                                             learning_rate=0.1, random_state=RANDOM_STATE)),
+    ])
+
+
+def train_models(X_train, y_train) -> dict:
+    """Fit one pipeline per outcome column"""
+    models = {}
+    for outcome in OUTCOMES:
+        pipe = build_pipeline()
+        pipe.fit(X_train[FEATURES], y_train[outcome])
+        models[outcome] = pipe
+    return models
+
+
+def save_bundle(models: dict, model_dir: str = MODEL_DIR) -> str:
+    os.makedirs(model_dir, exist_ok=True)
+    path = os.path.join(model_dir, MODEL_FILE)
+    joblib.dump({
+        "version": MODEL_VERSION,
+        "trained": date.today().isoformat(),
+        "features": FEATURES,
+        "models": models,
+    }, path)
+    return path
+
+
+def load_bundle(model_dir: str = MODEL_DIR) -> dict:
+    return joblib.load(os.path.join(model_dir, MODEL_FILE))
+
+
+def main(data: str = DATA_PATH, model_dir: str = MODEL_DIR):
+    """Train risk models on the bundled dataset"""
+    from ml.compiled import check_parity, compile_bundle
+
+    X, y = load_dataset(data)
+    X_train, X_test, y_train, _ = split_dataset(X, y)
+    typer.echo(f"🧠 Training {len(OUTCOMES)} models on {len(X_train)} rows...")
+    models = train_models(X_train, y_train)
+    path = save_bundle(models, model_dir)
+    typer.echo(f"✅ Saved model bundle to {path}")
+
+    bundle = load_bundle(model_dir)
+    compiled = compile_bundle(bundle)
+    diff = check_parity(bundle, compiled, X_test[FEATURES])
+    if diff > PARITY_TOLERANCE:
+        typer.echo(f"❌ Compiled model diverges from the estimator (max diff {diff:.2e})")
+        raise typer.Exit(1)
+    typer.echo(f"✅ Saved compiled model to {compiled.save(model_dir)} (max diff {diff:.2e})")
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -40,7 +40,8 @@ cd ..
 # Start services
 echo "🚀 Starting backend (FastAPI) and frontend (Streamlit)..."
 # backend runs on 8000, frontend on 8501
-gnome-terminal -- bash -c "cd backend && uvicorn app.main:app --reload --host 0.0.0.0 --port 8000"
+# PYTHONPATH=.. puts the shared ml/ package (repository root) on the path
+gnome-terminal -- bash -c "cd backend && PYTHONPATH=.. uvicorn app.main:app --reload --host 0.0.0.0 --port 8000"
 gnome-terminal -- bash -c "cd frontend && streamlit run app.py --server.port=8501"
 
 echo "✅ Setup complete! Visit:"
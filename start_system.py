@@ -58,6 +58,11 @@ def start_backend():
         # Change to backend directory
         os.chdir(backend_dir)
 
+        # The shared ml/ package lives at the repository root, next to backend/
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(
+            p for p in (str(backend_dir.resolve().parent), env.get("PYTHONPATH")) if p)
+
         # Start the server
         process = subprocess.Popen([
             sys.executable, "-m", "uvicorn",
@@ -65,7 +70,7 @@ def start_backend():
             "--reload",
             "--host", "0.0.0.0",
             "--port", "8000"
-        ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        ], stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env)
 
         # Wait a bit for server to start
         time.sleep(3)
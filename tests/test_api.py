@@ -1,2 +1,783 @@
+import os
+import sys
+
+# backend/ holds the `app` package, the repository root the shared `ml` package
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.extend(p for p in (ROOT, os.path.join(ROOT, "backend")) if p not in sys.path)
+
+from datetime import date, datetime, timedelta  # noqa: E402
+from decimal import Decimal  # noqa: E402
+import json  # noqa: E402
+import re  # noqa: E402
+
+import numpy as np  # noqa: E402
+import pytest  # noqa: E402
+
+from app.db import partitions  # noqa: E402
+from app.db import repo as repo_module  # noqa: E402
+from app.services import events  # noqa: E402
+from app.services import ingest  # noqa: E402
+from app.services import notes as notes_service  # noqa: E402
+from app.services import population  # noqa: E402
+from app.services import risk  # noqa: E402
+from app.services import rollups  # noqa: E402
+from app.services import stream  # noqa: E402
+from app.services import vitals as vitals_service  # noqa: E402
+
+
 def test_dummy():
     assert True
+
+
+def test_add_notes_precomputes_findings(monkeypatch):
+    stored = []
+    monkeypatch.setattr(notes_service.repo, "insert_notes", stored.extend)
+    notes_service.add_notes([(7, "BP elevated overnight", None)], author_user_id=1)
+    (row,) = stored
+    assert row[0] == 7 and row[3] == "Hypertension noted"
+    assert row[4] == '["Hypertension noted"]'
+
+
+def test_patient_notes_combined_from_stored_json(monkeypatch):
+    rows = [
+        {"id": 1, "note_text": "fever", "findings": '["Fever or temperature spike"]',
+         "keywords": '{"fever": 1}'},
+        {"id": 2, "note_text": "chest pain, fever", "findings": None, "keywords": None},
+    ]
+    monkeypatch.setattr(notes_service.repo, "get_patient_notes", lambda pid, limit: rows)
+    res = notes_service.get_patient_notes(3)
+    assert res["total_notes"] == 2
+    assert res["findings"] == ["Fever or temperature spike"]
+    assert res["keywords"] == {"fever": 1}
+
+
+def test_lttb_keeps_endpoints_and_peaks():
+    x = np.arange(1000, dtype=float)
+    y = np.zeros(1000)
+    y[500] = 10.0
+    keep = vitals_service.lttb(x, y, 50)
+    assert len(keep) == 50 and keep[0] == 0 and keep[-1] == 999
+    assert 500 in keep and (np.diff(keep) > 0).all()
+
+
+def test_bucketed_vitals_time_axis(monkeypatch):
+    t0 = datetime(2024, 1, 1)
+    monkeypatch.setattr(vitals_service.repo, "get_patient_vitals_span",
+                        lambda *a: {"first_at": t0, "last_at": t0 + timedelta(hours=99), "n": 100})
+    calls = []
+
+    def buckets(pid, start, end, seconds, types):
+        calls.append((start, end, seconds))
+        return [{"obs_type": "RESTING_BP", "bucket": 3, "value_num": 120.0,
+                 "value_min": 110.0, "value_max": 130.0, "n": 10}]
+    monkeypatch.setattr(vitals_service.repo, "get_patient_vitals_buckets", buckets)
+    res = vitals_service.get_vitals(1, types=["RESTING_BP"], points=10)
+    (start, end, seconds), = calls
+    assert start == t0 and seconds == 35641
+    assert res["vitals"][0]["observed_at"] == t0 + timedelta(seconds=3 * seconds)
+    assert res["total_observations"] == 100 and res["returned_points"] == 1
+
+
+def test_pivot_series_aligns_types_on_timestamps():
+    t0 = datetime(2024, 1, 1)
+    rows = [
+        {"obs_type": "RESTING_BP", "value_num": 120.0, "observed_at": t0, "unit": "mmHg"},
+        {"obs_type": "CHOLESTEROL", "value_num": 200.0, "observed_at": t0},
+        {"obs_type": "RESTING_BP", "value_num": 130.0, "observed_at": t0 + timedelta(hours=1)},
+        {"obs_type": "ST_SLOPE", "value_num": None, "observed_at": t0},
+    ]
+    out = vitals_service.pivot_series(rows)
+    assert out["timestamps"] == [1704067200000, 1704070800000]
+    assert out["series"] == {"CHOLESTEROL": [200.0, None], "RESTING_BP": [120.0, 130.0]}
+    assert out["units"]["RESTING_BP"] == "mmHg"
+    # two readings of one type at the same instant are averaged, not overwritten
+    out = vitals_service.pivot_series(rows + [
+        {"obs_type": "RESTING_BP", "value_num": 140.0, "observed_at": t0}])
+    assert out["series"]["RESTING_BP"] == [130.0, 130.0]
+
+
+def test_partition_roll_and_retention_plans():
+    to_days = lambda d: d.toordinal() + partitions.TO_DAYS_OFFSET  # noqa: E731
+    current = [{"name": "p_history", "bound": to_days(date(2026, 1, 1))},
+               {"name": "p202601", "bound": to_days(date(2026, 2, 1))},
+               {"name": "p_future", "bound": "MAXVALUE"}]
+    plan = partitions.plan_roll(current, date(2026, 3, 15), months_ahead=1)
+    assert plan == [("p202602", date(2026, 3, 1)), ("p202603", date(2026, 4, 1)),
+                    ("p202604", date(2026, 5, 1))]
+    assert partitions.plan_retention(current, date(2026, 3, 15), retain_months=2) == ["p_history"]
+    assert partitions.plan_retention(current, date(2026, 3, 15), retain_months=1) == ["p_history", "p202601"]
+
+
+def test_schema_splits_into_whole_statements():
+    # init_database(), init_db.py, reset_db.py and observations_ddl() split on ";"
+    with open(partitions.SCHEMA_PATH) as f:
+        pieces = f.read().split(";")
+    for piece in pieces:
+        lines = [line.strip() for line in piece.splitlines()
+                 if line.strip() and not line.strip().startswith("--")]
+        if not lines:
+            continue
+        assert lines[0].startswith(("CREATE TABLE IF NOT EXISTS ", "INSERT ")), lines[0]
+        if lines[0].startswith("CREATE TABLE"):
+            body = " ".join(lines)
+            assert re.fullmatch(r"\)( ENGINE=\w+)?", lines[-1]), lines[-1]
+            assert body.count("(") == body.count(")"), lines[0]
+
+
+def test_observations_migration_copies_then_swaps(monkeypatch):
+    ddl = partitions.observations_ddl(partitions.MIGRATION_TABLE)
+    assert ddl.startswith(f"CREATE TABLE IF NOT EXISTS {partitions.MIGRATION_TABLE} (")
+    assert "idx_obs_type_time (obs_type, observed_at)" in ddl and "PARTITION BY RANGE" in ddl
+    assert partitions.copy_ranges(None, None) == []
+    assert partitions.copy_ranges(3, 10, batch_rows=4) == [(3, 7), (7, 11)]
+
+    sent = []
+    monkeypatch.setattr(partitions, "exec_one", lambda sql, params=None: sent.append(sql.split("(")[0].strip()))
+    monkeypatch.setattr(partitions.versions, "bump", lambda *a: sent.append("bump"))
+    monkeypatch.setattr(partitions, "list_partitions", lambda table=partitions.OBS_TABLE: (
+        [] if table == partitions.OBS_TABLE else [{"name": "p_history", "bound": 739617},
+                                                   {"name": "p_future", "bound": "MAXVALUE"}]))
+    counts = {partitions.MIGRATION_TABLE: 5, partitions.OBS_TABLE: 5}
+
+    def fetch_one(sql, params=None):
+        if "MIN(id)" in sql:
+            return {"first_id": 1, "last_id": 5}
+        if "COUNT(*) AS n FROM patient" in sql:
+            return {"n": counts[sql.rsplit(" ", 1)[1]]}
+        return {"n": 0}
+
+    monkeypatch.setattr(partitions, "fetch_one", fetch_one)
+    result = partitions.migrate_to_partitioned(batch_rows=3, today=date(2026, 2, 10), echo=lambda *a: None)
+    assert result["migrated"] and result["rows"] == 5
+    assert sent[0] == "DROP TABLE IF EXISTS patient_observations_partitioned"
+    assert sent[1] == "CREATE TABLE IF NOT EXISTS patient_observations_partitioned"
+    assert sent[2].startswith("ALTER TABLE patient_observations_partitioned REORGANIZE")
+    assert [s for s in sent if s.startswith("INSERT")] == [sent[3], sent[4]]
+    assert sent[5:] == ["RENAME TABLE patient_observations TO patient_observations_unpartitioned, "
+                        "patient_observations_partitioned TO patient_observations", "bump"]
+
+    # a short copy never swaps
+    sent.clear()
+    counts[partitions.MIGRATION_TABLE] = 4
+    try:
+        partitions.migrate_to_partitioned(batch_rows=3, today=date(2026, 2, 10), echo=lambda *a: None)
+        assert False, "expected the count check to fail"
+    except RuntimeError as e:
+        assert "Copied 4 of 5" in str(e)
+    assert not any(s.startswith("RENAME") for s in sent)
+
+
+def test_rollup_aggregate_and_plan():
+    rows = [(1, "RESTING_BP", 120.0, None, "", "2024-01-01 10:15:00", 9),
+            (1, "RESTING_BP", 140.0, None, "", "2024-01-01 10:45:00", 9),
+            (2, "RESTING_BP", 100.0, None, "", "2024-01-01 23:00:00", 9),
+            (2, "ST_SLOPE", None, "up", "", "2024-01-01 23:00:00", 9)]
+    hourly, daily, patient_daily = rollups.aggregate(rows)
+    assert hourly[0] == ("RESTING_BP", datetime(2024, 1, 1, 10), 2, 260.0, 120.0, 140.0)
+    assert daily == [("RESTING_BP", date(2024, 1, 1), 3, 360.0, 100.0, 140.0)]
+    assert [r[0] for r in patient_daily] == [1, 2]
+
+    first = datetime(2024, 1, 1, 10, 30)
+    assert rollups.plan_buckets(first, first + timedelta(hours=5), 100)[0] is None
+    name, start, seconds = rollups.plan_buckets(first, first + timedelta(days=30), 10)
+    # whole daily rows: the first bucket starts at midnight, before `first`
+    assert (name, start, seconds) == ("daily", datetime(2024, 1, 1), 3 * rollups.DAY)
+    rows = rollups.with_timestamps([{"bucket": 0}, {"bucket": 2}], start, seconds)
+    assert [r["observed_at"] for r in rows] == [datetime(2024, 1, 1), datetime(2024, 1, 7)]
+
+
+def test_stream_batcher_group_commits():
+    batches = []
+
+    def commit(rows):
+        batches.append(list(rows))
+        return {"committed": len(rows), "rejected": 0, "patients": 1}
+    batcher = stream.ObservationBatcher(max_pending=2, max_rows=10, max_wait=0.2, commit=commit)
+    t = datetime(2024, 1, 1)
+    futures = [batcher.submit([(1, "RESTING_BP", 120.0 + i, None, "", t, None)]) for i in range(2)]
+    assert [f.result(5)["committed"] for f in futures] == [2, 2]
+    batcher.close()
+    assert len(batches) == 1 and batcher.stats["rows"] == 2
+
+
+def test_ingest_and_training_build_the_same_features(monkeypatch, tmp_path):
+    from ml.features import DATA_PATH, load_dataset, patient_to_row
+    with open(DATA_PATH) as f:
+        lines = f.readlines()[:41]
+    sample = tmp_path / "sample.csv"
+    sample.write_text("".join(lines))
+    X, _ = load_dataset(str(sample))
+
+    # the serve path: what ingest stores, read back as the patient row the model scores
+    stored = {}
+
+    def insert_patient(uid, name, phone, age, sex):
+        stored[len(stored) + 1] = {"age": age, "sex": sex}
+        return len(stored)
+
+    monkeypatch.setattr(ingest.repo, "start_upload", lambda *a: 1)
+    monkeypatch.setattr(ingest.repo, "get_patient_id_by_uid", lambda uid: None)
+    monkeypatch.setattr(ingest.repo, "insert_patient", insert_patient)
+    monkeypatch.setattr(ingest.repo, "insert_observations", lambda rows: None)
+    monkeypatch.setattr(ingest, "update_rollups", lambda rows: None)
+    monkeypatch.setattr(ingest.repo, "get_vitals_summaries", lambda ids: {})
+    columns = ["chest_pain_type", "resting_bp", "cholesterol", "fasting_bs", "resting_ecg",
+               "max_heart_rate", "exercise_angina", "st_depression", "st_slope", "num_vessels",
+               "thalassemia", "target"]
+    monkeypatch.setattr(ingest.repo, "insert_vitals_summary",
+                        lambda pid, *values: stored[pid].update(zip(columns, values)))
+    monkeypatch.setattr(ingest.repo, "complete_upload", lambda *a: None)
+    monkeypatch.setattr(ingest.events, "publish_delta", lambda *a, **kw: None)
+    ingest.ingest_csv(1, "sample.csv", sample.read_bytes())
+
+    served = np.array([patient_to_row(stored[pid]) for pid in sorted(stored)])
+    assert served.shape == X.shape and set(X["fasting_bs"]) == {0.0, 1.0}
+    np.testing.assert_array_equal(served, X.to_numpy())
+
+
+def test_stream_batcher_sets_bad_rows_aside():
+    import pymysql
+    batches = []
+
+    def commit(rows):
+        if any(len(r[1]) > 64 for r in rows):
+            raise pymysql.err.DataError(1406, "Data too long for column 'obs_type'")
+        batches.append(list(rows))
+        return {"committed": len(rows), "rejected": 0, "patients": len({r[0] for r in rows})}
+    batcher = stream.ObservationBatcher(max_pending=4, max_rows=10, max_wait=0.2, commit=commit)
+    t = datetime(2024, 1, 1)
+    good = batcher.submit([(1, "RESTING_BP", 120.0, None, "", t, None)])
+    mixed = batcher.submit([(2, "X" * 65, 1.0, None, "", t, None),
+                            (2, "CHOLESTEROL", 200.0, None, "", t, None)])
+    batcher.close()
+    # the other client's rows and the bad request's good row are still committed
+    assert good.result(1)["committed"] == 1
+    assert mixed.result(1) == {"committed": 1, "rejected": 0, "patients": 1, "failed": 1}
+    assert [len(b) for b in batches] == [1, 1] and batcher.stats["failed"] == 1
+    assert [r[1] for r in batcher.failed] == ["X" * 65]
+
+
+def test_stream_summary_rows_keep_latest_value():
+    t = datetime(2024, 1, 1)
+    rows = [(1, "RESTING_BP", 150.0, None, "", t + timedelta(minutes=5), None),
+            (1, "RESTING_BP", 130.0, None, "", t, None),
+            (1, "SPO2", 97.0, None, "", t, None)]
+    (row,) = stream.summary_rows(rows)
+    assert row[0] == 1 and row[2] == 150.0 and row[1] is None and len(row) == 25
+    assert row[14] == t + timedelta(minutes=5) and row[13] is None
+
+    # a reading older than the stored one leaves that column as it is
+    stored = {1: {"resting_bp": 140, "resting_bp_at": t + timedelta(hours=1)}}
+    assert stream.merged_summaries(stored, [row]) == stored
+    assert stream.merged_summaries({}, [row])[1] == {"resting_bp": 150.0, "resting_bp_at": row[14]}
+
+
+def test_stream_summary_merge_is_per_column():
+    t = datetime(2024, 1, 1)
+    stored = {1: {"max_heart_rate": 150, "max_heart_rate_at": t,
+                  "cholesterol": 210, "cholesterol_at": t + timedelta(hours=2)}}
+    # one batch: a new heart rate and a cholesterol reading older than the stored one
+    summaries = stream.summary_rows([
+        (1, "MAX_HEART_RATE", 160.0, None, "", t + timedelta(hours=3), None),
+        (1, "CHOLESTEROL", 180.0, None, "", t + timedelta(hours=1), None)])
+    merged = stream.merged_summaries(stored, summaries)[1]
+    assert merged["max_heart_rate"] == 160.0 and merged["max_heart_rate_at"] == t + timedelta(hours=3)
+    assert merged["cholesterol"] == 210 and merged["cholesterol_at"] == t + timedelta(hours=2)
+    # the upsert compares each column with its own time, in that order
+    sql = " ".join(repo_module.Q.SQL_MERGE_VITALS_SUMMARY.split())
+    for col in stream.SUMMARY_COLUMNS.values():
+        assert f"{col}=IF({col}_at IS NULL OR VALUES({col}_at) >= {col}_at," in sql
+        assert sql.index(f"{col}=IF(") < sql.index(f"{col}_at=IF(")
+    assert sql.count("%s") == len(summaries[0])
+
+
+def test_stream_commit_batch_is_one_transaction(monkeypatch):
+    from app.db import connection
+    conn = _PooledConn()
+    monkeypatch.setattr(connection, "_ensure_database", lambda: None)
+    monkeypatch.setattr(connection, "_connect", lambda **kw: conn)
+    monkeypatch.setattr(connection, "_pool", connection.queue.LifoQueue(maxsize=2))
+    seen = []
+    record = lambda name: lambda *a: seen.append((name, connection._tx.get() is conn))  # noqa: E731
+    monkeypatch.setattr(stream.repo, "existing_patient_ids", lambda ids: {1})
+    monkeypatch.setattr(stream.repo, "insert_observations", record("insert"))
+    monkeypatch.setattr(stream.repo, "upsert_rollups", record("rollups"))
+    monkeypatch.setattr(stream.repo, "get_vitals_summaries", lambda ids: {})
+    monkeypatch.setattr(stream.repo, "merge_vitals_summaries", record("merge"))
+    monkeypatch.setattr(stream.events, "publish_delta", record("publish"))
+    t = datetime(2024, 1, 1)
+    result = stream.commit_batch([(1, "RESTING_BP", 120.0, None, "", t, None),
+                                  (2, "RESTING_BP", 130.0, None, "", t, None)])
+    assert result == {"committed": 1, "rejected": 1, "patients": 1}
+    assert seen == [("insert", True), ("rollups", True), ("merge", True), ("publish", False)]
+    assert conn.log == ["begin", "commit"]
+
+    # a failing merge rolls the observations and rollups back and publishes nothing
+    seen.clear()
+    monkeypatch.setattr(stream.repo, "merge_vitals_summaries", lambda rows: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        stream.commit_batch([(1, "RESTING_BP", 120.0, None, "", t, None)])
+    assert [name for name, _ in seen] == ["insert", "rollups"] and conn.log[-1] == "rollback"
+
+
+def test_summary_delta_moves_patients_between_ranges():
+    old = {1: {"resting_bp": 125, "max_heart_rate": 150, "cholesterol": 180, "target": 0}}
+    new = {1: {"resting_bp": 140, "max_heart_rate": 150, "cholesterol": 180, "target": 1},
+           2: {"resting_bp": 119.4, "target": 0}}
+    delta = events.summary_delta(old, new)
+    assert delta["vitals_summary"]["blood_pressure_ranges"] == {"high": 1, "elevated": -1, "normal": 1}
+    assert "heart_rate_ranges" not in delta["vitals_summary"]
+    assert delta["stats"] == {"heart_disease_count": 1}
+    assert delta["vitals_summary"]["total_patients"] == 1
+
+
+def test_event_broker_replay_window():
+    broker = events.EventBroker(history=2)
+    for i in range(3):
+        broker.publish("delta", {"i": i})
+    assert [item[0] for item in broker.since(1)] == [2, 3]
+    assert broker.since(0) is None and broker.since(3) == []
+    # an id from before a restart cannot be replayed either
+    assert broker.since(7) is None
+
+
+def test_risk_scoring_status_and_trend():
+    # patient 1: HR rising to 110 (HIGH, UP), SpO2 falling to 93 (LOW, DOWN)
+    # patient 2: normal and flat
+    rows = [(1, "HEART_RATE", 110, 1), (1, "HEART_RATE", 90, 2),
+            (1, "SPO2", 93, 1), (1, "SPO2", 97, 2),
+            (2, "HEART_RATE", 70, 1), (2, "HEART_RATE", 70, 2)]
+    scored = risk.score_observations(*zip(*rows))
+    hr, spo2 = scored["types"].index("HEART_RATE"), scored["types"].index("SPO2")
+    assert list(scored["score"]) == [6, 0]
+    assert list(scored["level"]) == ["High", "Low"]
+    assert scored["status"][0, hr] == 1 and scored["trend"][0, spo2] == -1
+    assert np.isnan(scored["latest"][1, spo2]) and scored["status"][1, spo2] == 0
+
+
+def test_risk_stratify_filters_and_top_n(monkeypatch):
+    rows = [(pid, "RESTING_BP", bp, 1) for pid, bp in ((1, 150), (2, 120), (3, 160))]
+    monkeypatch.setattr(risk.repo, "get_recent_observations", lambda *a: [list(c) for c in zip(*rows)])
+    monkeypatch.setattr(risk.repo, "get_patients_brief",
+                        lambda ids: {i: {"patient_uid": f"P{i}"} for i in ids})
+    result = risk.stratify(types=["RESTING_BP"], level="Medium", limit=1)
+    assert result["distribution"] == {"High": 0, "Medium": 2, "Low": 1}
+    assert result["matched"] == 2 and [p["id"] for p in result["patients"]] == [1]
+    assert result["patients"][0]["vitals"]["RESTING_BP"]["status"] == "HIGH"
+
+
+def test_population_breakdown_cleans_mysql_values(monkeypatch):
+    from decimal import Decimal
+    monkeypatch.setattr(population.repo, "get_population_breakdown", lambda by: [
+        {"grp": "45-64", "patients": 3, "avg_age": Decimal("52.3333"),
+         "avg_resting_bp": Decimal("131.0000"), "heart_disease_rate": None}])
+    (group,) = population.get_breakdown("age_group")["groups"]
+    assert group == {"age_group": "45-64", "patients": 3, "avg_age": 52.33,
+                     "avg_resting_bp": 131.0, "heart_disease_rate": None}
+    with pytest.raises(ValueError):
+        population.get_breakdown("ward")
+
+
+def _fake_versions(monkeypatch) -> dict:
+    """data_versions rows kept in a dict; versions.bump() updates it"""
+    from app.db import versions
+    store = {"epoch": 0xabc}
+
+    def bump(patient_ids=None):
+        for scope in versions.touch(patient_ids)[1]:
+            store[scope] = store.get(scope, 0) + 1
+    monkeypatch.setattr(versions, "read", lambda a, b: {k: store[k] for k in ("epoch", a, b) if k in store})
+    monkeypatch.setattr(versions, "bump", bump)
+    return store
+
+
+def _api_client(monkeypatch, role: str = "doctor"):
+    from fastapi.testclient import TestClient
+    from app.main import app
+    monkeypatch.setattr(repo_module, "get_session", lambda sid: {"role": role, "user_id": 1})
+    monkeypatch.setattr(repo_module, "touch_session", lambda sid: None)
+    _fake_versions(monkeypatch)
+    return TestClient(app), {"X-Session-Id": "test-session"}
+
+
+def test_patient_search_is_paginated(monkeypatch):
+    client, headers = _api_client(monkeypatch)
+    calls = []
+    monkeypatch.setattr(repo_module, "search_patients",
+                        lambda q, limit, offset: calls.append((q, limit, offset)) or [])
+    monkeypatch.setattr(repo_module, "count_search_patients", lambda q: 120)
+    result = client.get("/patients/", params={"limit": 50, "offset": 100, "search": "ann"},
+                        headers=headers).json()
+    assert calls == [("ann", 50, 100)]
+    assert result["total"] == 120 and result["total_pages"] == 3
+
+
+def test_patient_list_columnar_and_gzip(monkeypatch):
+    client, headers = _api_client(monkeypatch)
+    rows = [{"id": i, "uid": f"P{i}", "name": f"Patient {i}", "age": 40 + i % 30, "sex": "F",
+             "created_at": datetime(2024, 1, 1), "st_depression": Decimal("1.5")} for i in range(200)]
+    monkeypatch.setattr(repo_module, "list_patients", lambda limit, offset: rows)
+    monkeypatch.setattr(repo_module, "get_total_patients_count", lambda: 200)
+    plain = client.get("/patients/", params={"limit": 200}, headers=headers)
+    assert plain.headers["content-encoding"] == "gzip" and plain.headers["etag"].startswith("W/")
+    # cursor rows are serialized as they come, with jsonable_encoder's datetime/Decimal output
+    assert plain.json()["patients"][0] == {**rows[0], "created_at": "2024-01-01T00:00:00",
+                                           "st_depression": 1.5}
+    cols = client.get("/patients/", params={"limit": 200},
+                      headers={**headers, "Accept": "application/vnd.aegiscare.columns+json"})
+    body = cols.json()
+    assert body["total"] == 200 and body["columns"]["uid"][:2] == ["P0", "P1"]
+    assert body["columns"]["created_at"][0] == 1704067200000
+    assert cols.headers["etag"] != plain.headers["etag"]
+    assert len(cols.content) < len(plain.content)
+    # a 304 carries the same (weak) validator as the compressed 200
+    again = client.get("/patients/", params={"limit": 200},
+                       headers={**headers, "If-None-Match": plain.headers["etag"]})
+    assert again.status_code == 304 and again.headers["etag"] == plain.headers["etag"]
+
+
+def test_conditional_get_skips_handler_queries(monkeypatch):
+    from app.api import deps
+    from app.db import versions
+    from app.services import model as model_service
+    calls = []
+    client, headers = _api_client(monkeypatch)
+    monkeypatch.setattr(repo_module, "get_dashboard_stats", lambda: calls.append("stats") or {})
+    first = client.get("/dashboard/stats", headers=headers)
+    tag = first.headers["ETag"]
+    again = client.get("/dashboard/stats", headers={**headers, "If-None-Match": tag})
+    assert again.status_code == 304 and again.headers["ETag"] == tag
+    assert calls == ["stats"]
+    # live dashboards skip deltas at or below the event id read before the data
+    assert first.headers["X-Event-Id"] == again.headers["X-Event-Id"] == str(events.broker.last_id)
+    # a write to patient 7 changes the global tag and 7's, not patient 8's
+    before = versions.etag(7), versions.etag(8)
+    versions.bump([7])
+    assert client.get("/dashboard/stats", headers={**headers, "If-None-Match": tag}).status_code == 200
+    assert versions.etag(7) != before[0] and versions.etag(8) == before[1]
+
+    # predictions revalidate against the model as well as the patient's data
+    monkeypatch.setattr(repo_module, "get_patient_by_id", lambda pid: {"id": pid, "age": 61})
+    monkeypatch.setattr(model_service, "get_risk_model", lambda: None)
+    monkeypatch.setattr(deps, "model_tag", lambda: "m1")
+    tag = client.get("/patients/7/predictions", headers=headers).headers["ETag"]
+    assert client.get("/patients/7/predictions",
+                      headers={**headers, "If-None-Match": tag}).status_code == 304
+    monkeypatch.setattr(deps, "model_tag", lambda: "m2")
+    assert client.get("/patients/7/predictions",
+                      headers={**headers, "If-None-Match": tag}).status_code == 200
+
+
+def test_conditional_get_checks_role_first(monkeypatch):
+    client, headers = _api_client(monkeypatch, role="nurse")
+    r = client.get("/dashboard/stats", headers={**headers, "If-None-Match": "*"})
+    assert r.status_code == 403
+
+
+def test_predictions_keep_target_as_positive_outcome(monkeypatch):
+    from app.api.routers import patients as patients_router
+    proba = {"target": 0.8, "readmission": 0.2, "complication": 0.6, "mortality": 0.1}
+    monkeypatch.setattr(patients_router, "score_patient", lambda patient: proba)
+    out = patients_router.calculate_ml_predictions({"age": 61})
+    assert out["heart_disease"] == 1 and out["heart_disease_risk"] == 0.8
+    assert out["target"] == 0 and out["complication"] == 1 and out["readmiss"] == 0
+
+    # the rule-based fallback reports the same fields with the same meaning
+    monkeypatch.setattr(patients_router, "score_patient", lambda patient: None)
+    out = patients_router.calculate_ml_predictions({"age": 30, "resting_bp": 110})
+    assert out["target"] == 1 and out["heart_disease"] == 0
+
+    # so does the default when scoring fails
+    monkeypatch.setattr(patients_router, "score_patient", lambda patient: 1 / 0)
+    out = patients_router.calculate_ml_predictions({"age": 61})
+    assert out["heart_disease"] == 1 - out["target"] == 0
+
+
+def test_session_checked_on_every_request(monkeypatch):
+    client, headers = _api_client(monkeypatch)
+    monkeypatch.setattr(repo_module, "get_dashboard_stats", lambda: {})
+    assert client.get("/dashboard/stats", headers=headers).status_code == 200
+    # logged out (or expired, or deactivated) on another worker
+    monkeypatch.setattr(repo_module, "get_session", lambda sid: None)
+    assert client.get("/dashboard/stats", headers=headers).status_code == 401
+    monkeypatch.setattr(repo_module, "get_session",
+                        lambda sid: {"role": "doctor", "user_id": 1, "is_active": 0})
+    assert client.get("/dashboard/stats", headers=headers).status_code == 401
+
+
+def test_versions_bump_commits_with_the_write(monkeypatch):
+    from app.db import connection
+    conn = _PooledConn()
+    monkeypatch.setattr(connection, "_ensure_database", lambda: None)
+    monkeypatch.setattr(connection, "_connect", lambda **kw: conn)
+    monkeypatch.setattr(connection, "_pool", connection.queue.LifoQueue(maxsize=2))
+    repo_module.update_patient(7, "Ann", "555", 61, "F")
+    (update, _), (touch, scopes) = conn.sent[-2:]
+    assert "UPDATE patients" in update and "data_versions" in touch
+    assert scopes == ("all", "b7") and conn.log == ["begin", "commit"]
+
+    conn.sent.clear()
+    monkeypatch.setattr(_PooledCursor, "executemany", lambda self, sql, rows: 1 / 0, raising=False)
+    with pytest.raises(ZeroDivisionError):
+        repo_module.insert_observations([(7, "HEART_RATE", 80.0, None, "", "2024-01-01", 1)])
+    assert conn.sent == [] and conn.log[-2:] == ["begin", "rollback"]
+
+
+class _FakeCursor:
+    def __init__(self, conn):
+        self.conn, self.description = conn, None
+
+    def execute(self, sql, params=()):
+        self.conn.executed.append((sql, params))
+
+    def fetchmany(self, size):
+        self.conn.fetched += 1
+        batch, self.conn.rows = self.conn.rows[:size], self.conn.rows[size:]
+        return batch
+
+    def close(self):
+        # a real unbuffered cursor reads the rest of the result here
+        self.conn.drained = True
+
+
+class _FakeConn:
+    def __init__(self, rows):
+        self.rows, self.executed, self.fetched = list(rows), [], 0
+        self.closed = self.drained = False
+
+    def cursor(self, cursorclass=None):
+        self.cursorclass = cursorclass
+        return _FakeCursor(self)
+
+    def close(self):
+        self.closed = True
+
+
+def test_row_stream_connection_lifetime(monkeypatch):
+    from app.db import connection
+    conn = _FakeConn([{"id": i} for i in range(5)])
+    monkeypatch.setattr(connection, "get_conn", lambda: conn)
+    assert [len(b) for b in connection.stream_all("SELECT", batch_size=2)] == [2, 2, 1]
+    assert conn.closed and conn.drained and conn.cursorclass.__name__ == "SSDictCursor"
+
+    conn = _FakeConn([(i, i * 2) for i in range(5)])
+    with connection.stream_all("SELECT", batch_size=2, dicts=False) as rows:
+        assert conn.executed[-1] == ("SELECT", ())
+        next(iter(rows))
+    # abandoned early: connection dropped without reading the rest of the result
+    assert conn.closed and not conn.drained and conn.fetched == 1
+    conn = _FakeConn([(i, i * 2) for i in range(5)])
+    assert connection.stream_all("SELECT", dicts=False).columns() == [[0, 1, 2, 3, 4],
+                                                                     [0, 2, 4, 6, 8]]
+
+
+def test_row_stream_is_profiled_and_traced(monkeypatch):
+    from app.core import tracing
+    from app.db import connection, profiling
+    monkeypatch.setattr(profiling, "SLOW_QUERY_MS", 0)
+    monkeypatch.setattr(profiling, "_explained_at", {"repo.stream_patient_vitals_range": 1e18})
+    monkeypatch.setattr(profiling, "_slow_log", profiling.deque(maxlen=10))
+    for metric in (profiling.QUERY_SECONDS, profiling.QUERY_ERRORS):
+        metric.reset()
+    conn = _FakeConn([{"id": i} for i in range(5)])
+    monkeypatch.setattr(connection, "get_conn", lambda: conn)
+    root = tracing.Span(tracing.Trace(sampled=False), "GET /test")
+    token = tracing._current.set(root)
+    try:
+        with repo_module.stream_patient_vitals_range(1, None, None, batch_size=2) as stream:
+            next(iter(stream))
+    finally:
+        tracing._current.reset(token)
+    assert [s.name for s in root.trace.spans] == ["db repo.stream_patient_vitals_range"]
+    # closed early: recorded once, with the rows actually read
+    assert [(e["query"], e["op"], e["rows"]) for e in profiling.slow_queries()] == \
+        [("repo.stream_patient_vitals_range", "stream", 2)]
+    assert profiling.QUERY_SECONDS.snapshot(query="repo.stream_patient_vitals_range", op="stream")[1] == 1
+
+    monkeypatch.setattr(connection, "get_conn", lambda: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        repo_module.stream_patient_vitals_range(1, None, None)
+    assert profiling.QUERY_ERRORS.value(query="repo.stream_patient_vitals_range", op="stream") == 1
+
+
+def test_exports_stream_batches(monkeypatch):
+    from app.db import connection
+    client, headers = _api_client(monkeypatch)
+    conn = _FakeConn([{"id": i, "uid": f"P{i}", "name": "Ann, Lee", "age": 50,
+                       "created_at": datetime(2024, 1, 1), "st_depression": Decimal("1.5")}
+                      for i in range(6)])
+    monkeypatch.setattr(connection, "get_conn", lambda: conn)
+    monkeypatch.setattr("app.api.routers.exports.BATCH_SIZE", 2)
+    r = client.get("/exports/patients", params={"sex": "F", "target": 1}, headers=headers)
+    assert r.headers["content-type"].startswith("text/csv")
+    lines = r.text.splitlines()
+    assert len(lines) == 7 and lines[0].startswith("id,uid,name,age")
+    assert lines[1].startswith('0,P0,"Ann, Lee",50,,,2024-01-01 00:00:00,,')
+    sql, params = conn.executed[-1]
+    assert "p.sex = %s" in sql and "pvs.target = %s" in sql and params == ("F", 1)
+    assert conn.fetched == 4 and conn.closed
+
+    conn.rows = [{"id": i, "st_depression": Decimal("1.5")} for i in range(6)]
+    r = client.get("/exports/patients", params={"format": "ndjson"}, headers=headers)
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    assert len(rows) == 6 and rows[5]["st_depression"] == 1.5
+    assert client.get("/exports/patients", params={"format": "xml"}, headers=headers).status_code == 422
+    assert client.post("/observations/stream", json=[{"patient_id": 1, "obs_type": "X" * 65}],
+                       headers=headers).status_code == 422
+    assert client.post("/observations/stream", json=[{"patient_id": 1, "obs_type": ""}],
+                       headers=headers).status_code == 422
+    assert client.get("/patients/1/vitals/series", params={"format": "xml"},
+                      headers=headers).status_code == 422
+
+
+class _PooledCursor:
+    rowcount, lastrowid = 1, 0
+
+    def __init__(self, conn):
+        self.connection, self.conn = conn, conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def execute(self, sql, params=()):
+        if sql.startswith("PREPARE") and self.conn.refuse:
+            import pymysql
+            raise pymysql.err.OperationalError(self.conn.refuse, "refused")
+        self.conn.sent.append((sql, params))
+
+    def nextset(self):
+        return True
+
+    def fetchone(self):
+        return {"session_id": "s1", "role": "doctor"}
+
+    def fetchall(self):
+        return [{"table": "sessions", "type": "const"}]
+
+
+class _PooledConn:
+    def __init__(self, refuse=0):
+        # refuse: MySQL errno raised by PREPARE
+        self.sent, self.refuse, self.log = [], refuse, []
+
+    def begin(self):
+        self.log.append("begin")
+
+    def commit(self):
+        self.log.append("commit")
+
+    def rollback(self):
+        self.log.append("rollback")
+
+    def cursor(self):
+        return _PooledCursor(self)
+
+    def close(self):
+        pass
+
+
+def test_pool_prepares_hot_statements_once(monkeypatch):
+    from app.db import connection, statements
+    opened = []
+    monkeypatch.setattr(connection, "_ensure_database", lambda: None)
+    monkeypatch.setattr(connection, "_connect", lambda **kw: opened.append(_PooledConn()) or opened[-1])
+    monkeypatch.setattr(connection, "_pool", connection.queue.LifoQueue(maxsize=2))
+    statements.reset()
+    for _ in range(3):
+        assert repo_module.get_session("s1")["role"] == "doctor"
+    assert len(opened) == 1
+    sent = [sql for sql, _ in opened[0].sent]
+    assert sent[0].startswith("PREPARE aegis_get_session FROM")
+    assert "WHERE s.session_id = ?" in opened[0].sent[0][1][0]
+    assert sent[1:] == ["SET @aegis_p0 = %s", "EXECUTE aegis_get_session USING @aegis_p0"] * 3
+    stats = {s["statement"]: s for s in statements.stats()}
+    assert stats["get_session"]["calls"] == 3 and stats["get_session"]["prepared_calls"] == 3
+
+    # a transient error (deadlock) runs that call as text and tries to prepare again next time
+    monkeypatch.setattr(connection, "_pool", connection.queue.LifoQueue(maxsize=2))
+    monkeypatch.setattr(connection, "_connect", lambda **kw: opened.append(_PooledConn(1213)) or opened[-1])
+    monkeypatch.setattr(statements, "_refused", set())
+    repo_module.get_session("s1")
+    assert [sql for sql, _ in opened[-1].sent] == [repo_module.Q.SQL_GET_SESSION]
+    assert statements._refused == set()
+
+    # statements MySQL cannot prepare fall back to plain text for good
+    opened[-1].refuse = 1295
+    repo_module.get_session("s1")
+    opened[-1].refuse = 0
+    repo_module.get_session("s1")
+    assert [sql for sql, _ in opened[-1].sent] == [repo_module.Q.SQL_GET_SESSION] * 3
+    assert statements._refused == {"get_session"} and statements.stats()[0]["calls"] == 6
+
+
+def test_query_profiling_and_metrics(monkeypatch):
+    from fastapi.testclient import TestClient
+    from app.db import connection, profiling, statements
+    from app.main import app
+    conn = _PooledConn()
+    monkeypatch.setattr(connection, "_ensure_database", lambda: None)
+    monkeypatch.setattr(connection, "_connect", lambda **kw: conn)
+    monkeypatch.setattr(connection, "_pool", connection.queue.LifoQueue(maxsize=2))
+    monkeypatch.setattr(profiling, "SLOW_QUERY_MS", 0)
+    monkeypatch.setattr(profiling, "_explained_at", {})
+    monkeypatch.setattr(profiling, "_slow_log", profiling.deque(maxlen=10))
+    for metric in (profiling.QUERY_SECONDS, profiling.QUERY_ERRORS):
+        metric.reset()
+
+    repo_module.get_session("s1")
+    repo_module.get_session("s1")
+    slow = profiling.slow_queries()
+    assert [e["query"] for e in slow] == ["repo.get_session"] * 2
+    # EXPLAIN runs once per interval per query name, with the query's parameters
+    assert slow[1]["explain"] == [{"table": "sessions", "type": "const"}] and slow[0]["explain"] is None
+    assert [p for sql, p in conn.sent if sql.startswith("EXPLAIN")] == [("s1",)]
+
+    monkeypatch.setattr(statements, "execute", lambda *a: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        repo_module.get_session("s1")
+    assert profiling.QUERY_ERRORS.value(query="repo.get_session", op="fetch_one") == 1
+
+    text = TestClient(app).get("/metrics").text
+    assert 'aegiscare_db_query_seconds_count{query="repo.get_session",op="fetch_one"} 2' in text
+    assert 'aegiscare_db_query_seconds_bucket{query="repo.get_session",op="fetch_one",le="+Inf"} 2' in text
+    assert "# TYPE aegiscare_db_connection_acquire_seconds histogram" in text
+    assert "aegiscare_db_pool_idle_connections 1" in text
+
+
+def test_request_tracing_spans_and_route_latency(monkeypatch, tmp_path):
+    from app.core import tracing
+    from app.services import model as model_service
+
+    class _Model:
+        def predict_patients(self, patients):
+            return {o: [0.25] for o in ("target", "readmission", "complication", "mortality")}
+
+    client, headers = _api_client(monkeypatch)
+    exporter = tracing.Exporter(str(tmp_path / "spans.jsonl"))
+    monkeypatch.setattr(tracing, "_exporter", exporter)
+    monkeypatch.setattr(tracing, "TRACE_SAMPLE_RATE", 1.0)
+    monkeypatch.setattr(model_service, "get_risk_model", lambda: _Model())
+    monkeypatch.setattr(repo_module, "get_patient_by_id", lambda pid: {"id": pid, "age": 61})
+    tracing.reset_routes()
+
+    for _ in range(3):
+        assert client.get("/patients/7/predictions", headers=headers).status_code == 200
+    exporter.flush()
+    exporter.close()
+
+    lines = (tmp_path / "spans.jsonl").read_text().splitlines()
+    spans = [s for line in lines for rs in json.loads(line)["resourceSpans"]
+             for ss in rs["scopeSpans"] for s in ss["spans"]]
+    roots = [s for s in spans if "parentSpanId" not in s]
+    assert len(roots) == 3 and roots[0]["name"] == "GET /patients/{patient_id}/predictions"
+    children = {s["name"] for s in spans if s.get("parentSpanId") == roots[0]["spanId"]}
+    assert {"auth", "model score_patient", "serialize"} <= children
+
+    stats = {r["route"]: r for r in tracing.route_stats()}["/patients/{patient_id}/predictions"]
+    assert stats["count"] == 3 and stats["p50_ms"] <= stats["p95_ms"] <= stats["p99_ms"]
+    assert {"auth", "model", "serialize", "other"} <= set(stats["phases_mean_ms"])
+    assert 'aegiscare_http_request_seconds_count{method="GET",route="/patients/{patient_id}/predictions",status="200"}' \
+        in tracing.metrics.render()
@@ -0,0 +1,100 @@
+import math
+import os
+import sys
+
+# the repository root holds the shared `ml` package
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+
+import numpy as np  # noqa: E402
+
+from ml import nlp  # noqa: E402
+from ml import simulate as sim  # noqa: E402
+from ml.compiled import check_parity, compile_bundle  # noqa: E402
+from ml.evaluate import calibration, outcome_metrics  # noqa: E402
+from ml.features import FEATURES, OUTCOMES, load_dataset, patient_to_row  # noqa: E402
+from ml.train import build_pipeline  # noqa: E402
+
+
+def test_patient_to_row_maps_api_fields():
+    row = patient_to_row({"age": 60, "sex": "F", "resting_bp": "130", "cholesterol": None})
+    assert len(row) == len(FEATURES)
+    assert row[FEATURES.index("age")] == 60.0
+    assert row[FEATURES.index("sex")] == 1.0
+    assert row[FEATURES.index("resting_bp")] == 130.0
+    assert math.isnan(row[FEATURES.index("cholesterol")])
+
+
+def test_calibration_perfect_predictions():
+    y = np.array([0, 0, 1, 1])
+    cal = calibration(y, np.array([0.0, 0.0, 0.99, 0.99]))
+    assert cal["ece"] < 0.02
+    assert sum(b["count"] for b in cal["bins"]) == 4
+
+
+def test_outcome_metrics_auroc():
+    y = np.array([0, 0, 1, 1])
+    m = outcome_metrics(y, np.array([0.1, 0.4, 0.35, 0.8]))
+    assert m["auroc"] == 0.75
+    assert m["positive_rate"] == 0.5
+
+
+def test_compiled_model_matches_pipelines():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(300, len(FEATURES)))
+    X[rng.random(X.shape) < 0.05] = np.nan
+    models = {}
+    for i, outcome in enumerate(OUTCOMES):
+        y = (np.nan_to_num(X[:, i]) + rng.normal(scale=0.5, size=300) > 0).astype(int)
+        models[outcome] = build_pipeline().fit(X, y)
+    bundle = {"version": "test", "trained": None, "features": FEATURES, "models": models}
+
+    compiled = compile_bundle(bundle)
+    assert check_parity(bundle, compiled, X) < 1e-9
+
+
+def test_simulate_matches_full_rescoring(monkeypatch):
+    rng = np.random.default_rng(1)
+    X = rng.normal(loc=120, scale=30, size=(200, len(FEATURES)))
+    j = FEATURES.index("resting_bp")
+    y = (X[:, j] + rng.normal(scale=10, size=200) > 120).astype(int)
+    models = {o: build_pipeline().fit(X, y) for o in OUTCOMES}
+    compiled = compile_bundle({"version": "test", "trained": None, "features": FEATURES, "models": models})
+    scenarios = sim.sweep("bp_medication", [0, 10, 20], base={"statin": 5})
+    result = sim.simulate(compiled, X, scenarios)
+    shifted = sim.apply_shifts(X, FEATURES, sim.scenario_shifts(FEATURES, scenarios))
+    full = compiled.predict_proba(shifted.reshape(-1, len(FEATURES)))
+    assert np.allclose(result["scenarios"]["target"].ravel(), full["target"], atol=1e-12)
+    assert np.allclose(result["baseline"]["target"], compiled.predict_proba(X)["target"])
+    # blocks of a few patients (including a partial last one) give the same result
+    monkeypatch.setattr(sim, "CHUNK_ROWS", 7)
+    chunked = sim.simulate(compiled, X, scenarios)
+    assert np.allclose(chunked["scenarios"]["target"], result["scenarios"]["target"], atol=1e-12)
+
+
+def test_every_intervention_moves_some_prediction():
+    X, y = load_dataset()
+    X, y = X.to_numpy()[:600], y[:600]
+    models = {o: build_pipeline().fit(X, y[o]) for o in OUTCOMES}
+    compiled = compile_bundle({"version": "test", "trained": None, "features": FEATURES, "models": models})
+    for name, spec in sim.INTERVENTIONS.items():
+        # the largest reduction the simulator page offers
+        magnitude = 1.0 if spec["unit"] == "fraction" else 30.0
+        result = sim.simulate(compiled, X, sim.sweep(name, [magnitude]))
+        moved = np.abs(result["scenarios"]["target"][0] - result["baseline"]["target"]) > 1e-9
+        assert moved.any(), name
+
+
+def test_nlp_single_pass_matcher():
+    res = nlp.analyze_note("BP 150/95, patient Tired; missed doses of glucose meds")
+    assert res["findings"] == ["Patient reports fatigue", "Possible medication non-adherence",
+                               "Hypertension noted", "Diabetes-related issues present"]
+    assert res["keywords"]["bp"] == 1
+    assert nlp.summarize_notes("retired teacher") == nlp.NO_FINDINGS
+
+
+def test_nlp_summarize_many_keeps_order():
+    texts = ["fever overnight", "", "chest pain"] * 3
+    results = nlp.summarize_many(texts, workers=2, chunksize=2)
+    assert [r["summary"] for r in results] == [nlp.summarize_notes(t) for t in texts]